@@ -0,0 +1,66 @@
+# Runs ARA* (see search_algorithms/ara_star.py) with a time budget and prints every improved plan it reports, next to
+# the plans of greedy search and A* on the same level. ARA* should report its first plan about as early as greedy
+# search and end with a plan of the A* length on the levels where A* finishes within the budget.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalTrueDistanceHeuristics, HospitalIndividualCostsHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from search_algorithms.ara_star import ara_star
+from strategies.arastar import StrategyARAStar, DEFAULT_INITIAL_WEIGHT, DEFAULT_WEIGHT_STEP
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+
+HEURISTICS = {'truedistance': HospitalTrueDistanceHeuristics,
+              'maxsic': lambda: HospitalIndividualCostsHeuristics(use_max=True)}
+
+
+def solve(level_name, heuristic_name, search_name, operator_decomposition, initial_weight, weight_step, time_budget):
+    """Returns the (plan length, weight, suboptimality bound, #expanded, time) of every plan found"""
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = HEURISTICS[heuristic_name]()
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    if search_name == 'arastar':
+        strategy = StrategyARAStar(heuristic, initial_weight, weight_step, time_budget)
+        ara_star(initial_state, action_set, goal_description, strategy, operator_decomposition)
+        return strategy.plans
+    frontier = FrontierAStar(heuristic) if search_name == 'astar' else FrontierGreedy(heuristic)
+    start_time = time.time()
+    solved, plan, num_expanded, _ = graph_search(initial_state, action_set, goal_description, frontier,
+                                                 operator_decomposition)
+    return [(len(plan), None, None, num_expanded, time.time() - start_time)] if solved else []
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Anytime ARA* benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko2_32', 'MAPF02C', 'MAPF03C'])
+    parser.add_argument('--heuristics', nargs='*', default=list(HEURISTICS), choices=list(HEURISTICS))
+    parser.add_argument('--operator-decomposition', action='store_true', help='Use operator decomposition.')
+    parser.add_argument('--weight', type=float, default=DEFAULT_INITIAL_WEIGHT, help='Initial weight of ARA*.')
+    parser.add_argument('--weight-step', type=float, default=DEFAULT_WEIGHT_STEP, help='Weight step of ARA*.')
+    parser.add_argument('--time-budget', type=float, default=60, help='Time budget of ARA* in seconds.')
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit of greedy search and A* in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':12s} {'heuristic':12s} {'search':8s} {'length':>6s} {'weight':>6s} {'bound':>6s} "
+          f"{'#expanded':>10s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        for heuristic_name in args.heuristics:
+            for search_name in ['greedy', 'astar', 'arastar']:
+                timeout = args.time_budget + args.timeout if search_name == 'arastar' else args.timeout
+                plans = run_with_timeout(solve, (level_name, heuristic_name, search_name, args.operator_decomposition,
+                                                 args.weight, args.weight_step, args.time_budget), timeout)
+                if not plans:
+                    status = 'timeout' if plans is None else 'fail'
+                    print(f"{level_name:12s} {heuristic_name:12s} {search_name:8s} {'-':>6s} {'-':>6s} {'-':>6s} "
+                          f"{'-':>10s} {status:>9s}")
+                for (length, weight, bound, num_expanded, elapsed_time) in plans or []:
+                    weight = '-' if weight is None else f"{weight:.2f}"
+                    bound = '-' if bound is None else f"{bound:.3f}"
+                    print(f"{level_name:12s} {heuristic_name:12s} {search_name:8s} {length:6d} {weight:>6s} "
+                          f"{bound:>6s} {num_expanded:10d} {elapsed_time:9.2f}")
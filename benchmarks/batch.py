@@ -0,0 +1,98 @@
+# Compares evaluating the heuristics of the children of an expansion one at a time with evaluating them in a single
+# batch (see h_batch), using A*. Both give the same values, so the searches are identical and only the time spent in
+# the heuristic per evaluated state differs. The searches are stopped after a fixed number of evaluated states.
+# The goal count heuristic is evaluated incrementally instead (see HospitalGoalCountHeuristics.h_incremental), which
+# only looks at the moved objects, so it has no batch evaluation.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import HospitalState, HospitalTrueDistanceHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY
+from domains.hospital.goal_description import HospitalGoalDescription
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar
+
+
+class EvaluationLimitReached(Exception):
+    pass
+
+
+class TimedHeuristic:
+    """Wraps a heuristic and measures the total time spent in h, stopping the search after max_states evaluations"""
+
+    def __init__(self, heuristic, max_states):
+        self.heuristic = heuristic
+        self.max_states = max_states
+        self.num_states = 0
+        self.total_time = 0.0
+
+    def preprocess(self, level):
+        self.heuristic.preprocess(level)
+
+    def h(self, state, goal_description):
+        return self.h_states([state], goal_description, lambda: self.heuristic.h(state, goal_description))
+
+    def h_states(self, states, goal_description, evaluate):
+        if self.num_states >= self.max_states:
+            raise EvaluationLimitReached()
+        start_time = time.perf_counter()
+        value = evaluate()
+        self.total_time += time.perf_counter() - start_time
+        self.num_states += len(states)
+        return value
+
+
+class TimedBatchHeuristic(TimedHeuristic):
+    """Wraps a heuristic and measures the total time spent in h and h_batch"""
+
+    def h_batch(self, states, goal_description):
+        return self.h_states(states, goal_description, lambda: self.heuristic.h_batch(states, goal_description))
+
+
+HEURISTICS = {'truedistance': HospitalTrueDistanceHeuristics}
+EVALUATIONS = {'single': TimedHeuristic, 'batch': TimedBatchHeuristic}
+
+
+def solve(level_name, heuristic_name, evaluation_name, box_goals_only, max_states):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    if box_goals_only:
+        # The states keep count of the satisfied goals of the level, but not of other goal descriptions
+        goal_description = HospitalGoalDescription(level, level.box_goals)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = EVALUATIONS[evaluation_name](HEURISTICS[heuristic_name](), max_states)
+    frontier = FrontierAStar(heuristic)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    start_time = time.perf_counter()
+    try:
+        solved, plan, _, _ = graph_search(initial_state, action_set, goal_description, frontier)
+        length = str(len(plan)) if solved else 'fail'
+    except EvaluationLimitReached:
+        length = 'limit'
+    elapsed_time = time.perf_counter() - start_time
+    return length, heuristic.num_states, elapsed_time, heuristic.total_time / max(heuristic.num_states, 1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Single vs. batched heuristic evaluation benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko3_16', 'SAsoko3_64', 'MAPF02', 'MAPF03'])
+    parser.add_argument('--box-goals-only', action='store_true', help='Search for the box goals of the levels only.')
+    parser.add_argument('--max-states', type=int, default=100000, help='Evaluated state limit per search.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':16s} {'heuristic':12s} {'evaluation':10s} {'length':>6s} {'#evaluated':>10s} {'time (s)':>9s} "
+          f"{'h (us)':>8s}")
+    for level_name in args.levels:
+        for heuristic_name in HEURISTICS:
+            for evaluation_name in EVALUATIONS:
+                result = run_with_timeout(solve, (level_name, heuristic_name, evaluation_name, args.box_goals_only,
+                                                  args.max_states), args.timeout)
+                if result is None:
+                    print(f"{level_name:16s} {heuristic_name:12s} {evaluation_name:10s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s} {'-':>8s}")
+                else:
+                    length, num_evaluated, elapsed_time, h_time = result
+                    print(f"{level_name:16s} {heuristic_name:12s} {evaluation_name:10s} {length:>6s} "
+                          f"{num_evaluated:10d} {elapsed_time:9.2f} {h_time * 1e6:8.1f}")
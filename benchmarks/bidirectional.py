@@ -0,0 +1,62 @@
+# Compares breadth-first search and A* with bidirectional search (see search_algorithms/bidirectional.py) on levels
+# without boxes where every agent has a goal (other levels are reported as n/a). Every plan is replayed from the initial state, checking that each joint
+# action is applicable and conflict free and that the last state is a goal state.
+import argparse
+import random
+
+from common import load_level, run_with_timeout
+from domains.hospital import HospitalState, HospitalTrueDistanceHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY
+from search_algorithms.graph_search import graph_search
+from search_algorithms.bidirectional import bidirectional_search, goal_state_of
+from strategies.bfs import FrontierBFS
+from strategies.bestfirst import FrontierAStar
+
+
+SEARCHES = ['bfs', 'astar', 'bidirectional']
+
+
+def is_valid_plan(initial_state, plan, goal_description):
+    current_state = initial_state
+    for joint_action in plan:
+        if not current_state.is_applicable(joint_action) or current_state.is_conflicting(joint_action):
+            return False
+        current_state = current_state.result(joint_action)
+    return goal_description.is_goal(current_state)
+
+
+def solve(level_name, search_name):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    if goal_state_of(initial_state, goal_description) is None:
+        return 'n/a', 0, 0.0, '-'
+    if search_name == 'bidirectional':
+        result = bidirectional_search(initial_state, action_set, goal_description)
+    else:
+        frontier = FrontierBFS() if search_name == 'bfs' else FrontierAStar(HospitalTrueDistanceHeuristics())
+        result = graph_search(initial_state, action_set, goal_description, frontier)
+    solved, plan, num_expanded, elapsed_time = result
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    valid = 'yes' if is_valid_plan(initial_state, plan, goal_description) else 'NO'
+    return str(len(plan)) if solved else 'fail', num_expanded, elapsed_time, valid
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bidirectional search benchmark.')
+    parser.add_argument('levels', nargs='*', default=['MAPF00', 'MAPF02C', 'MAPF03C', 'MAPFreorder', 'MAPFreorder2',
+                                                      'MAPFslidingpuzzle', 'BFSfriendly', 'ExampleMaze', 'SAlabyrinth',
+                                                      'SAlabyrinthOfStBertin', 'SAmicromouseContest2011'])
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':24s} {'search':14s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} {'valid':>5s}")
+    for level_name in args.levels:
+        for search_name in SEARCHES:
+            result = run_with_timeout(solve, (level_name, search_name), args.timeout)
+            if result is None:
+                print(f"{level_name:24s} {search_name:14s} {'-':>6s} {'-':>10s} {'timeout':>9s} {'-':>5s}")
+            else:
+                length, num_expanded, elapsed_time, valid = result
+                print(f"{level_name:24s} {search_name:14s} {length:>6s} {num_expanded:10d} {elapsed_time:9.2f} "
+                      f"{valid:>5s}")
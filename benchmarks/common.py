@@ -0,0 +1,39 @@
+# Shared helpers for the benchmark scripts in this directory.
+# The scripts import the search client the same way searchclient.py does, i.e. with the searchclient directory on the
+# path, so they can be run from the repository root, e.g. `python benchmarks/state_memory.py SAsoko3_08`.
+import os
+import sys
+
+REPOSITORY_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(REPOSITORY_DIR, "searchclient"))
+
+from domains.hospital import HospitalLevel, HospitalGoalDescription
+
+
+def load_level_file_from_path(path):
+    with open(path, "r") as f:
+        lines = f.readlines()
+        lines = list(map(lambda line: line.strip(), lines))
+        return lines
+
+
+def load_level(level_name):
+    """Loads levels/<level_name>.lvl and returns the level together with its goal description"""
+    level_path = os.path.join(REPOSITORY_DIR, "levels", level_name + ".lvl")
+    level = HospitalLevel.parse_level_lines(load_level_file_from_path(level_path))
+    goal_description = HospitalGoalDescription(level, level.box_goals + level.agent_goals)
+    return level, goal_description
+
+
+def run_with_timeout(function, args, timeout):
+    """
+    Runs function(*args) in a separate process and returns its result, or None if it did not finish within timeout
+    seconds. This allows benchmarks to include configurations which are known to blow up on some levels.
+    """
+    import multiprocessing
+    with multiprocessing.Pool(1) as pool:
+        async_result = pool.apply_async(function, args)
+        try:
+            return async_result.get(timeout)
+        except multiprocessing.TimeoutError:
+            return None
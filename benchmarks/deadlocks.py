@@ -0,0 +1,56 @@
+# Measures the effect of deadlock pruning (HospitalDeadlockDetector) on push/pull levels. Besides the default action
+# library, the levels are solved with a push-only library, in which boxes cannot be pulled out of corners again and
+# many more cells are dead.
+import argparse
+import random
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalDeadlockDetector, HospitalMatchingHeuristics, PullAction,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+from strategies.bfs import FrontierBFS
+
+PUSH_ONLY_ACTION_LIBRARY = [action for action in DEFAULT_HOSPITAL_ACTION_LIBRARY
+                            if not isinstance(action, PullAction)]
+LIBRARIES = {'default': DEFAULT_HOSPITAL_ACTION_LIBRARY, 'push-only': PUSH_ONLY_ACTION_LIBRARY}
+STRATEGIES = {'bfs': lambda: FrontierBFS(), 'greedy': lambda: FrontierGreedy(HospitalMatchingHeuristics()),
+              'astar': lambda: FrontierAStar(HospitalMatchingHeuristics())}
+
+
+def solve(level_name, strategy_name, library_name, prune):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    action_set = [LIBRARIES[library_name]] * level.num_agents
+    deadlock_detector = HospitalDeadlockDetector(level, action_set) if prune else None
+    solved, plan, num_generated, elapsed_time = graph_search(initial_state, action_set, goal_description,
+                                                             STRATEGIES[strategy_name](),
+                                                             deadlock_detector=deadlock_detector)
+    num_pruned = deadlock_detector.num_pruned if prune else 0
+    return solved, len(plan), num_generated, elapsed_time, num_pruned
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Deadlock pruning benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SApushing', 'SAboXboXboX', 'SAsoko3_08', 'SAsoko3_16'])
+    parser.add_argument('--strategies', nargs='*', default=['greedy', 'astar'], choices=list(STRATEGIES))
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':12s} {'strategy':8s} {'library':9s} {'pruning':7s} {'length':>6s} {'#generated':>10s} "
+          f"{'#pruned':>8s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        for strategy_name in args.strategies:
+            for library_name in LIBRARIES:
+                for prune in (False, True):
+                    result = run_with_timeout(solve, (level_name, strategy_name, library_name, prune), args.timeout)
+                    pruning = 'on' if prune else 'off'
+                    if result is None:
+                        print(f"{level_name:12s} {strategy_name:8s} {library_name:9s} {pruning:7s} {'-':>6s} "
+                              f"{'-':>10s} {'-':>8s} {'timeout':>9s}")
+                    else:
+                        solved, plan_length, num_generated, elapsed_time, num_pruned = result
+                        length = str(plan_length) if solved else 'fail'
+                        print(f"{level_name:12s} {strategy_name:8s} {library_name:9s} {pruning:7s} {length:>6s} "
+                              f"{num_generated:10d} {num_pruned:8d} {elapsed_time:9.2f}")
@@ -0,0 +1,61 @@
+# Compares breadth-first search with external-memory breadth-first search (see search_algorithms/external_bfs.py),
+# which keeps its layers in sorted files on disk instead of a frontier and an expanded set in memory. The peak memory
+# is the largest resident set size of the process running the search, which includes the memory used before the
+# search starts. Every plan is replayed from the initial state, checking that each joint action is applicable and
+# conflict free and that the last state is a goal state.
+import argparse
+import random
+import resource
+
+from common import load_level, run_with_timeout
+from domains.hospital import HospitalState, DEFAULT_HOSPITAL_ACTION_LIBRARY
+from search_algorithms.graph_search import graph_search
+from search_algorithms.external_bfs import external_bfs
+from strategies.bfs import FrontierBFS
+from strategies.externalbfs import StrategyExternalBFS, DEFAULT_BUFFER_SIZE
+
+
+def is_valid_plan(initial_state, plan, goal_description):
+    current_state = initial_state
+    for joint_action in plan:
+        if not current_state.is_applicable(joint_action) or current_state.is_conflicting(joint_action):
+            return False
+        current_state = current_state.result(joint_action)
+    return goal_description.is_goal(current_state)
+
+
+def solve(level_name, search_name, buffer_size):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    if search_name == 'external':
+        result = external_bfs(initial_state, action_set, goal_description, StrategyExternalBFS(None, buffer_size))
+    else:
+        result = graph_search(initial_state, action_set, goal_description, FrontierBFS())
+    solved, plan, num_expanded, elapsed_time = result
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    valid = 'yes' if is_valid_plan(initial_state, plan, goal_description) else 'NO'
+    return str(len(plan)) if solved else 'fail', num_expanded, elapsed_time, peak_memory, valid
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='External-memory breadth-first search benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko1_16', 'SAsoko2_16', 'MAPF02C', 'MAPFslidingpuzzle'])
+    parser.add_argument('--buffer-size', type=int, default=DEFAULT_BUFFER_SIZE,
+                        help='Number of states external-memory BFS buffers before writing them to disk.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':20s} {'search':10s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} {'peak (MB)':>9s} "
+          f"{'valid':>5s}")
+    for level_name in args.levels:
+        for search_name in ['bfs', 'external']:
+            result = run_with_timeout(solve, (level_name, search_name, args.buffer_size), args.timeout)
+            if result is None:
+                print(f"{level_name:20s} {search_name:10s} {'-':>6s} {'-':>10s} {'timeout':>9s} {'-':>9s} {'-':>5s}")
+            else:
+                length, num_expanded, elapsed_time, peak_memory, valid = result
+                print(f"{level_name:20s} {search_name:10s} {length:>6s} {num_expanded:10d} {elapsed_time:9.2f} "
+                      f"{peak_memory:9.1f} {valid:>5s}")
@@ -0,0 +1,63 @@
+# Measures the time per state of the goal test and the goal count heuristic, comparing the constant time versions based
+# on the number of satisfied goals kept by the states with scanning all goals of the goal description.
+# The states are taken from a random walk through the level.
+import argparse
+import random
+import time
+
+from common import load_level
+from domains.hospital import HospitalState, HospitalGoalCountHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY
+
+
+def scan_is_goal(state, goal_description):
+    for (goal_position, goal_char, is_positive_literal) in goal_description.goals:
+        char = state.object_at(goal_position)
+        if (goal_char == char) != is_positive_literal:
+            return False
+    return True
+
+
+def scan_goal_count(state, goal_description):
+    num_unsatisfied_goals = 0
+    for (goal_position, goal_char, is_positive_literal) in goal_description.goals:
+        if (goal_char == state.object_at(goal_position)) != is_positive_literal:
+            num_unsatisfied_goals += 1
+    return num_unsatisfied_goals
+
+
+def random_walk(level, num_states):
+    random.seed(1)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    states = []
+    for _ in range(num_states):
+        states.append(state)
+        state = state.result(random.choice(state.get_applicable_actions(action_set)))
+    return states
+
+
+def measure(function, states, goal_description):
+    start_time = time.perf_counter()
+    for state in states:
+        function(state, goal_description)
+    return (time.perf_counter() - start_time) / len(states)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Goal test and goal count benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko1_128', 'SAsoko2_128', 'SAsoko3_128', 'SAsoko3_64',
+                                                      'SAbispebjergHospital'])
+    parser.add_argument('--states', type=int, default=10000, help='Number of states on the random walk.')
+    args = parser.parse_args()
+
+    print("Times in microseconds per state")
+    print(f"{'level':22s} {'#goals':>6s} {'scan is_goal':>12s} {'is_goal':>8s} {'scan h':>8s} {'h':>8s}")
+    for level_name in args.levels:
+        level, goal_description = load_level(level_name)
+        states = random_walk(level, args.states)
+        heuristic = HospitalGoalCountHeuristics()
+        heuristic.preprocess(level)
+        times = [measure(function, states, goal_description) * 1e6
+                 for function in [scan_is_goal, lambda state, goal_description: goal_description.is_goal(state),
+                                  scan_goal_count, heuristic.h]]
+        print(f"{level_name:22s} {level.num_goals:6d} {times[0]:12.2f} {times[1]:8.2f} {times[2]:8.2f} {times[3]:8.2f}")
@@ -0,0 +1,95 @@
+# Measures the speedup of hash-distributed A* (see search_algorithms/hda_star.py) over A* with the number of worker
+# processes. The speedup is the time of A* divided by the time of HDA*, both including the heuristic preprocessing of
+# the search itself, and the expansion ratio shows how many more states the workers expand in total than A* does.
+# Speedups above 1 require at least as many free cores as workers. Every plan is replayed from the initial state,
+# checking that each joint action is applicable and conflict free and that the last state is a goal state. The default
+# levels include MAbispebjerg, with 10 agents and 22 boxes, which neither A* nor HDA* solves within the default time
+# limit on a single core.
+import argparse
+import multiprocessing
+import os
+import random
+
+from common import load_level
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalTrueDistanceHeuristics,
+                              HospitalIndividualCostsHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from search_algorithms.hda_star import hda_star
+from strategies.bestfirst import FrontierAStar
+from strategies.hdastar import StrategyHDAStar
+
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'truedistance': HospitalTrueDistanceHeuristics,
+              'maxsic': lambda: HospitalIndividualCostsHeuristics(use_max=True)}
+
+
+def is_valid_plan(initial_state, plan, goal_description):
+    current_state = initial_state
+    for joint_action in plan:
+        if not current_state.is_applicable(joint_action) or current_state.is_conflicting(joint_action):
+            return False
+        current_state = current_state.result(joint_action)
+    return goal_description.is_goal(current_state)
+
+
+def solve(level_name, heuristic_name, num_workers):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    if num_workers == 0:
+        result = graph_search(initial_state, action_set, goal_description, FrontierAStar(HEURISTICS[heuristic_name]()))
+    else:
+        strategy = StrategyHDAStar(HEURISTICS[heuristic_name](), num_workers)
+        result = hda_star(initial_state, action_set, goal_description, strategy)
+    solved, plan, num_expanded, elapsed_time = result
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    valid = 'yes' if is_valid_plan(initial_state, plan, goal_description) else 'NO'
+    return str(len(plan)) if solved else 'fail', num_expanded, elapsed_time, valid
+
+
+def run_in_process(function, args, timeout):
+    """
+    Runs function(*args) in a separate process like common.run_with_timeout, but not in a pool, as the daemonic pool
+    processes cannot start the workers of HDA*. Returns None if the function did not finish within timeout seconds.
+    """
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=lambda: results.put(function(*args)))
+    process.start()
+    try:
+        return results.get(timeout=timeout)
+    except multiprocessing.queues.Empty:
+        return None
+    finally:
+        # The workers of HDA* exit by themselves once the process running the search is gone
+        process.terminate()
+        process.join()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HDA* speedup benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko2_32', 'SAsoko3_08', 'MAPF02C', 'MAPF03C', 'MAbispebjerg'])
+    parser.add_argument('--heuristic', default='maxsic', choices=list(HEURISTICS))
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"# {os.cpu_count()} cores, heuristic {args.heuristic}")
+    print(f"{'level':12s} {'search':8s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} {'speedup':>7s} "
+          f"{'exp ratio':>9s} {'valid':>5s}")
+    for level_name in args.levels:
+        baseline = None
+        for num_workers in [0] + args.workers:
+            search_name = 'astar' if num_workers == 0 else f"hda*/{num_workers}"
+            result = run_in_process(solve, (level_name, args.heuristic, num_workers), args.timeout)
+            if result is None:
+                print(f"{level_name:12s} {search_name:8s} {'-':>6s} {'-':>10s} {'timeout':>9s} {'-':>7s} {'-':>9s} "
+                      f"{'-':>5s}")
+                continue
+            length, num_expanded, elapsed_time, valid = result
+            if num_workers == 0:
+                baseline = (num_expanded, elapsed_time)
+            speedup = f"{baseline[1] / elapsed_time:7.2f}" if baseline is not None else f"{'-':>7s}"
+            ratio = f"{num_expanded / max(1, baseline[0]):9.2f}" if baseline is not None else f"{'-':>9s}"
+            print(f"{level_name:12s} {search_name:8s} {length:>6s} {num_expanded:10d} {elapsed_time:9.2f} {speedup} "
+                  f"{ratio} {valid:>5s}")
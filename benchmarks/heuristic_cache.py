@@ -0,0 +1,97 @@
+# Compares heuristics with and without HospitalBoxCacheHeuristics, which caches the part of the heuristic value only
+# depending on the boxes, using greedy best-first search and A*. The cached values are identical, so the searches are
+# identical and only the time per evaluated state differs. Most searches on the larger Sokoban levels do not finish, so
+# they are stopped after a fixed number of evaluations. Lowering --cache-megabytes shows the effect of evictions.
+# Note that the heuristics are evaluated in full without the cache, also the advanced heuristic (see h_incremental).
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalAdvancedHeuristics, HospitalTrueDistanceHeuristics,
+                              HospitalMatchingHeuristics, HospitalPatternDatabaseHeuristics,
+                              HospitalBoxCacheHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+
+class EvaluationLimitReached(Exception):
+    pass
+
+
+class TimedHeuristic:
+    """Wraps a heuristic and measures the total time spent in h, stopping the search after max_calls evaluations"""
+
+    def __init__(self, heuristic, max_calls):
+        self.heuristic = heuristic
+        self.max_calls = max_calls
+        self.num_calls = 0
+        self.total_time = 0.0
+
+    def preprocess(self, level):
+        self.heuristic.preprocess(level)
+
+    def h(self, state, goal_description):
+        if self.num_calls == self.max_calls:
+            raise EvaluationLimitReached()
+        start_time = time.perf_counter()
+        value = self.heuristic.h(state, goal_description)
+        self.total_time += time.perf_counter() - start_time
+        self.num_calls += 1
+        return value
+
+
+HEURISTICS = {'advanced': HospitalAdvancedHeuristics, 'truedistance': HospitalTrueDistanceHeuristics,
+              'matching': HospitalMatchingHeuristics, 'patterndb': HospitalPatternDatabaseHeuristics}
+STRATEGIES = {'greedy': FrontierGreedy, 'astar': FrontierAStar}
+
+
+def solve(level_name, strategy_name, heuristic_name, cache_bytes, max_evaluations):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = HEURISTICS[heuristic_name]()
+    if cache_bytes is not None:
+        heuristic = HospitalBoxCacheHeuristics(heuristic, cache_bytes)
+    timed_heuristic = TimedHeuristic(heuristic, max_evaluations)
+    frontier = STRATEGIES[strategy_name](timed_heuristic)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    try:
+        solved, plan, _, _ = graph_search(initial_state, action_set, goal_description, frontier)
+        length = str(len(plan)) if solved else 'fail'
+    except EvaluationLimitReached:
+        length = 'limit'
+    h_time = timed_heuristic.total_time / max(timed_heuristic.num_calls, 1)
+    if cache_bytes is None:
+        return length, timed_heuristic.num_calls, h_time, '-', '-'
+    return length, timed_heuristic.num_calls, h_time, str(heuristic.num_hits), str(heuristic.num_misses)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Heuristic box configuration cache benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko3_16', 'SAsoko3_32', 'SAsoko3_64'])
+    parser.add_argument('--strategies', nargs='*', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--heuristics', nargs='*', default=list(HEURISTICS), choices=list(HEURISTICS))
+    parser.add_argument('--cache-megabytes', type=float, default=1024, help='Byte budget of the cache in MiB.')
+    parser.add_argument('--max-evaluations', type=int, default=50000, help='Evaluation limit per search.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+    cache_bytes = int(args.cache_megabytes * 1024 * 1024)
+
+    print(f"{'level':16s} {'strategy':8s} {'heuristic':12s} {'cache':5s} {'length':>6s} {'#evaluated':>10s} "
+          f"{'h (us)':>8s} {'#hits':>8s} {'#misses':>8s}")
+    for level_name in args.levels:
+        for strategy_name in args.strategies:
+            for heuristic_name in args.heuristics:
+                for cache_name in ('no', 'yes'):
+                    result = run_with_timeout(solve, (level_name, strategy_name, heuristic_name,
+                                                      cache_bytes if cache_name == 'yes' else None,
+                                                      args.max_evaluations), args.timeout)
+                    if result is None:
+                        print(f"{level_name:16s} {strategy_name:8s} {heuristic_name:12s} {cache_name:5s} "
+                              f"{'-':>6s} {'-':>10s} {'timeout':>8s} {'-':>8s} {'-':>8s}")
+                    else:
+                        length, num_evaluated, h_time, num_hits, num_misses = result
+                        print(f"{level_name:16s} {strategy_name:8s} {heuristic_name:12s} {cache_name:5s} "
+                              f"{length:>6s} {num_evaluated:10d} {h_time * 1e6:8.1f} {num_hits:>8s} "
+                              f"{num_misses:>8s}")
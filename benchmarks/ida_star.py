@@ -0,0 +1,63 @@
+# Compares A* with IDA* (see search_algorithms/ida_star.py) for a few transposition table sizes. IDA* expands states
+# more than once, but its memory use only grows with the depth of the search and the size of its transposition table,
+# whereas A* keeps every generated state. The peak memory of every search is measured as the largest resident set
+# size of the process running it.
+import argparse
+import random
+import resource
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalTrueDistanceHeuristics,
+                              HospitalIndividualCostsHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from search_algorithms.ida_star import ida_star
+from strategies.bestfirst import FrontierAStar
+from strategies.idastar import StrategyIDAStar
+
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'truedistance': HospitalTrueDistanceHeuristics,
+              'maxsic': lambda: HospitalIndividualCostsHeuristics(use_max=True)}
+# A* and IDA* with the given number of transposition table entries
+SEARCHES = {'astar': None, 'idastar/0': 0, 'idastar/16k': 1 << 14, 'idastar/1M': 1 << 20}
+
+
+def solve(level_name, heuristic_name, search_name, operator_decomposition):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = HEURISTICS[heuristic_name]()
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    table_size = SEARCHES[search_name]
+    if table_size is None:
+        result = graph_search(initial_state, action_set, goal_description, FrontierAStar(heuristic),
+                              operator_decomposition)
+    else:
+        result = ida_star(initial_state, action_set, goal_description, StrategyIDAStar(heuristic, table_size),
+                          operator_decomposition)
+    solved, plan, num_expanded, elapsed_time = result
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return str(len(plan)) if solved else 'fail', num_expanded, elapsed_time, peak_memory
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='A* vs. IDA* benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko1_16', 'SAsoko2_16', 'MAPF02', 'MAPF02C', 'MAPF03'])
+    parser.add_argument('--heuristics', nargs='*', default=['truedistance', 'maxsic'], choices=list(HEURISTICS))
+    parser.add_argument('--operator-decomposition', action='store_true', help='Use operator decomposition.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':12s} {'heuristic':12s} {'search':12s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} "
+          f"{'peak (MB)':>9s}")
+    for level_name in args.levels:
+        for heuristic_name in args.heuristics:
+            for search_name in SEARCHES:
+                result = run_with_timeout(solve, (level_name, heuristic_name, search_name,
+                                                  args.operator_decomposition), args.timeout)
+                if result is None:
+                    print(f"{level_name:12s} {heuristic_name:12s} {search_name:12s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s} {'-':>9s}")
+                else:
+                    length, num_expanded, elapsed_time, peak_memory = result
+                    print(f"{level_name:12s} {heuristic_name:12s} {search_name:12s} {length:>6s} "
+                          f"{num_expanded:10d} {elapsed_time:9.2f} {peak_memory:9.1f}")
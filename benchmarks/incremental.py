@@ -0,0 +1,100 @@
+# Compares evaluating the goal count and advanced heuristics from scratch for every state with evaluating them
+# incrementally from the value of the parent (see h_incremental), using greedy best-first search and A*.
+# Both evaluations give the same values, so the searches are identical and only the time spent in the heuristic per
+# evaluated state differs. Neither heuristic solves the larger Sokoban levels, so the searches are stopped after a
+# fixed number of evaluations, which still gives the time per evaluation.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalAdvancedHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+
+class EvaluationLimitReached(Exception):
+    pass
+
+
+class TimedHeuristic:
+    """Wraps a heuristic and measures the total time spent in h, stopping the search after max_calls evaluations"""
+
+    def __init__(self, heuristic, max_calls):
+        self.heuristic = heuristic
+        self.max_calls = max_calls
+        self.num_calls = 0
+        self.total_time = 0.0
+
+    def preprocess(self, level):
+        self.heuristic.preprocess(level)
+
+    def h(self, state, goal_description):
+        if self.num_calls == self.max_calls:
+            raise EvaluationLimitReached()
+        start_time = time.perf_counter()
+        value = self.heuristic.h(state, goal_description)
+        self.total_time += time.perf_counter() - start_time
+        self.num_calls += 1
+        return value
+
+
+class TimedIncrementalHeuristic(TimedHeuristic):
+    """Wraps a heuristic and measures the total time spent in h and h_incremental"""
+
+    def h_incremental(self, state, parent_value, goal_description):
+        if self.num_calls == self.max_calls:
+            raise EvaluationLimitReached()
+        start_time = time.perf_counter()
+        value = self.heuristic.h_incremental(state, parent_value, goal_description)
+        self.total_time += time.perf_counter() - start_time
+        self.num_calls += 1
+        return value
+
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'advanced': HospitalAdvancedHeuristics}
+STRATEGIES = {'greedy': FrontierGreedy, 'astar': FrontierAStar}
+EVALUATIONS = {'full': TimedHeuristic, 'incremental': TimedIncrementalHeuristic}
+
+
+def solve(level_name, strategy_name, heuristic_name, evaluation_name, max_evaluations):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = EVALUATIONS[evaluation_name](HEURISTICS[heuristic_name](), max_evaluations)
+    frontier = STRATEGIES[strategy_name](heuristic)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    start_time = time.perf_counter()
+    try:
+        solved, plan, _, _ = graph_search(initial_state, action_set, goal_description, frontier)
+        length = str(len(plan)) if solved else 'fail'
+    except EvaluationLimitReached:
+        length = 'limit'
+    elapsed_time = time.perf_counter() - start_time
+    return length, heuristic.num_calls, elapsed_time, heuristic.total_time / max(heuristic.num_calls, 1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Full vs. incremental heuristic evaluation benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko3_64'])
+    parser.add_argument('--strategies', nargs='*', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--max-evaluations', type=int, default=100000, help='Evaluation limit per search.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':16s} {'strategy':8s} {'heuristic':9s} {'evaluation':11s} {'length':>6s} {'#evaluated':>10s} "
+          f"{'time (s)':>9s} {'h (us)':>8s}")
+    for level_name in args.levels:
+        for strategy_name in args.strategies:
+            for heuristic_name in HEURISTICS:
+                for evaluation_name in EVALUATIONS:
+                    result = run_with_timeout(solve, (level_name, strategy_name, heuristic_name, evaluation_name,
+                                                      args.max_evaluations), args.timeout)
+                    if result is None:
+                        print(f"{level_name:16s} {strategy_name:8s} {heuristic_name:9s} {evaluation_name:11s} "
+                              f"{'-':>6s} {'-':>10s} {'timeout':>9s} {'-':>8s}")
+                    else:
+                        length, num_evaluated, elapsed_time, h_time = result
+                        print(f"{level_name:16s} {strategy_name:8s} {heuristic_name:9s} {evaluation_name:11s} "
+                              f"{length:>6s} {num_evaluated:10d} {elapsed_time:9.2f} {h_time * 1e6:8.1f}")
@@ -0,0 +1,52 @@
+# Compares the goal count, advanced and true distance heuristics with the sum and the maximum of the individual costs
+# (HospitalIndividualCostsHeuristics) on the multi-agent path finding levels using greedy best-first search and A*,
+# optionally with operator decomposition. Only A* with the maximum individual cost is guaranteed to find shortest plans.
+import argparse
+import random
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalAdvancedHeuristics,
+                              HospitalTrueDistanceHeuristics, HospitalIndividualCostsHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'advanced': HospitalAdvancedHeuristics,
+              'truedistance': HospitalTrueDistanceHeuristics, 'sic': HospitalIndividualCostsHeuristics,
+              'maxsic': lambda: HospitalIndividualCostsHeuristics(use_max=True)}
+STRATEGIES = {'greedy': FrontierGreedy, 'astar': FrontierAStar}
+
+
+def solve(level_name, strategy_name, heuristic_name, operator_decomposition):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    frontier = STRATEGIES[strategy_name](HEURISTICS[heuristic_name]())
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    return graph_search(initial_state, action_set, goal_description, frontier, operator_decomposition)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Individual costs heuristic benchmark on the MAPF levels.')
+    parser.add_argument('levels', nargs='*', default=['MAPF00', 'MAPF01', 'MAPF02', 'MAPF02B', 'MAPF02C', 'MAPF03',
+                                                      'MAPF03B', 'MAPF03C'])
+    parser.add_argument('--strategies', nargs='*', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--operator-decomposition', action='store_true', help='Use operator decomposition.')
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':10s} {'strategy':8s} {'heuristic':12s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        for strategy_name in args.strategies:
+            for heuristic_name in HEURISTICS:
+                result = run_with_timeout(solve, (level_name, strategy_name, heuristic_name,
+                                                  args.operator_decomposition), args.timeout)
+                if result is None:
+                    print(f"{level_name:10s} {strategy_name:8s} {heuristic_name:12s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s}")
+                else:
+                    solved, plan, num_expanded, elapsed_time = result
+                    length = str(len(plan)) if solved else 'fail'
+                    print(f"{level_name:10s} {strategy_name:8s} {heuristic_name:12s} {length:>6s} "
+                          f"{num_expanded:10d} {elapsed_time:9.2f}")
@@ -0,0 +1,75 @@
+# Measures the throughput of joint action generation, comparing HospitalState.get_applicable_actions, which combines
+# the individual actions agent by agent using their conflict masks, with filtering the full product of the individual
+# actions through is_conflicting afterwards. The states are taken from a random walk through the level.
+import argparse
+import itertools
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import HospitalState, CompactHospitalState, DEFAULT_HOSPITAL_ACTION_LIBRARY
+
+STATE_CLASSES = {'plain': HospitalState, 'compact': CompactHospitalState}
+
+
+def product_joint_actions(state, action_set):
+    """The joint actions of the state computed by checking every combination of the individual actions"""
+    num_agents = len(action_set)
+    applicable_actions = [state.get_applicable_agent_actions(agent_index, action_set)
+                          for agent_index in range(num_agents)]
+    return [joint_action for joint_action in itertools.product(*applicable_actions)
+            if not state.is_conflicting(joint_action)]
+
+
+def masked_joint_actions(state, action_set):
+    return state.get_applicable_actions(action_set)
+
+
+def random_walk(level_name, state_class, num_states):
+    random.seed(1)
+    level, _ = load_level(level_name)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    state = state_class(level, level.initial_agent_positions, level.initial_box_positions)
+    states = []
+    for _ in range(num_states):
+        states.append(state)
+        # Pick a random individual action for each agent until they do not conflict, as enumerating all joint actions
+        # is too slow on levels with many agents
+        while True:
+            joint_action = [random.choice(state.get_applicable_agent_actions(agent_index, action_set))
+                            for agent_index in range(level.num_agents)]
+            if not state.is_conflicting(joint_action):
+                break
+        state = state.result(joint_action)
+    return states, action_set
+
+
+def measure(level_name, state_class_name, generator_name, num_states):
+    states, action_set = random_walk(level_name, STATE_CLASSES[state_class_name], num_states)
+    generator = {'product': product_joint_actions, 'masked': masked_joint_actions}[generator_name]
+    num_joint_actions = 0
+    start_time = time.perf_counter()
+    for state in states:
+        num_joint_actions += len(generator(state, action_set))
+    return num_joint_actions, time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Joint action generation throughput benchmark.')
+    parser.add_argument('levels', nargs='*', default=['MAPFreorder', 'MAPFreorder2', 'MAPFreorder3',
+                                                      'MAPFslidingpuzzle', 'MAbispebjerg', 'MAbispebjergHospital'])
+    parser.add_argument('--states', type=int, default=200, help='Number of states on the random walk.')
+    parser.add_argument('--state', default='plain', choices=STATE_CLASSES.keys())
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per measurement in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':22s} {'generator':10s} {'#joint actions':>14s} {'time (s)':>9s} {'joint actions/s':>15s}")
+    for level_name in args.levels:
+        for generator_name in ['product', 'masked']:
+            result = run_with_timeout(measure, (level_name, args.state, generator_name, args.states), args.timeout)
+            if result is None:
+                print(f"{level_name:22s} {generator_name:10s} {'-':>14s} {'timeout':>9s} {'-':>15s}")
+            else:
+                num_joint_actions, elapsed_time = result
+                print(f"{level_name:22s} {generator_name:10s} {num_joint_actions:14d} {elapsed_time:9.2f} "
+                      f"{num_joint_actions / elapsed_time:15.0f}")
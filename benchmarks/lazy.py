@@ -0,0 +1,81 @@
+# Compares greedy best-first search evaluating the heuristic of every generated child (eager) with deferred evaluation,
+# where the children are added with the value of their parent and only evaluated when popped (lazy), with and without
+# the queue of preferred successors (see FrontierGreedy). Lazy evaluation expands more states, as the priorities are
+# less informed, but saves the evaluation of most generated states, which pays off on levels with many agents. Large
+# levels like MAbispebjergHospital are not solved in reasonable time either way, so the searches are stopped after a
+# fixed number of expansions, which still shows the number of expansions per second.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalAdvancedHeuristics,
+                              HospitalTrueDistanceHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierGreedy
+
+
+class ExpansionLimitReached(Exception):
+    pass
+
+
+class LimitedFrontierGreedy(FrontierGreedy):
+    """Stops the search once max_expansions states have been popped"""
+
+    def __init__(self, heuristic, max_expansions, **kwargs):
+        super().__init__(heuristic, **kwargs)
+        self.max_expansions = max_expansions
+        self.num_expansions = 0
+
+    def pop(self):
+        if self.num_expansions == self.max_expansions:
+            raise ExpansionLimitReached()
+        self.num_expansions += 1
+        return super().pop()
+
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'advanced': HospitalAdvancedHeuristics,
+              'truedistance': HospitalTrueDistanceHeuristics}
+EVALUATIONS = {'eager': {}, 'lazy': {'lazy': True}, 'preferred': {'lazy': True, 'preferred': True}}
+
+
+def solve(level_name, heuristic_name, evaluation_name, operator_decomposition, max_expansions):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    frontier = LimitedFrontierGreedy(HEURISTICS[heuristic_name](), max_expansions, **EVALUATIONS[evaluation_name])
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    start_time = time.perf_counter()
+    try:
+        solved, plan, _, _ = graph_search(initial_state, action_set, goal_description, frontier,
+                                          operator_decomposition)
+        length = str(len(plan)) if solved else 'fail'
+    except ExpansionLimitReached:
+        length = 'limit'
+    return length, frontier.num_expansions, time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Eager vs. lazy heuristic evaluation in greedy search benchmark.')
+    parser.add_argument('levels', nargs='*', default=['MAbispebjergHospital', 'SAbispebjergHospital', 'MAPF03C',
+                                                      'SAsoko3_16'])
+    parser.add_argument('--heuristics', nargs='*', default=list(HEURISTICS), choices=list(HEURISTICS))
+    parser.add_argument('--operator-decomposition', action='store_true', help='Use operator decomposition.')
+    parser.add_argument('--max-expansions', type=int, default=20000, help='Expansion limit per search.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':22s} {'heuristic':12s} {'evaluation':10s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} "
+          f"{'#exp/s':>8s}")
+    for level_name in args.levels:
+        for heuristic_name in args.heuristics:
+            for evaluation_name in EVALUATIONS:
+                result = run_with_timeout(solve, (level_name, heuristic_name, evaluation_name,
+                                                  args.operator_decomposition, args.max_expansions), args.timeout)
+                if result is None:
+                    print(f"{level_name:22s} {heuristic_name:12s} {evaluation_name:10s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s} {'-':>8s}")
+                else:
+                    length, num_expanded, elapsed_time = result
+                    print(f"{level_name:22s} {heuristic_name:12s} {evaluation_name:10s} {length:>6s} "
+                          f"{num_expanded:10d} {elapsed_time:9.2f} {num_expanded / elapsed_time:8.0f}")
@@ -0,0 +1,78 @@
+# Compares HospitalAdvancedHeuristics (Manhattan distances to the closest unmet goals) with HospitalMatchingHeuristics
+# (minimum cost box to goal assignments over true distances) using greedy best-first search and A*.
+# Besides the number of generated states, it reports the time per heuristic evaluation, for the matching heuristic
+# both with the assignments repaired from the parent and solved from scratch for every state.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalAdvancedHeuristics, HospitalMatchingHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+
+class FromScratchMatchingHeuristics(HospitalMatchingHeuristics):
+    """Solves the assignment problems of every state from scratch"""
+
+    def parent_assignments(self, state):
+        return None
+
+
+class TimedHeuristic:
+    """Wraps a heuristic and measures the total time spent in h"""
+
+    def __init__(self, heuristic):
+        self.heuristic = heuristic
+        self.num_calls = 0
+        self.total_time = 0.0
+
+    def preprocess(self, level):
+        self.heuristic.preprocess(level)
+
+    def h(self, state, goal_description):
+        start_time = time.perf_counter()
+        value = self.heuristic.h(state, goal_description)
+        self.total_time += time.perf_counter() - start_time
+        self.num_calls += 1
+        return value
+
+
+HEURISTICS = {'advanced': HospitalAdvancedHeuristics, 'matching': HospitalMatchingHeuristics,
+              'scratch': FromScratchMatchingHeuristics}
+STRATEGIES = {'greedy': FrontierGreedy, 'astar': FrontierAStar}
+
+
+def solve(level_name, strategy_name, heuristic_name):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = TimedHeuristic(HEURISTICS[heuristic_name]())
+    frontier = STRATEGIES[strategy_name](heuristic)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    solved, plan, num_generated, elapsed_time = graph_search(initial_state, action_set, goal_description, frontier)
+    return solved, len(plan), num_generated, elapsed_time, heuristic.total_time / max(heuristic.num_calls, 1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Closest goal vs. matching heuristic benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko3_08', 'SAsoko3_16', 'SAsoko3_32', 'SAsoko3_64',
+                                                      'SAsorting'])
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':16s} {'strategy':8s} {'heuristic':9s} {'length':>6s} {'#generated':>10s} {'time (s)':>9s} "
+          f"{'h (us)':>8s}")
+    for level_name in args.levels:
+        for strategy_name in STRATEGIES:
+            for heuristic_name in HEURISTICS:
+                result = run_with_timeout(solve, (level_name, strategy_name, heuristic_name), args.timeout)
+                if result is None:
+                    print(f"{level_name:16s} {strategy_name:8s} {heuristic_name:9s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s} {'-':>8s}")
+                else:
+                    solved, plan_length, num_generated, elapsed_time, h_time = result
+                    length = str(plan_length) if solved else 'fail'
+                    print(f"{level_name:16s} {strategy_name:8s} {heuristic_name:9s} {length:>6s} "
+                          f"{num_generated:10d} {elapsed_time:9.2f} {h_time * 1e6:8.1f}")
@@ -0,0 +1,58 @@
+# Runs A*, beam search and SMA* (see strategies/beam.py and strategies/smastar.py) with a memory limit. Once the
+# memory usage of the process exceeds the limit, A* gives up, beam search halves its width and SMA* caps its frontier
+# and forgets its worst states. The peak memory is the largest resident set size of the process running the search,
+# which includes the memory used before the search starts.
+import argparse
+import random
+import resource
+
+from common import load_level, run_with_timeout
+import memory
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalTrueDistanceHeuristics,
+                              HospitalIndividualCostsHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar
+from strategies.beam import FrontierBeam
+from strategies.smastar import FrontierSMAStar
+
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'truedistance': HospitalTrueDistanceHeuristics,
+              'maxsic': lambda: HospitalIndividualCostsHeuristics(use_max=True)}
+FRONTIERS = {'astar': FrontierAStar, 'beam/100': lambda heuristic: FrontierBeam(heuristic, 100),
+             'beam/1000': lambda heuristic: FrontierBeam(heuristic, 1000), 'smastar': FrontierSMAStar}
+
+
+def solve(level_name, heuristic_name, frontier_name, max_memory):
+    random.seed(1)
+    memory.max_usage = max_memory
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    frontier = FRONTIERS[frontier_name](HEURISTICS[heuristic_name]())
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    solved, plan, num_expanded, elapsed_time = graph_search(initial_state, action_set, goal_description, frontier)
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return str(len(plan)) if solved else 'fail', num_expanded, elapsed_time, peak_memory
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memory-bounded search benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko2_64', 'SAsoko3_08', 'MAPF03C'])
+    parser.add_argument('--heuristics', nargs='*', default=['truedistance', 'maxsic'], choices=list(HEURISTICS))
+    parser.add_argument('--max-memory', type=float, default=200, help='Memory limit of the searches in MB.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':12s} {'heuristic':12s} {'search':10s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} "
+          f"{'peak (MB)':>9s}")
+    for level_name in args.levels:
+        for heuristic_name in args.heuristics:
+            for frontier_name in FRONTIERS:
+                result = run_with_timeout(solve, (level_name, heuristic_name, frontier_name,
+                                                  args.max_memory * 1024 * 1024), args.timeout)
+                if result is None:
+                    print(f"{level_name:12s} {heuristic_name:12s} {frontier_name:10s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s} {'-':>9s}")
+                else:
+                    length, num_expanded, elapsed_time, peak_memory = result
+                    print(f"{level_name:12s} {heuristic_name:12s} {frontier_name:10s} {length:>6s} "
+                          f"{num_expanded:10d} {elapsed_time:9.2f} {peak_memory:9.1f}")
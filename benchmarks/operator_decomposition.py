@@ -0,0 +1,44 @@
+# Compares full joint expansion with operator decomposition in graph_search using A* on the multi-agent MAPF levels.
+# Box-free levels use the MAPF action library, all others the hospital action library.
+import argparse
+import random
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalAdvancedHeuristics,
+                              DEFAULT_MAPF_ACTION_LIBRARY, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar
+
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'advanced': HospitalAdvancedHeuristics}
+
+
+def solve(level_name, heuristic_name, operator_decomposition):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    action_library = DEFAULT_MAPF_ACTION_LIBRARY if level.num_boxes == 0 else DEFAULT_HOSPITAL_ACTION_LIBRARY
+    frontier = FrontierAStar(HEURISTICS[heuristic_name]())
+    solved, plan, num_generated, elapsed_time = graph_search(initial_state, [action_library] * level.num_agents,
+                                                             goal_description, frontier, operator_decomposition)
+    return solved, len(plan), num_generated, elapsed_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Joint expansion vs. operator decomposition benchmark.')
+    parser.add_argument('levels', nargs='*', default=['MAPF00', 'MAPF01', 'MAPF02', 'MAPF02B', 'MAPF02C', 'MAPF03',
+                                                      'MAPF03B', 'MAPF03C', 'MAPFslidingpuzzle'])
+    parser.add_argument('--heuristic', default='goalcount', choices=HEURISTICS.keys())
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':20s} {'expansion':10s} {'length':>6s} {'#generated':>10s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        for operator_decomposition in [False, True]:
+            mode = 'OD' if operator_decomposition else 'joint'
+            result = run_with_timeout(solve, (level_name, args.heuristic, operator_decomposition), args.timeout)
+            if result is None:
+                print(f"{level_name:20s} {mode:10s} {'-':>6s} {'-':>10s} {'timeout':>9s}")
+            else:
+                solved, plan_length, num_generated, elapsed_time = result
+                length = str(plan_length) if solved else 'fail'
+                print(f"{level_name:20s} {mode:10s} {length:>6s} {num_generated:10d} {elapsed_time:9.2f}")
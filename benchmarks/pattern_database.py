@@ -0,0 +1,65 @@
+# Compares HospitalMatchingHeuristics with HospitalPatternDatabaseHeuristics on the SAsoko levels using greedy
+# best-first search and A*. It also reports the time to build the pattern database of each level and the time to load
+# it again from disk, as subsequent runs and parallel workers do.
+import argparse
+import random
+import shutil
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalMatchingHeuristics, HospitalPatternDatabaseHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from domains.hospital.pattern_database import PATTERN_DATABASE_DIR, PatternDatabase
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+HEURISTICS = {'matching': HospitalMatchingHeuristics, 'pdb': HospitalPatternDatabaseHeuristics}
+STRATEGIES = {'greedy': FrontierGreedy, 'astar': FrontierAStar}
+
+
+def solve(level_name, strategy_name, heuristic_name):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    frontier = STRATEGIES[strategy_name](HEURISTICS[heuristic_name]())
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    solved, plan, num_generated, elapsed_time = graph_search(initial_state, action_set, goal_description, frontier)
+    return solved, len(plan), num_generated, elapsed_time
+
+
+def timed_database(level):
+    start_time = time.perf_counter()
+    database = PatternDatabase(level)
+    return database, time.perf_counter() - start_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Matching vs. pattern database heuristic benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko1_32', 'SAsoko1_128', 'SAsoko2_32', 'SAsoko2_128',
+                                                      'SAsoko3_08', 'SAsoko3_16', 'SAsoko3_32', 'SAsorting'])
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    # Start from an empty directory such that the build times are measured
+    shutil.rmtree(PATTERN_DATABASE_DIR, ignore_errors=True)
+    print(f"{'level':12s} {'#pairs':>6s} {'build (s)':>9s} {'load (s)':>8s}")
+    for level_name in args.levels:
+        level, _ = load_level(level_name)
+        database, build_time = timed_database(level)
+        _, load_time = timed_database(level)
+        print(f"{level_name:12s} {len(database.pair_patterns):6d} {build_time:9.2f} {load_time:8.3f}")
+    print()
+
+    print(f"{'level':12s} {'strategy':8s} {'heuristic':9s} {'length':>6s} {'#generated':>10s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        for strategy_name in STRATEGIES:
+            for heuristic_name in HEURISTICS:
+                result = run_with_timeout(solve, (level_name, strategy_name, heuristic_name), args.timeout)
+                if result is None:
+                    print(f"{level_name:12s} {strategy_name:8s} {heuristic_name:9s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s}")
+                else:
+                    solved, plan_length, num_generated, elapsed_time = result
+                    length = str(plan_length) if solved else 'fail'
+                    print(f"{level_name:12s} {strategy_name:8s} {heuristic_name:9s} {length:>6s} "
+                          f"{num_generated:10d} {elapsed_time:9.2f}")
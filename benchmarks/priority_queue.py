@@ -0,0 +1,84 @@
+# Compares the heap based PriorityQueue with the BucketPriorityQueue and its tie-breaking policies.
+# The microbenchmark replays the access pattern of A* without a search: every pop is followed by adding a few children
+# with a priority slightly above the popped one, which keeps the priorities small integers close to each other. The
+# search benchmark runs A* with every queue, where the tie-breaking policy also changes the states expanded.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalGoalCountHeuristics, HospitalTrueDistanceHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, PriorityQueue, BucketPriorityQueue, TIE_BREAKING_POLICIES
+
+
+QUEUES = [None] + list(TIE_BREAKING_POLICIES)
+HEURISTICS = {'goalcount': HospitalGoalCountHeuristics, 'truedistance': HospitalTrueDistanceHeuristics}
+
+
+def queue_name(tie_breaking):
+    return 'heap' if tie_breaking is None else f"bucket/{tie_breaking}"
+
+
+def replay(tie_breaking, num_pops, branching_factor):
+    """Returns the time in seconds per add and pop of replaying num_pops pops of an A*-like search"""
+    rng = random.Random(1)
+    random.seed(1)
+    queue = PriorityQueue() if tie_breaking is None else BucketPriorityQueue(tie_breaking)
+    # Draw the priorities up front, such that only the queue operations are timed
+    increments = [rng.choice((0, 0, 0, 1, 2)) for _ in range(num_pops * branching_factor)]
+    # The priority of every element, indexed by the element
+    priorities = [0]
+    num_operations = 1
+    start_time = time.perf_counter()
+    queue.add(0, 0)
+    for pop_idx in range(num_pops):
+        if queue.size() == 0:
+            break
+        priority = priorities[queue.pop()]
+        for child_idx in range(branching_factor):
+            child_priority = priority + increments[pop_idx * branching_factor + child_idx]
+            queue.add(len(priorities), child_priority, 0, child_idx, child_priority - child_idx)
+            priorities.append(child_priority)
+        num_operations += 1 + branching_factor
+    return (time.perf_counter() - start_time) / num_operations
+
+
+def solve(level_name, heuristic_name, tie_breaking):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    frontier = FrontierAStar(HEURISTICS[heuristic_name](), tie_breaking=tie_breaking)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    solved, plan, num_expanded, elapsed_time = graph_search(initial_state, action_set, goal_description, frontier)
+    return solved, len(plan), num_expanded, elapsed_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Heap vs. bucket priority queue benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko1_16', 'SAsoko2_08', 'MAPF02', 'MAPF02C', 'MAPF03'])
+    parser.add_argument('--heuristics', nargs='*', default=list(HEURISTICS), choices=list(HEURISTICS))
+    parser.add_argument('--pops', type=int, default=200000, help='Number of pops of the microbenchmark.')
+    parser.add_argument('--branching-factor', type=int, default=4, help='Children added per pop.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'queue':14s} {'add/pop (ns)':>12s}")
+    for tie_breaking in QUEUES:
+        print(f"{queue_name(tie_breaking):14s} {replay(tie_breaking, args.pops, args.branching_factor) * 1e9:12.0f}")
+
+    print()
+    print(f"{'level':12s} {'heuristic':12s} {'queue':14s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        for heuristic_name in args.heuristics:
+            for tie_breaking in QUEUES:
+                result = run_with_timeout(solve, (level_name, heuristic_name, tie_breaking), args.timeout)
+                if result is None:
+                    print(f"{level_name:12s} {heuristic_name:12s} {queue_name(tie_breaking):14s} {'-':>6s} "
+                          f"{'-':>10s} {'timeout':>9s}")
+                else:
+                    solved, length, num_expanded, elapsed_time = result
+                    length = str(length) if solved else 'fail'
+                    print(f"{level_name:12s} {heuristic_name:12s} {queue_name(tie_breaking):14s} {length:>6s} "
+                          f"{num_expanded:10d} {elapsed_time:9.2f}")
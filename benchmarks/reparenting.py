@@ -0,0 +1,65 @@
+# Compares A* skipping children which are already in the frontier (skip) with A* moving such states to the cheaper
+# path (improve, see FrontierAStar.improve). Re-parenting only happens with inconsistent heuristics like the advanced
+# heuristic, and lowers the priority of the state by invalidating its entry, so the number of invalidated (stale)
+# entries in the priority queue and the number of times it was compacted are reported as well.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalAdvancedHeuristics, HospitalTrueDistanceHeuristics,
+                              HospitalMatchingHeuristics, DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar
+
+
+class SkippingFrontierAStar(FrontierAStar):
+    """A* keeping the first path found to every state in the frontier"""
+
+    def improve(self, state):
+        return False
+
+
+HEURISTICS = {'advanced': HospitalAdvancedHeuristics, 'truedistance': HospitalTrueDistanceHeuristics,
+              'matching': HospitalMatchingHeuristics}
+FRONTIERS = {'skip': SkippingFrontierAStar, 'improve': FrontierAStar}
+
+
+def solve(level_name, heuristic_name, frontier_name, tie_breaking):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    frontier = FRONTIERS[frontier_name](HEURISTICS[heuristic_name](), tie_breaking=tie_breaking)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    start_time = time.perf_counter()
+    solved, plan, num_expanded, _ = graph_search(initial_state, action_set, goal_description, frontier)
+    priority_queue = frontier.priority_queue
+    return (str(len(plan)) if solved else 'fail', num_expanded, time.perf_counter() - start_time,
+            frontier.num_reparented, priority_queue.num_entries(), priority_queue.num_stale,
+            priority_queue.num_compactions)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='A* re-parenting and priority queue compaction benchmark.')
+    parser.add_argument('levels', nargs='*', default=['MAPF02', 'MAPF02C', 'MAPF03'])
+    parser.add_argument('--heuristics', nargs='*', default=list(HEURISTICS), choices=list(HEURISTICS))
+    parser.add_argument('--tie-breaking', help='Use a bucket priority queue with this tie-breaking policy.')
+    parser.add_argument('--timeout', type=float, default=300, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':12s} {'heuristic':12s} {'frontier':8s} {'length':>6s} {'#expanded':>10s} {'time (s)':>9s} "
+          f"{'#re-parented':>12s} {'#entries':>9s} {'#stale':>8s} {'#compactions':>12s}")
+    for level_name in args.levels:
+        for heuristic_name in args.heuristics:
+            for frontier_name in FRONTIERS:
+                result = run_with_timeout(solve, (level_name, heuristic_name, frontier_name, args.tie_breaking),
+                                          args.timeout)
+                if result is None:
+                    print(f"{level_name:12s} {heuristic_name:12s} {frontier_name:8s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s}")
+                else:
+                    length, num_expanded, elapsed_time, num_reparented, num_entries, num_stale, num_compactions = \
+                        result
+                    print(f"{level_name:12s} {heuristic_name:12s} {frontier_name:8s} {length:>6s} "
+                          f"{num_expanded:10d} {elapsed_time:9.2f} {num_reparented:12d} {num_entries:9d} "
+                          f"{num_stale:8d} {num_compactions:12d}")
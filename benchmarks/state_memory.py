@@ -0,0 +1,56 @@
+# Measures the number of bytes used per stored state for HospitalState and CompactHospitalState.
+# Both representations run the same breadth-first expansion (closed set + FIFO frontier) until a fixed number of
+# states have been generated, and the traced memory is divided by the number of stored states.
+import argparse
+import time
+import tracemalloc
+from collections import deque
+
+from common import load_level
+from domains.hospital import HospitalState, CompactHospitalState, DEFAULT_HOSPITAL_ACTION_LIBRARY
+
+
+def expand(initial_state, action_set, max_states):
+    expanded = set()
+    frontier = deque([initial_state])
+    frontier_set = {initial_state}
+    while frontier and len(expanded) + len(frontier) < max_states:
+        node = frontier.popleft()
+        frontier_set.remove(node)
+        expanded.add(node)
+        for joint_action in node.get_applicable_actions(action_set):
+            child = node.result(joint_action)
+            if child not in expanded and child not in frontier_set:
+                frontier.append(child)
+                frontier_set.add(child)
+    return expanded, frontier
+
+
+def measure(state_class, level, max_states):
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    # Time is measured in a separate run since tracing allocations slows down the search considerably
+    start_time = time.time()
+    expand(state_class(level, level.initial_agent_positions, level.initial_box_positions), action_set, max_states)
+    elapsed_time = time.time() - start_time
+
+    tracemalloc.start()
+    initial_state = state_class(level, level.initial_agent_positions, level.initial_box_positions)
+    expanded, frontier = expand(initial_state, action_set, max_states)
+    used_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    num_states = len(expanded) + len(frontier)
+    return num_states, used_bytes / num_states, elapsed_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bytes-per-state benchmark of the hospital state representations.')
+    parser.add_argument('levels', nargs='*', default=['SAsoko3_64', 'SAsoko2_128', 'MAbispebjergHospital'])
+    parser.add_argument('--max-states', type=int, default=50000, help='Number of states to generate per level.')
+    args = parser.parse_args()
+
+    print(f"{'level':24s} {'representation':22s} {'states':>8s} {'bytes/state':>12s} {'time (s)':>9s}")
+    for level_name in args.levels:
+        level, _ = load_level(level_name)
+        for state_class in [HospitalState, CompactHospitalState]:
+            num_states, bytes_per_state, elapsed_time = measure(state_class, level, args.max_states)
+            print(f"{level_name:24s} {state_class.__name__:22s} {num_states:8d} {bytes_per_state:12.1f} {elapsed_time:9.2f}")
@@ -0,0 +1,52 @@
+# Compares HospitalAdvancedHeuristics (Manhattan distances) with HospitalTrueDistanceHeuristics (wall-aware distances)
+# using greedy best-first search and A* on maze-like levels.
+import argparse
+import random
+import time
+
+from common import load_level, run_with_timeout
+from domains.hospital import (HospitalState, HospitalAdvancedHeuristics, HospitalTrueDistanceHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar, FrontierGreedy
+
+HEURISTICS = {'advanced': HospitalAdvancedHeuristics, 'truedistance': HospitalTrueDistanceHeuristics}
+STRATEGIES = {'greedy': FrontierGreedy, 'astar': FrontierAStar}
+
+
+def solve(level_name, strategy_name, heuristic_name):
+    random.seed(1)
+    level, goal_description = load_level(level_name)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    heuristic = HEURISTICS[heuristic_name]()
+    # The frontier preprocesses the heuristic as well, but we time the preprocessing separately
+    start_time = time.perf_counter()
+    heuristic.preprocess(level)
+    preprocess_time = time.perf_counter() - start_time
+    frontier = STRATEGIES[strategy_name](heuristic)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    solved, plan, num_generated, elapsed_time = graph_search(initial_state, action_set, goal_description, frontier)
+    return solved, len(plan), num_generated, elapsed_time, preprocess_time
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manhattan vs. true distance heuristic benchmark.')
+    parser.add_argument('levels', nargs='*', default=['SAlabyrinthOfStBertin', 'SAfriendofDFS',
+                                                      'SAlabyrinth', 'SAsoko3_08', 'SAsoko3_16'])
+    parser.add_argument('--timeout', type=float, default=120, help='Time limit per search in seconds.')
+    args = parser.parse_args()
+
+    print(f"{'level':22s} {'strategy':8s} {'heuristic':12s} {'length':>6s} {'#generated':>10s} {'time (s)':>9s} "
+          f"{'preprocess (s)':>14s}")
+    for level_name in args.levels:
+        for strategy_name in STRATEGIES:
+            for heuristic_name in HEURISTICS:
+                result = run_with_timeout(solve, (level_name, strategy_name, heuristic_name), args.timeout)
+                if result is None:
+                    print(f"{level_name:22s} {strategy_name:8s} {heuristic_name:12s} {'-':>6s} {'-':>10s} "
+                          f"{'timeout':>9s} {'-':>14s}")
+                else:
+                    solved, plan_length, num_generated, elapsed_time, preprocess_time = result
+                    length = str(plan_length) if solved else 'fail'
+                    print(f"{level_name:22s} {strategy_name:8s} {heuristic_name:12s} {length:>6s} "
+                          f"{num_generated:10d} {elapsed_time:9.2f} {preprocess_time:14.3f}")
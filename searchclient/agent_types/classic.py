@@ -12,15 +12,46 @@
 # limitations under the License.
 
 from ..search_algorithms.graph_search import graph_search
+from ..search_algorithms.ida_star import ida_star
+from ..search_algorithms.ara_star import ara_star
+from ..search_algorithms.external_bfs import external_bfs
+from ..search_algorithms.hda_star import hda_star
+from ..search_algorithms.bidirectional import bidirectional_search, goal_state_of
+from ..strategies.idastar import StrategyIDAStar
+from ..strategies.arastar import StrategyARAStar
+from ..strategies.externalbfs import StrategyExternalBFS
+from ..strategies.hdastar import StrategyHDAStar
 from ..utils import *
 
 
-def classic_agent_type(level, initial_state, action_library, goal_description, frontier):
+def classic_agent_type(level, initial_state, action_library, goal_description, frontier, operator_decomposition=False,
+                       deadlock_detector=None, bidirectional=False):
 
     # Create an action set where all agents can perform all actions
     action_set = [action_library] * level.num_agents
     
-    planning_success, plan, num_generated, elapsed_time = graph_search(initial_state, action_set, goal_description, frontier)
+    # IDA*, ARA*, HDA* and external-memory BFS have no frontier and run their own search, with the same arguments and
+    # results as the graph search
+    if isinstance(frontier, StrategyIDAStar):
+        search = ida_star
+    elif isinstance(frontier, StrategyARAStar):
+        search = ara_star
+    elif isinstance(frontier, StrategyExternalBFS):
+        search = external_bfs
+    elif isinstance(frontier, StrategyHDAStar):
+        search = hda_star
+    else:
+        search = graph_search
+    # Levels without boxes where every agent has a goal can be searched from both ends at once, which gives plans of
+    # the same length as breadth-first search
+    if bidirectional:
+        if goal_state_of(initial_state, goal_description) is not None:
+            search = bidirectional_search
+        else:
+            print("Bidirectional search needs a level without boxes where every agent has a goal, searching forward",
+                  file=sys.stderr)
+    planning_success, plan, num_generated, elapsed_time = search(initial_state, action_set, goal_description, frontier,
+                                                                 operator_decomposition, deadlock_detector)
     print("this is the type" + str(type(elapsed_time)))
     if not planning_success:
         print("Unable to solve level.", file=sys.stderr)
@@ -15,6 +15,10 @@
 
 from domains.hospital.actions import *
 from domains.hospital.goal_description import HospitalGoalDescription
-from domains.hospital.heuristics import HospitalZeroHeuristic, HospitalGoalCountHeuristics, HospitalAdvancedHeuristics
+from domains.hospital.heuristics import HospitalZeroHeuristic, HospitalGoalCountHeuristics, HospitalAdvancedHeuristics, \
+    HospitalTrueDistanceHeuristics, HospitalIndividualCostsHeuristics, HospitalMatchingHeuristics, \
+    HospitalPatternDatabaseHeuristics, HospitalBoxCacheHeuristics
 from domains.hospital.level import HospitalLevel
 from domains.hospital.state import HospitalState
+from domains.hospital.compact_state import CompactHospitalState
+from domains.hospital.deadlocks import HospitalDeadlockDetector
@@ -45,9 +45,53 @@ direction_deltas = {
 #          prior to being moved by the action.
 # Note that 'agent_index' is the index of the agent in the state.agent_positions list which is often but *not always*
 # the same as the numerical value of the agent character.
+#
+# For the opt-in cell index mode used by CompactHospitalState, actions additionally implement
+# is_applicable_cells, result_cells and conflicts_cells. These do the same as the three methods above, but all
+# positions are flat cell indices (see HospitalLevel.cell_index) and neighbouring cells are found by adding the
+# precomputed HospitalLevel.direction_offsets, so no position tuples are created. result_cells writes the new cell
+# indices into a mutable copy of the packed cells of the state and returns the slot of the moved box (or -1).
+#
+# Finally, HospitalLevel.action_table precomputes which actions can be applicable at all in each cell given the walls.
+# For this, actions implement static_cells(level, agent_cell, num_agents), which returns the two cells the action
+# depends on (or None if the walls rule the action out), and is_unblocked(level, agent_char, object_at, first, second),
+# which only checks the dynamic occupancy of those two cells. object_at is either HospitalState.object_at (with the
+# cells converted to positions) or CompactHospitalState.object_at_cell, so the same check works in both modes.
+# The table also stores the conflict_mask(level, first, second) of each action, which encodes the destinations and
+# moved boxes of the conflicts method as bits of an integer (see conflict_bits), such that two actions are conflicting
+# exactly if their masks share a bit.
 
 
 Position = Tuple[int, int] # Only for type hinting
+Cell = int # Only for type hinting
+
+
+def conflict_bits(level, destinations: list[Cell], boxes_moved: list[Cell]) -> int:
+    """
+    Encodes the destinations and moved boxes of an action as a bit mask: a destination cell c sets bit c and a
+    moved box in cell c sets bit num_cells + c, such that the two kinds of conflicts are checked with a single AND.
+    """
+    mask = 0
+    for cell in destinations:
+        mask |= 1 << cell
+    for cell in boxes_moved:
+        mask |= 1 << (level.num_cells + cell)
+    return mask
+
+
+def conflict_free_joint_actions(agent_options: list[list[tuple[AnyAction, int]]]) -> list[tuple[AnyAction, ...]]:
+    """
+    Combines the (action, conflict mask) options of each agent into all joint actions without conflicts.
+    The joint actions are built one agent at a time and a partial joint action is dropped as soon as it conflicts,
+    so the combinations extending it are never generated. Filtered agents should have a conflict mask of 0.
+    """
+    partial_joint_actions = [((), 0)]
+    for options in agent_options:
+        partial_joint_actions = [(joint_action + (action,), used | mask)
+                                 for (joint_action, used) in partial_joint_actions
+                                 for (action, mask) in options if not used & mask]
+    return [joint_action for (joint_action, _) in partial_joint_actions]
+
 
 class NoOpAction:
 
@@ -67,6 +111,25 @@ class NoOpAction:
         boxes_moved = []
         return destinations, boxes_moved
 
+    def is_applicable_cells(self, agent_index: int, state) -> bool:
+        return len(state.layout.agent_chars) > 1
+
+    def static_cells(self, level, agent_cell: Cell, num_agents: int) -> tuple[Cell, Cell]:
+        return (agent_cell, -1) if num_agents > 1 else None
+
+    def is_unblocked(self, level, agent_char: str, object_at, first, second) -> bool:
+        return True
+
+    def conflict_mask(self, level, first: Cell, second: Cell) -> int:
+        # first is the current agent cell
+        return 1 << first
+
+    def result_cells(self, agent_index: int, state, cells) -> int:
+        return -1
+
+    def conflicts_cells(self, agent_index: int, state) -> tuple[list[Cell], list[Cell]]:
+        return [state.agent_cell(agent_index)], []
+
     def __repr__(self) -> str:
         return self.name
 
@@ -74,6 +137,7 @@ class NoOpAction:
 class MoveAction:
 
     def __init__(self, agent_direction):
+        self.agent_direction = agent_direction
         self.agent_delta = direction_deltas.get(agent_direction)
         self.name = "Move(%s)" % agent_direction
 
@@ -86,9 +150,9 @@ class MoveAction:
         return state.free_at(new_agent_position)
 
     def result(self, agent_index: int, state: h_state.HospitalState):
-        current_agent_position, agent_char = state.agent_positions[agent_index]
+        current_agent_position, _ = state.agent_positions[agent_index]
         new_agent_position = self.calculate_positions(current_agent_position)
-        state.agent_positions[agent_index] = (new_agent_position, agent_char)
+        state.move_agent(agent_index, new_agent_position)
 
     def conflicts(self, agent_index: int, state: h_state.HospitalState) -> tuple[list[Position], list[Position]]:
         current_agent_position, _ = state.agent_positions[agent_index]
@@ -99,12 +163,36 @@ class MoveAction:
         boxes_moved = []
         return destinations, boxes_moved
 
+    def is_applicable_cells(self, agent_index: int, state) -> bool:
+        new_agent_cell = state.agent_cell(agent_index) + state.level.direction_offsets[self.agent_direction]
+        return state.free_at_cell(new_agent_cell)
+
+    def result_cells(self, agent_index: int, state, cells) -> int:
+        cells[agent_index] += state.level.direction_offsets[self.agent_direction]
+        return -1
+
+    def conflicts_cells(self, agent_index: int, state) -> tuple[list[Cell], list[Cell]]:
+        return [state.agent_cell(agent_index) + state.level.direction_offsets[self.agent_direction]], []
+
+    def static_cells(self, level, agent_cell: Cell, num_agents: int) -> tuple[Cell, Cell]:
+        new_agent_cell = agent_cell + level.direction_offsets[self.agent_direction]
+        return None if level.wall_cells[new_agent_cell] else (new_agent_cell, -1)
+
+    def is_unblocked(self, level, agent_char: str, object_at, first, second) -> bool:
+        # first is the new agent cell
+        return object_at(first) == ''
+
+    def conflict_mask(self, level, first: Cell, second: Cell) -> int:
+        return 1 << first
+
     def __repr__(self):
         return self.name
 
 class PushAction:
     
     def __init__(self, move_dir_agent, move_dir_box):
+        self.agent_direction = move_dir_agent
+        self.box_direction = move_dir_box
         self.agent_delta = direction_deltas.get(move_dir_agent)
         self.box_delta = direction_deltas.get(move_dir_box)
         self.name = "Push(%s,%s)" % (move_dir_agent, move_dir_box)
@@ -126,13 +214,13 @@ class PushAction:
                and box_index != -1 and agent_color == box_color
 
     def result(self, agent_index: int, state: h_state.HospitalState):
-        current_agent_position, agent_char = state.agent_positions[agent_index]
+        current_agent_position, _ = state.agent_positions[agent_index]
         new_agent_position, new_box_position = self.calculate_positions(current_agent_position)
+        # move box (before the agent, since the agent moves into the cell of the box)
+        box_index, _ = state.box_at(new_agent_position)
+        state.move_box(box_index, new_box_position)
         # move agent
-        state.agent_positions[agent_index] = (new_agent_position, agent_char)
-        # move box
-        box_index, box_char = state.box_at(new_agent_position)
-        state.box_positions[box_index] = (new_box_position, box_char)
+        state.move_agent(agent_index, new_agent_position)
 
     def conflicts(self, agent_index: int, state: h_state.HospitalState) -> tuple[list[Position], list[Position]]:
         current_agent_position, _ = state.agent_positions[agent_index]
@@ -143,6 +231,46 @@ class PushAction:
         boxes_moved = [new_agent_position]
         return destinations, boxes_moved
 
+    def calculate_cells(self, state, agent_index: int) -> tuple[Cell, Cell]:
+        direction_offsets = state.level.direction_offsets
+        new_agent_cell = state.agent_cell(agent_index) + direction_offsets[self.agent_direction]
+        return new_agent_cell, new_agent_cell + direction_offsets[self.box_direction]
+
+    def is_applicable_cells(self, agent_index: int, state) -> bool:
+        new_agent_cell, new_box_cell = self.calculate_cells(state, agent_index)
+        box_index, box_char = state.box_at_cell(new_agent_cell)
+        if box_index == -1 or not state.free_at_cell(new_box_cell):
+            return False
+        colors = state.level.colors
+        return colors[state.layout.agent_chars[agent_index]] == colors[box_char]
+
+    def result_cells(self, agent_index: int, state, cells) -> int:
+        new_agent_cell, new_box_cell = self.calculate_cells(state, agent_index)
+        box_index, _ = state.box_at_cell(new_agent_cell)
+        box_slot = len(state.layout.agent_chars) + box_index
+        cells[agent_index] = new_agent_cell
+        cells[box_slot] = new_box_cell
+        return box_slot
+
+    def conflicts_cells(self, agent_index: int, state) -> tuple[list[Cell], list[Cell]]:
+        new_agent_cell, new_box_cell = self.calculate_cells(state, agent_index)
+        return [new_box_cell], [new_agent_cell]
+
+    def static_cells(self, level, agent_cell: Cell, num_agents: int) -> tuple[Cell, Cell]:
+        new_agent_cell = agent_cell + level.direction_offsets[self.agent_direction]
+        new_box_cell = new_agent_cell + level.direction_offsets[self.box_direction]
+        if level.wall_cells[new_agent_cell] or level.wall_cells[new_box_cell]:
+            return None
+        return new_agent_cell, new_box_cell
+
+    def is_unblocked(self, level, agent_char: str, object_at, first, second) -> bool:
+        # first is the current box cell (the new agent cell) and second is the new box cell
+        box_char = object_at(first)
+        return 'A' <= box_char <= 'Z' and level.colors[box_char] == level.colors[agent_char] and object_at(second) == ''
+
+    def conflict_mask(self, level, first: Cell, second: Cell) -> int:
+        return conflict_bits(level, [second], [first])
+
     def __repr__(self):
         return self.name
     
@@ -157,6 +285,8 @@ class PullAction:
 
     # Initialize the pull action class with the direction for agent and box movements
     def __init__(self, move_dir_agent, move_dir_box):
+        self.agent_direction = move_dir_agent
+        self.box_direction = move_dir_box
         self.agent_delta = direction_deltas.get(move_dir_agent) # Define the delta for agent movement
         self.box_delta = direction_deltas.get(move_dir_box) # Define the delta for box movement
         self.name = "Pull(%s,%s)" % (move_dir_agent, move_dir_box) # Set the name for the action
@@ -184,15 +314,15 @@ class PullAction:
 
     # Update state positions after performing pull action
     def result(self, agent_index: int, state: h_state.HospitalState):
-        # Get current agent position and character
-        current_agent_position, agent_char = state.agent_positions[agent_index]
+        # Get current agent position
+        current_agent_position, _ = state.agent_positions[agent_index]
         new_agent_position, old_box_position = self.calculate_positions(current_agent_position)
         # Update agent position after pull action
-        state.agent_positions[agent_index] = (new_agent_position, agent_char)
-        # Get box index and character if a box exists on position
-        box_index, box_char = state.box_at(old_box_position)
+        state.move_agent(agent_index, new_agent_position)
+        # Get box index if a box exists on position
+        box_index, _ = state.box_at(old_box_position)
         # Update box position after being pulled
-        state.box_positions[box_index] = (current_agent_position, box_char)
+        state.move_box(box_index, current_agent_position)
 
     # Check the conflicts in the new state
     def conflicts(self, agent_index: int, state: h_state.HospitalState) -> tuple[list[Position], list[Position]]:
@@ -204,6 +334,49 @@ class PullAction:
         # The old box position is no longer blocked after the pull action
         boxes_moved = [old_box_position]
         return destinations, boxes_moved
+
+    # Calculate new agent cell and old box cell based on the current agent cell
+    def calculate_cells(self, state, agent_index: int) -> tuple[Cell, Cell]:
+        direction_offsets = state.level.direction_offsets
+        current_agent_cell = state.agent_cell(agent_index)
+        return current_agent_cell + direction_offsets[self.agent_direction], \
+               current_agent_cell - direction_offsets[self.box_direction]
+
+    def is_applicable_cells(self, agent_index: int, state) -> bool:
+        new_agent_cell, old_box_cell = self.calculate_cells(state, agent_index)
+        box_index, box_char = state.box_at_cell(old_box_cell)
+        if box_index == -1 or not state.free_at_cell(new_agent_cell):
+            return False
+        colors = state.level.colors
+        return colors[state.layout.agent_chars[agent_index]] == colors[box_char]
+
+    def result_cells(self, agent_index: int, state, cells) -> int:
+        new_agent_cell, old_box_cell = self.calculate_cells(state, agent_index)
+        box_index, _ = state.box_at_cell(old_box_cell)
+        box_slot = len(state.layout.agent_chars) + box_index
+        # The box is pulled into the cell the agent leaves
+        cells[box_slot] = cells[agent_index]
+        cells[agent_index] = new_agent_cell
+        return box_slot
+
+    def conflicts_cells(self, agent_index: int, state) -> tuple[list[Cell], list[Cell]]:
+        new_agent_cell, old_box_cell = self.calculate_cells(state, agent_index)
+        return [new_agent_cell], [old_box_cell]
+
+    def static_cells(self, level, agent_cell: Cell, num_agents: int) -> tuple[Cell, Cell]:
+        new_agent_cell = agent_cell + level.direction_offsets[self.agent_direction]
+        old_box_cell = agent_cell - level.direction_offsets[self.box_direction]
+        if level.wall_cells[new_agent_cell] or level.wall_cells[old_box_cell]:
+            return None
+        return new_agent_cell, old_box_cell
+
+    def is_unblocked(self, level, agent_char: str, object_at, first, second) -> bool:
+        # first is the new agent cell and second is the current box cell
+        box_char = object_at(second)
+        return 'A' <= box_char <= 'Z' and level.colors[box_char] == level.colors[agent_char] and object_at(first) == ''
+
+    def conflict_mask(self, level, first: Cell, second: Cell) -> int:
+        return conflict_bits(level, [first], [second])
     
     # Return name of action when object is printed
     def __repr__(self):
@@ -0,0 +1,362 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import random
+import itertools
+from array import array
+
+import domains.hospital.level as h_level
+import domains.hospital.state as h_state
+import domains.hospital.actions as actions
+
+
+class CompactLayout:
+    """
+    A CompactLayout describes which character is stored at each slot of a packed state.
+    Agents keep their index, while boxes are grouped by letter (in alphabetical order) such that only the cell
+    indices of the boxes have to be stored in the states. Since the characters never change during search,
+    a single layout is shared by all states with the same agents and boxes.
+    """
+
+    __slots__ = ['agent_chars', 'box_chars', 'box_groups', 'slot_chars', 'slot_groups']
+
+    def __init__(self, agent_chars: tuple[str, ...], box_chars: tuple[str, ...]):
+        self.agent_chars = agent_chars
+        self.box_chars = box_chars
+        # Maps each box letter to the (start, end) range of its box indices
+        self.box_groups = {}
+        for (idx, box_char) in enumerate(box_chars):
+            start, _ = self.box_groups.get(box_char, (idx, idx))
+            self.box_groups[box_char] = (start, idx + 1)
+        # The character and the (start, end) slot range of the letter group of every slot in the packed cells,
+        # where slots [0, num_agents) hold the agents and the remaining slots hold the boxes
+        num_agents = len(agent_chars)
+        self.slot_chars = agent_chars + box_chars
+        self.slot_groups = [(slot, slot + 1) for slot in range(num_agents)]
+        for box_char in box_chars:
+            start, end = self.box_groups[box_char]
+            self.slot_groups.append((num_agents + start, num_agents + end))
+
+
+# Layouts only depend on the characters, so they are shared across levels and states
+_layouts = {}
+
+
+def get_layout(agent_chars: tuple[str, ...], box_chars: tuple[str, ...]) -> CompactLayout:
+    key = (agent_chars, box_chars)
+    layout = _layouts.get(key)
+    if layout is None:
+        layout = CompactLayout(agent_chars, box_chars)
+        _layouts[key] = layout
+    return layout
+
+
+def pack_cells(level: h_level.HospitalLevel,
+               agent_positions: list[tuple[tuple[int, int], str]],
+               box_positions: list[tuple[tuple[int, int], str]]) -> tuple[CompactLayout, bytes]:
+    """
+    Packs agent and box positions into a layout and a bytes object holding one unsigned 16 bit cell index per object.
+    Boxes are sorted by (letter, cell) which makes boxes of the same letter indistinguishable.
+    """
+    boxes = sorted((box_char, level.cell_index(box_position)) for (box_position, box_char) in box_positions)
+    layout = get_layout(tuple(agent_char for (_, agent_char) in agent_positions),
+                        tuple(box_char for (box_char, _) in boxes))
+    cells = array('H', [level.cell_index(agent_position) for (agent_position, _) in agent_positions])
+    cells.extend(cell for (_, cell) in boxes)
+    return layout, cells.tobytes()
+
+
+# graph_search calls get_applicable_actions once and then result once per applicable joint action on the same node,
+# while the heuristic is evaluated on each child in between. We therefore keep the decoded cells and the occupancy
+# maps (cell -> slot) of the two most recently used states around instead of storing them in every state, which would
+# defeat the purpose of the compact representation. The first entry is the most recently used one.
+_decoded_cache = [(None, None, None), (None, None, None)]
+
+
+class CompactHospitalState:
+    """
+    CompactHospitalState is a memory efficient drop-in replacement for HospitalState.
+    Instead of lists of ((row, col), char) tuples, all positions are stored as flat cell indices packed into a single
+    bytes object, while the characters are stored once in a shared CompactLayout. The hash value is computed once
+    when the state is created, and equality only compares the layout and the packed bytes.
+
+    The state exposes the same interface as HospitalState, so it can be used with graph_search, the frontiers and
+    the heuristics. Note that agent_positions and box_positions are decoded on access and return new lists, so
+    modifying them does not modify the state.
+
+    Successor generation runs in cell index mode: actions are checked and applied with their *_cells methods, which
+    work directly on the packed cell indices, so (row, col) tuples are only created at the edges, e.g. in __repr__
+    or when decoding positions for a heuristic.
+    """
+
+    __slots__ = ['level', 'layout', 'cells', 'parent', 'action', 'path_cost', '_hash', 'num_satisfied_goals']
+
+    def __init__(
+        self,
+        level: h_level.HospitalLevel,
+        agent_positions: list[tuple[tuple[int, int], str]],
+        box_positions: list[tuple[tuple[int, int], str]],
+        parent = None,
+        action: actions.AnyAction = None
+    ):
+        layout, cells = pack_cells(level, agent_positions, box_positions)
+        self._initialize(level, layout, cells, parent, action)
+
+    def _initialize(self, level, layout, cells, parent, action, num_satisfied_goals=None):
+        self.level = level
+        self.layout = layout
+        self.cells = cells
+        self.parent = parent
+        self.action = action
+        self.path_cost = 0 if parent is None else parent.path_cost + 1
+        self._hash = hash(cells)
+        # The number of satisfied goals of the level, see HospitalState. Children get it from result.
+        if num_satisfied_goals is None:
+            num_satisfied_goals = level.count_satisfied_goals(self.agent_positions + self.box_positions)
+        self.num_satisfied_goals = num_satisfied_goals
+
+    @staticmethod
+    def from_cells(level: h_level.HospitalLevel, layout: CompactLayout, cells: bytes,
+                   parent = None, action: actions.AnyAction = None,
+                   num_satisfied_goals: int = None) -> CompactHospitalState:
+        """
+        Creates a state directly from a layout and packed cells, i.e. without packing any positions.
+        The number of satisfied goals is computed from scratch unless it is given.
+        """
+        state = CompactHospitalState.__new__(CompactHospitalState)
+        state._initialize(level, layout, cells, parent, action, num_satisfied_goals)
+        return state
+
+    @staticmethod
+    def from_state(state: h_state.HospitalState) -> CompactHospitalState:
+        """Converts a HospitalState into a CompactHospitalState with the same positions and no parent"""
+        return CompactHospitalState(state.level, state.agent_positions, state.box_positions)
+
+    def unpack(self) -> h_state.HospitalState:
+        """Returns a HospitalState with the same positions as this state, but without parent and action"""
+        return h_state.HospitalState(self.level, self.agent_positions, self.box_positions)
+
+    def _decoded(self) -> tuple[tuple[int, ...], dict[int, int]]:
+        cache = _decoded_cache
+        if cache[0][0] is self:
+            return cache[0][1], cache[0][2]
+        if cache[1][0] is self:
+            cache[0], cache[1] = cache[1], cache[0]
+            return cache[0][1], cache[0][2]
+        cells = tuple(memoryview(self.cells).cast('H'))
+        occupancy = {cell: slot for (slot, cell) in enumerate(cells)}
+        cache[1] = cache[0]
+        cache[0] = (self, cells, occupancy)
+        return cells, occupancy
+
+    def unpacked_cells(self) -> tuple[int, ...]:
+        """Returns the cell index of every slot, i.e. the agents followed by the boxes"""
+        return self._decoded()[0]
+
+    def occupancy(self) -> dict[int, int]:
+        """Returns a map from the cell index of every agent and box to its slot in the packed cells"""
+        return self._decoded()[1]
+
+    @property
+    def agent_positions(self) -> list[tuple[tuple[int, int], str]]:
+        cells = self.unpacked_cells()
+        return [(self.level.cell_position(cells[idx]), agent_char)
+                for (idx, agent_char) in enumerate(self.layout.agent_chars)]
+
+    @property
+    def box_positions(self) -> list[tuple[tuple[int, int], str]]:
+        cells = self.unpacked_cells()
+        offset = len(self.layout.agent_chars)
+        return [(self.level.cell_position(cells[offset + idx]), box_char)
+                for (idx, box_char) in enumerate(self.layout.box_chars)]
+
+    def agent_cell(self, agent_index: int) -> int:
+        """Returns the cell index of the agent with the given index"""
+        return self.unpacked_cells()[agent_index]
+
+    def agent_at_cell(self, cell: int) -> tuple[int, str]:
+        """Returns the index and character of the agent at the given cell index, or -1,'' if there is none"""
+        slot = self.occupancy().get(cell, -1)
+        if 0 <= slot < len(self.layout.agent_chars):
+            return slot, self.layout.agent_chars[slot]
+        return -1, ''
+
+    def box_at_cell(self, cell: int) -> tuple[int, str]:
+        """Returns the index and character of the box at the given cell index, or -1,'' if there is none"""
+        slot = self.occupancy().get(cell, -1)
+        num_agents = len(self.layout.agent_chars)
+        if slot >= num_agents:
+            return slot - num_agents, self.layout.box_chars[slot - num_agents]
+        return -1, ''
+
+    def object_at_cell(self, cell: int) -> str:
+        """Returns the character of the object at the given cell index, or '' if there is none"""
+        slot = self.occupancy().get(cell)
+        return '' if slot is None else self.layout.slot_chars[slot]
+
+    def free_at_cell(self, cell: int) -> bool:
+        """Returns True iff there are no walls and no objects at the requested cell index"""
+        return not self.level.wall_cells[cell] and cell not in self.occupancy()
+
+    def agent_at(self, position: tuple[int, int]) -> tuple[int, str]:
+        """
+        Returns the index and character of the agent at the given position.
+        If there is no agent at the position, -1,'' is returned instead.
+        """
+        return self.agent_at_cell(self.level.cell_index(position))
+
+    def box_at(self, position: tuple[int, int]) -> tuple[int, str]:
+        """
+        Returns the index and character of the box at the given position.
+        If there is no box at the position, -1,'' is returned instead.
+        """
+        return self.box_at_cell(self.level.cell_index(position))
+
+    def object_at(self, position: tuple[int, int]) -> str:
+        """
+        Returns the character of the object at the given position.
+        If there is no object at the position, '' is returned instead.
+        """
+        return self.object_at_cell(self.level.cell_index(position))
+
+    def free_at(self, position: tuple[int, int]) -> bool:
+        """Returns True iff there are no objects at the requested location"""
+        return self.free_at_cell(self.level.cell_index(position))
+
+    def extract_plan(self) -> list[actions.AnyAction]:
+        """Extracts a plan from the search tree by walking backwards through the search tree"""
+        reverse_plan = []
+        current_node = self
+        while current_node.parent is not None:
+            reverse_plan.append(current_node.action)
+            current_node = current_node.parent
+        reverse_plan.reverse()
+        return reverse_plan
+
+    def is_conflicting(self, joint_action: list[actions.AnyAction]) -> bool:
+        """Returns true if any of the individual agent actions in the joint action results in a conflict"""
+        # All previously free cells which either an agent or box will move into during the joint action
+        destinations = set()
+        # All cells currently containing a box which will be moved during the joint action
+        active_boxes = set()
+
+        for agent_index, action in enumerate(joint_action):
+            action_destinations, action_boxes = action.conflicts_cells(agent_index, self)
+            for dest in action_destinations:
+                if dest in destinations:
+                    return True
+                destinations.add(dest)
+            for box in action_boxes:
+                if box in active_boxes:
+                    return True
+                active_boxes.add(box)
+
+        return False
+
+    def result(self, joint_action: list[actions.AnyAction]) -> CompactHospitalState:
+        """Computes the state resulting from applying a joint action to this state"""
+        cells = array('H', self.cells)
+        # The actions look up boxes by their slot in this state, so the moved boxes are only re-sorted afterwards
+        moved_box_slots = [action.result_cells(agent_index, self, cells)
+                           for (agent_index, action) in enumerate(joint_action)]
+        # Update the number of satisfied goals from the cells of the agents and boxes which moved
+        old_cells = self.unpacked_cells()
+        num_satisfied_goals = self.num_satisfied_goals
+        for slot in itertools.chain(range(len(joint_action)), moved_box_slots):
+            if slot != -1 and cells[slot] != old_cells[slot]:
+                num_satisfied_goals += self.level.goal_move_delta_cell(old_cells[slot], cells[slot],
+                                                                       self.layout.slot_chars[slot])
+        for box_slot in moved_box_slots:
+            # Keep the boxes of the moved letter sorted such that boxes of the same letter are indistinguishable
+            if box_slot != -1:
+                start, end = self.layout.slot_groups[box_slot]
+                if end - start > 1:
+                    cells[start:end] = array('H', sorted(cells[start:end]))
+        return CompactHospitalState.from_cells(self.level, self.layout, cells.tobytes(), self, joint_action,
+                                               num_satisfied_goals)
+
+    def result_of_plan(self, plan: list[list[actions.AnyAction]]) -> CompactHospitalState:
+        """Computes the state resulting from applying a sequence of joint actions (a plan) to this state"""
+        new_state = CompactHospitalState.from_cells(self.level, self.layout, self.cells)
+        for joint_action in plan:
+            new_state = new_state.result(joint_action)
+        return new_state
+
+    def is_applicable(self, joint_action: list[actions.AnyAction]) -> bool:
+        """Returns whether all individual actions in the joint_action is applicable in this state"""
+        for agent_index, action in enumerate(joint_action):
+            if not action.is_applicable_cells(agent_index, self):
+                return False
+        return True
+
+    def get_applicable_agent_actions(self, agent_index: int, action_set: list[list[actions.AnyAction]]):
+        """Returns a list of the actions applicable for a single agent, i.e. without consideration of conflicts"""
+        agent_char = self.layout.agent_chars[agent_index]
+        action_table = self.level.action_table(action_set[agent_index], len(self.layout.agent_chars))
+        # The action table of the level contains, for each cell, only the actions which are not ruled out by walls,
+        # so we just need to check whether the cells they depend on are occupied.
+        return [action for (action, first, second, _) in action_table[self.unpacked_cells()[agent_index]]
+                if action.is_unblocked(self.level, agent_char, self.object_at_cell, first, second)]
+
+    def get_applicable_agent_options(self, agent_index: int, action_set: list[list[actions.AnyAction]]):
+        """Returns the (action, conflict mask) pairs of the actions applicable for a single agent"""
+        agent_char = self.layout.agent_chars[agent_index]
+        action_table = self.level.action_table(action_set[agent_index], len(self.layout.agent_chars))
+        return [(action, mask) for (action, first, second, mask) in action_table[self.unpacked_cells()[agent_index]]
+                if action.is_unblocked(self.level, agent_char, self.object_at_cell, first, second)]
+
+    def get_applicable_actions(self, action_set: list[list[actions.AnyAction]]):
+        """Returns a list of all applicable joint_action in this state"""
+        num_agents = len(self.layout.agent_chars)
+
+        # Determine all applicable joint actions. We can skip the conflict checks if there only is one agent
+        applicable_joint_actions = []
+        if num_agents == 1:
+            for action in self.get_applicable_agent_actions(0, action_set):
+                applicable_joint_actions.append([action])
+        else:
+            # The applicable actions and their conflict masks are determined once for each individual agent, after
+            # which the joint actions are combined agent by agent, pruning every partial joint action which conflicts.
+            agent_options = [self.get_applicable_agent_options(agent_index, action_set)
+                             for agent_index in range(num_agents)]
+            applicable_joint_actions = actions.conflict_free_joint_actions(agent_options)
+
+        random.shuffle(applicable_joint_actions)
+        return applicable_joint_actions
+
+    def color_filter(self, color: str) -> CompactHospitalState:
+        """
+        Returns a copy of the current state where all entities, of another color than the color passed as an argument,
+        has been removed
+        """
+        return CompactHospitalState.from_state(self.unpack().color_filter(color))
+
+    def __repr__(self) -> str:
+        return repr(self.unpack())
+
+    def __eq__(self, other) -> bool:
+        """
+        Notice that we here only compare the layout and the packed cells, but ignore all other fields.
+        That means that two states with identical positions but e.g. different parent will be seen as equal.
+        """
+        if isinstance(other, self.__class__):
+            return self._hash == other._hash and self.cells == other.cells and self.layout is other.layout
+        else:
+            return False
+
+    def __ne__(self, other) -> bool:
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self._hash
@@ -0,0 +1,146 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+from collections import Counter
+
+import domains.hospital.actions as actions
+import domains.hospital.level as h_level
+import domains.hospital.state as h_state
+from utils import pos_add, pos_sub
+
+
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+class HospitalDeadlockDetector:
+    """
+    Detects states from which the goals of the level can never be reached because boxes have been moved to where they
+    can never get to a goal again. Only the boxes moved by the action leading to a state are checked, so a state is
+    considered deadlocked if one of these boxes
+    - is on a dead cell of its character (see HospitalLevel.dead_cells), or
+    - is frozen, i.e. it and the boxes blocking it can never be moved again, while one of the frozen boxes is on a
+      cell which is the goal of another character or is not on a goal of its own character.
+    Since the boxes of a character are interchangeable, a box which cannot reach a goal is only a deadlock if fewer
+    of the remaining boxes of its character than the goals of the character are left.
+
+    Whether a box can be pulled depends on the action libraries of the agents of its color, so the detector is created
+    for an action set. Boxes of a color without agents never move and are treated as walls.
+    """
+
+    def __init__(self, level: h_level.HospitalLevel, action_set: list[list[actions.AnyAction]]):
+        self.level = level
+        self.agent_colors = set()
+        self.pull_colors = set()
+        for ((_, agent_char), action_library) in zip(level.initial_agent_positions, action_set):
+            color = level.colors[agent_char]
+            self.agent_colors.add(color)
+            if any(isinstance(action, actions.PullAction) for action in action_library):
+                self.pull_colors.add(color)
+        # The number of boxes of each character beyond the number of its positive goals. This many boxes of the
+        # character may be stuck away from the goals without the goals becoming unreachable.
+        num_goals = Counter(char for (_, char, is_positive_literal) in level.box_goals if is_positive_literal)
+        num_boxes = Counter(char for (_, char) in level.initial_box_positions)
+        self.spare_boxes = {char: num_boxes[char] - num_goals[char] for char in num_boxes}
+        self.goal_chars = set(num_goals)
+        self.num_pruned = 0
+
+    def can_pull(self, box_char: str) -> bool:
+        return self.level.colors[box_char] in self.pull_colors
+
+    def is_movable(self, box_char: str) -> bool:
+        return self.level.colors[box_char] in self.agent_colors
+
+    def is_deadlocked(self, state: h_state.HospitalState) -> bool:
+        """Returns whether one of the boxes moved by the action leading to the state is in a deadlock"""
+        if state.parent is None:
+            return False
+        parent_boxes = set(state.parent.box_positions)
+        moved_boxes = [box for box in state.box_positions if box not in parent_boxes]
+        for (position, box_char) in moved_boxes:
+            if self.is_dead(state, position, box_char) or self.is_freeze_deadlocked(state, position):
+                self.num_pruned += 1
+                return True
+        return False
+
+    def is_dead(self, state: h_state.HospitalState, position: tuple[int, int], box_char: str) -> bool:
+        dead = self.level.dead_cells(box_char, self.can_pull(box_char))
+        if not dead[self.level.cell_index(position)]:
+            return False
+        return self.num_dead_boxes(state, box_char) > self.spare_boxes[box_char]
+
+    def num_dead_boxes(self, state: h_state.HospitalState, box_char: str) -> int:
+        dead = self.level.dead_cells(box_char, self.can_pull(box_char))
+        return sum(1 for (position, char) in state.box_positions
+                   if char == box_char and dead[self.level.cell_index(position)])
+
+    def is_freeze_deadlocked(self, state: h_state.HospitalState, position: tuple[int, int]) -> bool:
+        frozen = []
+        if not self.is_frozen(state, position, {}, frozen):
+            return False
+        off_goal = Counter()
+        for (box_position, box_char) in frozen:
+            goals = self.level.goals_at.get(box_position, ())
+            if any(goal_char != box_char and is_positive_literal for (goal_char, is_positive_literal) in goals):
+                return True
+            if box_char in self.goal_chars and (box_char, True) not in goals:
+                off_goal[box_char] += 1
+        return any(count > self.spare_boxes[char] for (char, count) in off_goal.items())
+
+    def is_frozen(self, state, position, checked, frozen) -> bool:
+        """
+        Returns whether the box at the position can never be moved again, which is the case if it cannot be moved in
+        any direction because of walls and other frozen boxes. The boxes being checked are treated as walls while the
+        boxes around them are checked, so boxes blocking each other are frozen together. checked maps the positions of
+        the boxes checked so far to whether they count as walls, and the frozen boxes found are added to frozen. If
+        the box turns out not to be frozen, the boxes found frozen assuming it to be a wall are removed again.
+        """
+        checked[position] = True
+        num_frozen = len(frozen)
+        _, box_char = state.box_at(position)
+        can_pull = self.can_pull(box_char)
+
+        def blocked(cell_position):
+            (row, col) = cell_position
+            if not (0 <= row < self.level.num_rows and 0 <= col < self.level.num_cols) or \
+                    self.level.wall_at(cell_position):
+                return True
+            is_wall = checked.get(cell_position)
+            if is_wall is not None:
+                return is_wall
+            _, char = state.box_at(cell_position)
+            if char == '':
+                return False
+            return not self.is_movable(char) or self.is_frozen(state, cell_position, checked, frozen)
+
+        def can_move(direction):
+            # The box can be pushed into the neighbour cell by an agent in any other neighbour cell of the box, or be
+            # pulled into it by an agent moving on from the neighbour cell into any other of its neighbours
+            destination = pos_add(position, direction)
+            if blocked(destination):
+                return False
+            if any(not blocked(pos_add(position, other_direction)) for other_direction in DIRECTIONS
+                   if other_direction != direction):
+                return True
+            return can_pull and any(not blocked(pos_add(destination, other_direction)) for other_direction in DIRECTIONS
+                                    if other_direction != pos_sub((0, 0), direction))
+
+        for direction in DIRECTIONS:
+            if can_move(direction):
+                for (frozen_position, _) in frozen[num_frozen:]:
+                    checked[frozen_position] = False
+                del frozen[num_frozen:]
+                checked[position] = False
+                return False
+        frozen.append((position, box_char))
+        return True
@@ -20,6 +20,8 @@ class HospitalGoalDescription:
     negative goal is satisfied when such an object is *not* at the goal position.
     The 'goal' member contains all goals (both agent and box goals) while 'agent_goal' and 'box_goal' only
     contains one kind. This double representation allows for quick and convenient lookup of goals of a specific kind
+    If the goal description consists of exactly the goals of the level, 'is_level_goal' is True and goals can be
+    counted in constant time using the number of satisfied goals which the states keep track of.
     """
 
     def __init__(self, level, goals):
@@ -32,9 +34,13 @@ class HospitalGoalDescription:
                 self.agent_goals.append(goal)
             elif 'A' <= goal[1] <= 'Z':
                 self.box_goals.append(goal)
+        self.is_level_goal = len(goals) == level.num_goals and set(goals) == set(level.box_goals + level.agent_goals)
 
     def is_goal(self, state):
         """Returns whether the given state satisfies all goals in the goal description"""
+        if self.is_level_goal:
+            return state.num_satisfied_goals == self.level.num_goals
+
         for (goal_position, goal_char, is_positive_literal) in self.goals:
             char = state.object_at(goal_position)
             if is_positive_literal and goal_char != char:
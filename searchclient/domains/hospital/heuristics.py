@@ -15,11 +15,12 @@ import sys
 import itertools
 import numpy as np
 from utils import pos_add, pos_sub, APPROX_INFINITY
-from collections import deque, defaultdict
+from collections import deque, defaultdict, OrderedDict
 
 import domains.hospital.state as h_state
 import domains.hospital.goal_description as h_goal_description
 import domains.hospital.level as h_level
+import domains.hospital.pattern_database as h_pattern_database
 
 
 class HospitalZeroHeuristic:
@@ -37,16 +38,77 @@ class HospitalZeroHeuristic:
         return 0
     
 
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _changed_objects(state) -> tuple[list[tuple[tuple[int, int], str]], list[tuple[tuple[int, int], str]]]:
+    """
+    Returns the (position, character) of the objects of the parent state which are not in the state and of the objects
+    of the state which are not in the parent. Every box moved by an action is moved from or into a neighbour of the
+    agent moving it, so only the cells around the agents which moved are compared.
+    """
+    parent = state.parent
+    removed, added = [], []
+    cells = set()
+    for ((parent_position, agent_char), (position, _)) in zip(parent.agent_positions, state.agent_positions):
+        if parent_position != position:
+            removed.append((parent_position, agent_char))
+            added.append((position, agent_char))
+            for agent_position in (parent_position, position):
+                cells.add(agent_position)
+                cells.update(pos_add(agent_position, direction) for direction in DIRECTIONS)
+    for cell in cells:
+        _, parent_char = parent.box_at(cell)
+        _, char = state.box_at(cell)
+        if parent_char != char:
+            if parent_char != '':
+                removed.append((cell, parent_char))
+            if char != '':
+                added.append((cell, char))
+    return removed, added
+
+
+def _moved_closer(state, object_distance) -> bool:
+    """
+    Returns whether the action leading to the state satisfied a goal of the level or brought the objects it moved
+    closer to their goals in total, where object_distance(state, position, char) is the distance of an object to the
+    goals of its character in the state. The preferred successors of lazy greedy search are chosen this way.
+    """
+    parent = state.parent
+    if state.num_satisfied_goals > parent.num_satisfied_goals:
+        return True
+    removed, added = _changed_objects(state)
+    return sum(object_distance(state, position, char) for (position, char) in added) < \
+        sum(object_distance(parent, position, char) for (position, char) in removed)
+
+
+def _stack_object_cells(level: h_level.HospitalLevel, states) -> dict[str, np.ndarray]:
+    """
+    Returns, for every character, a (states x objects) array of the cells of the objects with that character in each
+    of the states. The states must have the same number of objects of every character, e.g. siblings in the search.
+    """
+    object_cells = defaultdict(list)
+    for state in states:
+        for (position, char) in itertools.chain(state.agent_positions, state.box_positions):
+            object_cells[char].append(level.cell_index(position))
+    return {char: np.array(cells).reshape(len(states), -1) for (char, cells) in object_cells.items() if char != ''}
+
+
 class HospitalGoalCountHeuristics:
     def __init__(self):
         pass
 
     def preprocess(self, level: h_level.HospitalLevel):
+        self.level = level
         self.goal_count = len(level.box_goals + level.agent_goals)
+        self.goals_at = {}
     
     def h(self, state: h_state.HospitalState, 
                 goal_description: h_goal_description.HospitalGoalDescription) -> int:
-        
+        # The states keep count of the satisfied goals of the level, so we only need to scan other goal descriptions
+        if goal_description.is_level_goal:
+            return self.goal_count - state.num_satisfied_goals
+
         objects_in_goals = 0
         
         for (goal_position, goal_char, is_positive_literal) in goal_description.goals:
@@ -58,6 +120,41 @@ class HospitalGoalCountHeuristics:
 
         return self.goal_count - objects_in_goals
 
+    def h_incremental(self, state: h_state.HospitalState, parent_value: int,
+                      goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """
+        Returns h(state) given the value of its parent. Only the goals in the cells which the objects moved from or
+        into can have changed, so the value of the parent is corrected by the goals satisfied or unsatisfied there.
+        """
+        if goal_description.is_level_goal:
+            return self.goal_count - state.num_satisfied_goals
+
+        goals_at = self.get_goals_at(goal_description)
+        removed, added = _changed_objects(state)
+        value = parent_value
+        for cell in {position for (position, _) in itertools.chain(removed, added)}:
+            for (goal_char, is_positive_literal) in goals_at.get(cell, ()):
+                value += (state.parent.object_at(cell) == goal_char) == is_positive_literal
+                value -= (state.object_at(cell) == goal_char) == is_positive_literal
+        return value
+
+    def is_preferred(self, state: h_state.HospitalState,
+                     goal_description: h_goal_description.HospitalGoalDescription) -> bool:
+        """Returns whether the action leading to the state lowered the goal count, i.e. h(state) < h(state.parent)"""
+        if goal_description.is_level_goal:
+            return state.num_satisfied_goals > state.parent.num_satisfied_goals
+        return self.h_incremental(state, 0, goal_description) < 0
+
+    def get_goals_at(self, goal_description: h_goal_description.HospitalGoalDescription):
+        """Returns a dictionary mapping the positions of the goals of the goal description to their literals"""
+        goals_at = self.goals_at.get(goal_description)
+        if goals_at is None:
+            goals_at = defaultdict(list)
+            for (goal_position, goal_char, is_positive_literal) in goal_description.goals:
+                goals_at[goal_position].append((goal_char, is_positive_literal))
+            self.goals_at[goal_description] = goals_at
+        return goals_at
+
 class HospitalAdvancedHeuristics:
 
     def __init__(self):
@@ -67,53 +164,679 @@ class HospitalAdvancedHeuristics:
         # This function will be called a single time prior to the search allowing us to preprocess the level such as
         # pre-computing lookup tables or other acceleration structures
         self.goal_map = defaultdict(list)
+        self.goals_at = defaultdict(list)
         self.total_goal_count = 0
         for (goal_position, goal_letter, is_positive_literal) in level.box_goals + level.agent_goals:
             self.goal_map[goal_letter].append((goal_position, is_positive_literal))
+            self.goals_at[goal_position].append(goal_letter)
             self.total_goal_count += 1
+        # The total distance of the state whose children h_incremental evaluated last
+        self.cached_parent = None
+        self.cached_parent_distance = 0
 
     def h(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
-        total_distance = 0
-
-        #calculate agent distances to their closest respective unmet goals
-        for agent_pos, agent_char in state.agent_positions:
-            if agent_char in self.goal_map:
-                min_dist_for_agent = float('inf')
-                found_unmet_goal = False
-                for goal_pos, is_positive in self.goal_map[agent_char]:
-                    #check if this specific goal is met
-                    current_char_at_goal = state.object_at(goal_pos)
-                    goal_is_met = (is_positive and current_char_at_goal == agent_char) or \
-                                  (not is_positive and current_char_at_goal != agent_char)
-                    
-                    if not goal_is_met:
-                        found_unmet_goal = True
-                        distance = abs(agent_pos[0] - goal_pos[0]) + abs(agent_pos[1] - goal_pos[1])
-                        min_dist_for_agent = min(min_dist_for_agent, distance)
-                
-                if found_unmet_goal:
-                    total_distance += min_dist_for_agent
-
-        #calculate box distances to their closest respective unmet goals
-        for box_pos, box_char in state.box_positions:
-             if box_char in self.goal_map:
-                min_dist_for_box = float('inf')
-                found_unmet_goal = False
-                for goal_pos, is_positive in self.goal_map[box_char]:
-                    #check if this specific goal is met
-                    current_char_at_goal = state.object_at(goal_pos)
-                    goal_is_met = (is_positive and current_char_at_goal == box_char) or \
-                                  (not is_positive and current_char_at_goal != box_char)
-
-                    if not goal_is_met:
-                        found_unmet_goal = True
-                        distance = abs(box_pos[0] - goal_pos[0]) + abs(box_pos[1] - goal_pos[1])
-                        min_dist_for_box = min(min_dist_for_box, distance)
-
-                if found_unmet_goal:
-                    total_distance += min_dist_for_box
+        # There are no unmet goals to measure distances to if the state satisfies all goals of the level
+        if goal_description.is_level_goal and state.num_satisfied_goals == self.total_goal_count:
+            return 0
 
         if self.total_goal_count == 0:
             return 0
         #normalize distance by total number of goals
-        return int(total_distance / self.total_goal_count)
\ No newline at end of file
+        return int(self.total_distance(state) / self.total_goal_count)
+
+    def h_incremental(self, state: h_state.HospitalState, parent_value: int,
+                      goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """
+        Returns h(state) from the total distance of its parent. Only the distances of the moved objects change, unless
+        a goal in one of the cells they moved from or into became met or unmet, which changes the closest unmet goals
+        of all objects of its letter. The parent value is the total distance divided by the number of goals and
+        rounded down, so the total distance of the parent is computed once, when the first of its children is
+        evaluated, rather than kept for every evaluated state until it is expanded.
+        """
+        if self.total_goal_count == 0:
+            return 0
+
+        parent = state.parent
+        if parent is not self.cached_parent:
+            # The children of a state are evaluated one after the other, so its total distance is only needed until
+            # the next state is expanded
+            self.cached_parent = parent
+            self.cached_parent_distance = self.total_distance(parent)
+        total_distance = self.cached_parent_distance
+
+        removed, added = _changed_objects(state)
+        changed_letters = set()
+        for cell in {position for (position, _) in itertools.chain(removed, added)}:
+            for goal_letter in self.goals_at.get(cell, ()):
+                if (parent.object_at(cell) == goal_letter) != (state.object_at(cell) == goal_letter):
+                    changed_letters.add(goal_letter)
+        for letter in changed_letters:
+            total_distance += self.letter_distance(state, letter) - self.letter_distance(parent, letter)
+        for (position, char) in removed:
+            if char not in changed_letters:
+                total_distance -= self.object_distance(parent, position, char)
+        for (position, char) in added:
+            if char not in changed_letters:
+                total_distance += self.object_distance(state, position, char)
+
+        # There are no unmet goals to measure distances to if the state satisfies all goals of the level
+        if goal_description.is_level_goal and state.num_satisfied_goals == self.total_goal_count:
+            return 0
+        return int(total_distance / self.total_goal_count)
+
+    def box_value(self, state: h_state.HospitalState,
+                  goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns the part of the total distance which only depends on the boxes, i.e. the distances of the boxes"""
+        return sum(self.object_distance(state, position, char) for (position, char) in state.box_positions)
+
+    def h_with_box_value(self, state: h_state.HospitalState, box_value: int,
+                         goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns h given the value of box_value for the state"""
+        if goal_description.is_level_goal and state.num_satisfied_goals == self.total_goal_count:
+            return 0
+        if self.total_goal_count == 0:
+            return 0
+        agent_distance = sum(self.object_distance(state, position, char) for (position, char) in state.agent_positions)
+        return int((box_value + agent_distance) / self.total_goal_count)
+
+    def is_preferred(self, state: h_state.HospitalState,
+                     goal_description: h_goal_description.HospitalGoalDescription) -> bool:
+        return _moved_closer(state, self.object_distance)
+
+    def total_distance(self, state: h_state.HospitalState) -> int:
+        #calculate agent and box distances to their closest respective unmet goals
+        return sum(self.object_distance(state, position, char)
+                   for (position, char) in itertools.chain(state.agent_positions, state.box_positions))
+
+    def letter_distance(self, state: h_state.HospitalState, letter: str) -> int:
+        return sum(self.object_distance(state, position, char)
+                   for (position, char) in itertools.chain(state.agent_positions, state.box_positions)
+                   if char == letter)
+
+    def object_distance(self, state: h_state.HospitalState, position: tuple[int, int], char: str) -> int:
+        """Returns the Manhattan distance from the object to the closest unmet goal of its letter (0 if all are met)"""
+        min_distance = 0
+        found_unmet_goal = False
+        for goal_pos, is_positive in self.goal_map.get(char, ()):
+            #check if this specific goal is met
+            current_char_at_goal = state.object_at(goal_pos)
+            goal_is_met = (is_positive and current_char_at_goal == char) or \
+                          (not is_positive and current_char_at_goal != char)
+
+            if not goal_is_met:
+                distance = abs(position[0] - goal_pos[0]) + abs(position[1] - goal_pos[1])
+                if not found_unmet_goal or distance < min_distance:
+                    min_distance = distance
+                found_unmet_goal = True
+        return min_distance
+
+class HospitalTrueDistanceHeuristics:
+    """
+    Sums, over all unsatisfied goals, the true distance to the goal from the closest object with the goal character.
+    Unlike the Manhattan distance the true distance takes walls into account (see HospitalLevel.distance_map), so it
+    is not misled by mazes. The distances from all goals of a letter are stacked into a single NumPy table such that
+    the distances of all objects to all unsatisfied goals of the letter are looked up in one operation.
+    """
+
+    def __init__(self):
+        pass
+
+    def preprocess(self, level: h_level.HospitalLevel):
+        # Running the breadth-first searches from all goals of the level up front keeps the searches out of the timing
+        self.level = level
+        self.goal_tables = {}
+        self.closest_goal_distances = {}
+        self.get_goal_tables(h_goal_description.HospitalGoalDescription(level, level.box_goals + level.agent_goals))
+
+    def get_goal_tables(self, goal_description: h_goal_description.HospitalGoalDescription):
+        """Returns a list of (char, goal positions, distance table) for each character of the positive goals"""
+        goal_tables = self.goal_tables.get(goal_description)
+        if goal_tables is None:
+            goal_positions = defaultdict(list)
+            for (goal_position, goal_char, is_positive_literal) in goal_description.goals:
+                if is_positive_literal:
+                    goal_positions[goal_char].append(goal_position)
+            goal_tables = [(goal_char, positions,
+                            np.stack([self.level.distance_map(position) for position in positions]))
+                           for (goal_char, positions) in goal_positions.items()]
+            self.goal_tables[goal_description] = goal_tables
+        return goal_tables
+
+    def h(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        return self.distance_sum(state, itertools.chain(state.agent_positions, state.box_positions),
+                                 self.get_goal_tables(goal_description))
+
+    def box_value(self, state: h_state.HospitalState,
+                  goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns the part of h which only depends on the boxes, i.e. the distances to the box goals"""
+        goal_tables = [goal_table for goal_table in self.get_goal_tables(goal_description)
+                       if 'A' <= goal_table[0] <= 'Z']
+        return self.distance_sum(state, state.box_positions, goal_tables)
+
+    def h_with_box_value(self, state: h_state.HospitalState, box_value: int,
+                         goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns h given the value of box_value for the state"""
+        goal_tables = [goal_table for goal_table in self.get_goal_tables(goal_description)
+                       if not 'A' <= goal_table[0] <= 'Z']
+        return box_value + self.distance_sum(state, state.agent_positions, goal_tables)
+
+    def h_batch(self, states: list[h_state.HospitalState],
+                goal_description: h_goal_description.HospitalGoalDescription) -> list[int]:
+        """
+        Returns h of all the states. The cells of the objects of every character in all states are stacked into one
+        array, so the distances from every goal to every object in every state are looked up in one operation.
+        """
+        object_cells = _stack_object_cells(self.level, states)
+        total_distances = np.zeros(len(states), dtype=np.int64)
+        for (goal_char, goal_positions, distance_table) in self.get_goal_tables(goal_description):
+            cells = object_cells.get(goal_char)
+            if cells is None:
+                # No object can ever satisfy these goals
+                total_distances += h_level.UNREACHABLE_DISTANCE * len(goal_positions)
+                continue
+            goal_cells = np.array([self.level.cell_index(position) for position in goal_positions])
+            # Indexed by goal, state and object
+            distances = distance_table[:, cells]
+            is_satisfied = (cells == goal_cells[:, np.newaxis, np.newaxis]).any(axis=2)
+            closest_distances = np.where(is_satisfied, 0, distances.min(axis=2))
+            total_distances += closest_distances.sum(axis=0, dtype=np.int64)
+        return total_distances.tolist()
+
+    def is_preferred(self, state: h_state.HospitalState,
+                     goal_description: h_goal_description.HospitalGoalDescription) -> bool:
+        # Satisfied goals are already caught by _moved_closer, so the distances to the closest goals of each character
+        # are used whether or not the goals are satisfied, which makes them a single lookup
+        closest_distances = self.closest_goal_distances.get(goal_description)
+        if closest_distances is None:
+            closest_distances = {goal_char: distance_table.min(axis=0).tolist()
+                                 for (goal_char, _, distance_table) in self.get_goal_tables(goal_description)}
+            self.closest_goal_distances[goal_description] = closest_distances
+        cell_index = self.level.cell_index
+        return _moved_closer(state, lambda _, position, char:
+                             closest_distances[char][cell_index(position)] if char in closest_distances else 0)
+
+    def distance_sum(self, state: h_state.HospitalState, objects, goal_tables) -> int:
+        """Sums the distances to the unsatisfied goals of the goal tables from the closest of the objects"""
+        object_cells = defaultdict(list)
+        for (position, char) in objects:
+            object_cells[char].append(self.level.cell_index(position))
+
+        total_distance = 0
+        for (goal_char, goal_positions, distance_table) in goal_tables:
+            unsatisfied_goals = [idx for (idx, goal_position) in enumerate(goal_positions)
+                                 if state.object_at(goal_position) != goal_char]
+            if len(unsatisfied_goals) == 0:
+                continue
+            cells = object_cells.get(goal_char)
+            if cells is None:
+                # No object can ever satisfy these goals
+                total_distance += h_level.UNREACHABLE_DISTANCE * len(unsatisfied_goals)
+                continue
+            # Distance from every unsatisfied goal to its closest object with the goal character
+            total_distance += int(distance_table[np.ix_(unsatisfied_goals, cells)].min(axis=1).sum())
+        return total_distance
+
+
+class HospitalIndividualCostsHeuristics:
+    """
+    A heuristic for multi-agent path finding levels, where every agent has to reach its own goal: the individual cost
+    of an agent is its true distance to its goal, looked up in the distance map of the goal (see
+    HospitalLevel.distance_map), which the breadth-first search backwards from the goal builds in preprocess. Boxes
+    are ignored, as are agents without goals.
+
+    By default the individual costs are summed (the sum of individual costs). A joint action moves every agent at
+    most one cell and only costs one, so with use_max the largest individual cost is used instead, which is
+    admissible for A* over joint actions, whereas the sum is more informative but can overestimate by up to a factor
+    of the number of agents.
+    """
+
+    def __init__(self, use_max: bool = False):
+        self.use_max = use_max
+
+    def preprocess(self, level: h_level.HospitalLevel):
+        self.level = level
+        self.goal_maps = {}
+        self.get_goal_maps(h_goal_description.HospitalGoalDescription(level, level.box_goals + level.agent_goals))
+
+    def get_goal_maps(self, goal_description: h_goal_description.HospitalGoalDescription):
+        """Maps the characters of the agents with a positive goal in the goal description to their goal distance maps"""
+        goal_maps = self.goal_maps.get(goal_description)
+        if goal_maps is None:
+            goal_maps = {goal_char: self.level.distance_map(goal_position)
+                         for (goal_position, goal_char, is_positive_literal) in goal_description.agent_goals
+                         if is_positive_literal}
+            self.goal_maps[goal_description] = goal_maps
+        return goal_maps
+
+    def h(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        goal_maps = self.get_goal_maps(goal_description)
+        individual_costs = [int(goal_maps[agent_char][self.level.cell_index(agent_position)])
+                            for (agent_position, agent_char) in state.agent_positions if agent_char in goal_maps]
+        if len(individual_costs) == 0:
+            return 0
+        return max(individual_costs) if self.use_max else sum(individual_costs)
+
+    def h_batch(self, states: list[h_state.HospitalState],
+                goal_description: h_goal_description.HospitalGoalDescription) -> list[int]:
+        """Returns h of all the states, looking up the individual costs of all agents in all states at once"""
+        goal_maps = self.get_goal_maps(goal_description)
+        # Siblings have the same agents in the same order
+        agent_indices = [idx for (idx, (_, agent_char)) in enumerate(states[0].agent_positions)
+                         if agent_char in goal_maps]
+        if len(agent_indices) == 0:
+            return [0] * len(states)
+        distance_table = np.stack([goal_maps[states[0].agent_positions[idx][1]] for idx in agent_indices])
+        agent_cells = np.array([[self.level.cell_index(state.agent_positions[idx][0]) for idx in agent_indices]
+                                for state in states])
+        # Indexed by state and agent
+        individual_costs = distance_table[np.arange(len(agent_indices)), agent_cells]
+        if self.use_max:
+            return individual_costs.max(axis=1).astype(np.int64).tolist()
+        return individual_costs.sum(axis=1, dtype=np.int64).tolist()
+
+
+# Larger than any slack in _augment, as all costs are at most UNREACHABLE_DISTANCE
+UNASSIGNED_SLACK = float('inf')
+
+
+def _augment(row, column_costs, u, v, p):
+    """
+    Augments an assignment with the unassigned row by a shortest augmenting path (the Hungarian method in the
+    formulation of Jonker and Volgenant). column_costs[j][i] is the cost of assigning row i to column j, u and v are
+    the row and column potentials and p maps every column to its row (or -1). The potentials must be feasible and the
+    assigned rows and columns tight, which the search maintains, so the assignment stays optimal.
+    """
+    n = len(p)
+    min_slack = [UNASSIGNED_SLACK] * n
+    way = [-1] * n
+    used = [False] * n
+    used_columns = []
+    # The path starts in a virtual column assigned to the row, denoted by -1
+    column, current_row = -1, row
+    while True:
+        delta, next_column = UNASSIGNED_SLACK, -1
+        current_potential = u[current_row]
+        for j in range(n):
+            if not used[j]:
+                slack = column_costs[j][current_row] - current_potential - v[j]
+                if slack < min_slack[j]:
+                    min_slack[j] = slack
+                    way[j] = column
+                if min_slack[j] < delta:
+                    delta, next_column = min_slack[j], j
+        u[row] += delta
+        for j in used_columns:
+            u[p[j]] += delta
+            v[j] -= delta
+        for j in range(n):
+            if not used[j]:
+                min_slack[j] -= delta
+        used[next_column] = True
+        used_columns.append(next_column)
+        column = next_column
+        if p[column] == -1:
+            break
+        current_row = p[column]
+    # Flip the assignments along the path
+    while column != -1:
+        previous_column = way[column]
+        p[column] = p[previous_column] if previous_column != -1 else row
+        column = previous_column
+
+
+
+class _CharacterMatching:
+    """
+    The assignment problem between the positive goals of a single character and the objects with that character.
+    Its square cost matrix has a row for every goal and a column for every object, holding the true distance between
+    them. If there are more objects than goals, the extra rows are dummy goals which every object reaches for free, and
+    if there are fewer, the extra columns are dummy objects which are UNREACHABLE_DISTANCE from every goal.
+
+    An assignment is stored as a tuple (cells, v, p, cost) of the cell of the object of every column (None for dummy
+    objects), the column potentials, the row assigned to every column and the total cost. The row potentials follow
+    from these since all assigned entries are tight. The tuples are immutable, so children share the assignments of
+    their parents for all characters none of whose objects moved.
+    """
+
+    def __init__(self, distance_table: np.ndarray):
+        self.distance_table = distance_table
+        self.num_goals = len(distance_table)
+        # The column of the cost matrix by (cell, size)
+        self.columns = {}
+
+    def column_costs(self, cell, size):
+        costs = self.columns.get((cell, size))
+        if costs is None:
+            if cell is None:
+                costs = [h_level.UNREACHABLE_DISTANCE] * self.num_goals
+            else:
+                costs = self.distance_table[:, cell].tolist()
+            costs += [0] * (size - self.num_goals)
+            self.columns[(cell, size)] = costs
+        return costs
+
+    def solve(self, cells):
+        """Returns the minimum cost assignment for objects in the given cells, solved from scratch"""
+        size = max(self.num_goals, len(cells))
+        columns = list(cells) + [None] * (size - len(cells))
+        column_costs = [self.column_costs(cell, size) for cell in columns]
+        u, v, p = [0] * size, [0] * size, [-1] * size
+        for row in range(size):
+            _augment(row, column_costs, u, v, p)
+        return self._assignment(columns, column_costs, v, p)
+
+    def repair(self, assignment, cells):
+        """
+        Returns the minimum cost assignment for objects in the given cells, starting from the assignment of a state
+        in which only a few of the objects were elsewhere. The column of every object which moved gets new costs and a
+        potential which keeps all potentials feasible. If the entry of its assigned row is no longer tight, the row is
+        unassigned again and reassigned by a single augmenting path.
+        """
+        (parent_cells, v, p, _) = assignment
+        cell_set = set(cells)
+        moved_columns = [j for (j, cell) in enumerate(parent_cells) if cell is not None and cell not in cell_set]
+        if len(moved_columns) == 0:
+            return assignment
+        parent_cell_set = set(parent_cells)
+        new_cells = [cell for cell in cells if cell not in parent_cell_set]
+        if len(new_cells) != len(moved_columns):
+            # The objects of the state do not correspond to those of the parent (e.g. after a color filter)
+            return self.solve(cells)
+
+        size = len(p)
+        columns = list(parent_cells)
+        column_costs = [self.column_costs(cell, size) for cell in columns]
+        v, p = list(v), list(p)
+        u = [0] * size
+        for j in range(size):
+            u[p[j]] = column_costs[j][p[j]] - v[j]
+
+        unassigned_rows = []
+        for (j, cell) in zip(moved_columns, new_cells):
+            columns[j] = cell
+            costs = column_costs[j] = self.column_costs(cell, size)
+            v[j] = min(cost - potential for (cost, potential) in zip(costs, u))
+            row = p[j]
+            if costs[row] - u[row] != v[j]:
+                p[j] = -1
+                unassigned_rows.append(row)
+        for row in unassigned_rows:
+            _augment(row, column_costs, u, v, p)
+        return self._assignment(columns, column_costs, v, p)
+
+    @staticmethod
+    def _assignment(columns, column_costs, v, p):
+        cost = sum(column_costs[j][p[j]] for j in range(len(p)))
+        return tuple(columns), tuple(v), tuple(p), cost
+
+
+class HospitalMatchingHeuristics:
+    """
+    For every character, computes a minimum cost assignment of the objects (boxes or agents) with that character to
+    the positive goals of that character, where the cost of assigning an object to a goal is the true distance between
+    them (see HospitalLevel.distance_map). Unlike the closest object distances of the other heuristics, this does not
+    let several objects head for the same goal, nor one object satisfy several goals.
+
+    Solving the assignment problems takes cubic time in the number of goals, but a child differs from its parent by at
+    most one moved box per agent. The assignments of an expanded state are therefore solved once, when the first of
+    its children is evaluated, and the assignments of its children are repaired from them (see
+    _CharacterMatching.repair), which usually takes linear time and at most a single augmenting path per moved object.
+    The assignments of the states waiting in the frontier are not kept, as they would add up to a table per goal
+    character for every generated state.
+    """
+
+    # The number of expanded states whose assignments are kept for children evaluated later on, e.g. the children
+    # produced by the intermediate nodes of operator decomposition
+    NUM_EXPANDED_ASSIGNMENTS = 64
+
+    def __init__(self):
+        pass
+
+    def preprocess(self, level: h_level.HospitalLevel):
+        self.level = level
+        self.matchings = {}
+        self.expanded_assignments = {}
+        # The assignments of the state evaluated last, for subclasses refining its value (see pair_excess)
+        self.state_assignments = None
+        self.assignment_goal_description = None
+        self.get_matchings(h_goal_description.HospitalGoalDescription(level, level.box_goals + level.agent_goals))
+
+    def get_matchings(self, goal_description: h_goal_description.HospitalGoalDescription):
+        """Returns a list of (char, matching) for each character of the positive goals"""
+        matchings = self.matchings.get(goal_description)
+        if matchings is None:
+            goal_positions = defaultdict(list)
+            for (goal_position, goal_char, is_positive_literal) in goal_description.goals:
+                if is_positive_literal:
+                    goal_positions[goal_char].append(goal_position)
+            matchings = [(goal_char, _CharacterMatching(self.goal_distances(goal_char, positions)))
+                         for (goal_char, positions) in goal_positions.items()]
+            self.matchings[goal_description] = matchings
+        return matchings
+
+    def goal_distances(self, goal_char, goal_positions) -> np.ndarray:
+        """Returns the costs of the assignments as a (goals x cells) table, here the true distances to the goals"""
+        return np.stack([self.level.distance_map(position) for position in goal_positions])
+
+    def parent_assignments(self, state):
+        """
+        Returns the assignments of the parent of the state by character, or None if the state has no parent. The
+        assignments are filled in by assignment_cost as the characters are needed.
+        """
+        parent = state.parent
+        if parent is None:
+            return None
+        parent_assignments = self.expanded_assignments.get(parent)
+        if parent_assignments is None:
+            if len(self.expanded_assignments) >= self.NUM_EXPANDED_ASSIGNMENTS:
+                del self.expanded_assignments[next(iter(self.expanded_assignments))]
+            parent_assignments = {}
+            self.expanded_assignments[parent] = parent_assignments
+        return parent_assignments
+
+    def h(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        if goal_description.is_level_goal and state.num_satisfied_goals == self.level.num_goals:
+            return 0
+        objects = itertools.chain(state.agent_positions, state.box_positions)
+        return self.assignment_cost(state, goal_description, objects, self.get_matchings(goal_description))
+
+    def box_value(self, state: h_state.HospitalState,
+                  goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns the part of h which only depends on the boxes, i.e. the cost of the box assignments"""
+        matchings = [(goal_char, matching) for (goal_char, matching) in self.get_matchings(goal_description)
+                     if 'A' <= goal_char <= 'Z']
+        return self.assignment_cost(state, goal_description, state.box_positions, matchings)
+
+    def h_with_box_value(self, state: h_state.HospitalState, box_value: int,
+                         goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns h given the value of box_value for the state"""
+        if goal_description.is_level_goal and state.num_satisfied_goals == self.level.num_goals:
+            return 0
+        matchings = [(goal_char, matching) for (goal_char, matching) in self.get_matchings(goal_description)
+                     if not 'A' <= goal_char <= 'Z']
+        return box_value + self.assignment_cost(state, goal_description, state.agent_positions, matchings)
+
+    def assignment_cost(self, state: h_state.HospitalState,
+                        goal_description: h_goal_description.HospitalGoalDescription, objects, matchings) -> int:
+        """
+        Returns the total cost of the assignments of the objects to the goals of the matchings. The assignments are
+        repaired from those of the parent of the state, which are solved from scratch the first time one of its
+        children needs them, and states without a parent are solved from scratch.
+        """
+        if goal_description is not self.assignment_goal_description:
+            self.expanded_assignments.clear()
+            self.assignment_goal_description = goal_description
+
+        object_cells = self.object_cells(objects)
+        parent_assignments = self.parent_assignments(state)
+        parent_cells = None
+        assignments = {}
+        total_distance = 0
+        for (goal_char, matching) in matchings:
+            cells = object_cells.get(goal_char, [])
+            if parent_assignments is None:
+                assignment = matching.solve(cells)
+            else:
+                parent_assignment = parent_assignments.get(goal_char)
+                if parent_assignment is None:
+                    if parent_cells is None:
+                        parent = state.parent
+                        parent_cells = self.object_cells(itertools.chain(parent.agent_positions, parent.box_positions))
+                    parent_assignment = matching.solve(parent_cells.get(goal_char, []))
+                    parent_assignments[goal_char] = parent_assignment
+                assignment = matching.repair(parent_assignment, cells)
+            assignments[goal_char] = assignment
+            total_distance += assignment[3]
+        self.state_assignments = assignments
+        return total_distance
+
+    def object_cells(self, objects) -> dict[str, list[int]]:
+        """Returns the cell indices of the (position, char) objects by character"""
+        object_cells = defaultdict(list)
+        for (position, char) in objects:
+            object_cells[char].append(self.level.cell_index(position))
+        return object_cells
+
+
+class HospitalPatternDatabaseHeuristics(HospitalMatchingHeuristics):
+    """
+    Uses the pattern database of the level (see pattern_database.py), which holds the exact number of box moves
+    needed to solve abstractions of the level with one or two boxes, taking into account that boxes can only be moved
+    if there is room for an agent to push or pull them.
+
+    The boxes are assigned to the goals as in HospitalMatchingHeuristics, but with the single box pattern distances
+    instead of the true distances as costs. If the level is small enough to have pair patterns, the boxes of a
+    character are also bounded by the sum over its pair patterns of the cheapest pair of boxes solving the pattern,
+    which captures boxes blocking each other, and the larger bound is used.
+    """
+
+    def __init__(self, can_pull: bool = True):
+        self.can_pull = can_pull
+
+    def preprocess(self, level: h_level.HospitalLevel):
+        # Loads the tables of the level from disk, or builds and stores them if this is the first time the layout is
+        # seen, before the matchings are set up
+        self.pattern_database = h_pattern_database.PatternDatabase(level, self.can_pull)
+        self.pair_patterns = {}
+        super().preprocess(level)
+
+    def goal_distances(self, goal_char, goal_positions) -> np.ndarray:
+        goals = [(position, goal_char) for position in goal_positions]
+        if all(goal in self.pattern_database.single_patterns for goal in goals):
+            return self.pattern_database.single_distances(goals)
+        return super().goal_distances(goal_char, goal_positions)
+
+    def get_pair_patterns(self, goal_description: h_goal_description.HospitalGoalDescription):
+        """Returns a list of (char, pair pattern indices) of the pair patterns of the goals of the goal description"""
+        pair_patterns = self.pair_patterns.get(goal_description)
+        if pair_patterns is None:
+            goals = {(position, char) for (position, char, is_positive_literal) in goal_description.box_goals
+                     if is_positive_literal}
+            indices = defaultdict(list)
+            for (idx, pattern) in enumerate(self.pattern_database.pair_patterns):
+                if all(goal in goals for goal in pattern):
+                    indices[pattern[0][1]].append(idx)
+            pair_patterns = [(char, np.array(pattern_indices)) for (char, pattern_indices) in indices.items()]
+            self.pair_patterns[goal_description] = pair_patterns
+        return pair_patterns
+
+    def h(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        value = super().h(state, goal_description)
+        if value == 0:
+            return 0
+        return value + self.pair_excess(state, goal_description)
+
+    def box_value(self, state: h_state.HospitalState,
+                  goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        return super().box_value(state, goal_description) + self.pair_excess(state, goal_description)
+
+    def pair_excess(self, state: h_state.HospitalState,
+                    goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        """Returns how much the pair pattern bounds exceed the box assignment costs of the state in total"""
+        # The box assignments of the state were computed by box_value or h just before
+        assignments = self.state_assignments
+        value = 0
+
+        box_cells = defaultdict(list)
+        for (position, char) in state.box_positions:
+            box_cells[char].append(self.level.cell_index(position))
+
+        # The pair patterns of a character are disjoint, so the cheapest pairs of boxes solving each of them sum to a
+        # lower bound for the character, just like the assignment cost
+        for (char, pattern_indices) in self.get_pair_patterns(goal_description):
+            cells = box_cells[char]
+            pair_distances = self.pattern_database.pair_table[np.ix_(pattern_indices, cells, cells)]
+            pair_value = int(pair_distances.min(axis=(1, 2)).sum())
+            if pair_value > assignments[char][3]:
+                value += pair_value - assignments[char][3]
+        return value
+
+
+# The estimated number of bytes taken by a cache entry on top of its key tuples, i.e. its share of the hash table and
+# the linked list of the ordered dictionary and the value
+HEURISTIC_CACHE_ENTRY_BYTES = 128
+
+
+class HospitalBoxCacheHeuristics:
+    """
+    Wraps a heuristic and caches the part of its value which only depends on the boxes, keyed by the box positions. In
+    push and pull levels the same box configuration is reached with many different agent positions, and the states
+    reaching it again only need the (usually cheap) agent part of the value computed. Heuristics split their value by
+    box_value and h_with_box_value (see HospitalTrueDistanceHeuristics). The whole value of other heuristics is cached,
+    keyed by the agent positions as well, which only pays off in searches evaluating states more than once.
+
+    The cache is bounded to about max_bytes, estimated from the sizes of the keys, and the least recently used box
+    configurations are evicted first. The number of hits and misses is reported in the search status.
+    """
+
+    def __init__(self, heuristic, max_bytes: int):
+        self.heuristic = heuristic
+        self.max_bytes = max_bytes
+        self.is_split = hasattr(heuristic, 'box_value')
+        self.cache = OrderedDict()
+        self.cache_goal_description = None
+        self.num_bytes = 0
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def preprocess(self, level: h_level.HospitalLevel):
+        self.heuristic.preprocess(level)
+        self.cache.clear()
+        self.cache_goal_description = None
+        self.num_bytes = 0
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def h(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        if goal_description is not self.cache_goal_description:
+            self.cache.clear()
+            self.num_bytes = 0
+            self.cache_goal_description = goal_description
+
+        box_positions = tuple(state.box_positions)
+        key = box_positions if self.is_split else (tuple(state.agent_positions), box_positions)
+        value = self.cache.get(key)
+        if value is None:
+            self.num_misses += 1
+            if self.is_split:
+                value = self.heuristic.box_value(state, goal_description)
+            else:
+                value = self.heuristic.h(state, goal_description)
+            self.cache[key] = value
+            self.num_bytes += self.entry_bytes(key)
+            while self.num_bytes > self.max_bytes and len(self.cache) > 0:
+                (evicted_key, _) = self.cache.popitem(last=False)
+                self.num_bytes -= self.entry_bytes(evicted_key)
+        else:
+            self.num_hits += 1
+            self.cache.move_to_end(key)
+
+        if self.is_split:
+            return self.heuristic.h_with_box_value(state, value, goal_description)
+        return value
+
+    def entry_bytes(self, key: tuple) -> int:
+        # The positions in the keys are shared with the states, so only the tuples holding them are counted
+        if self.is_split:
+            return sys.getsizeof(key) + HEURISTIC_CACHE_ENTRY_BYTES
+        return sys.getsizeof(key) + sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + HEURISTIC_CACHE_ENTRY_BYTES
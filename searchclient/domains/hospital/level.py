@@ -11,7 +11,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import random
 import sys
+from collections import deque
+
+import numpy as np
+
+
+# Fixed seed such that all processes working on the same level agree on the Zobrist keys
+ZOBRIST_SEED = 1337
+
+# The distance stored in the distance maps (see HospitalLevel.distance_map) for cells which cannot reach the target
+UNREACHABLE_DISTANCE = np.iinfo(np.uint16).max
 
 
 class HospitalLevel:
@@ -42,6 +53,50 @@ class HospitalLevel:
         self.num_agent_goals = len(self.agent_goals)
         self.num_box_goals = len(self.box_goals)
 
+        # The grid is rectangular, so every position can be packed into a single integer cell index
+        # (row * num_cols + col). Compact states use these cell indices instead of (row, col) tuples.
+        self.num_rows = len(self.walls)
+        self.num_cols = len(self.walls[0]) if self.num_rows > 0 else 0
+        self.num_cells = self.num_rows * self.num_cols
+        # Flat wall map over the cell indices together with the cell offset of a step in each direction. These allow
+        # the cell index mode (see CompactHospitalState) to find neighbours and check walls without creating tuples.
+        # Levels need not be enclosed by walls (e.g. SAboXboXboX has empty cells in its corners), so the cells on the
+        # border of the grid always count as walls here. This keeps the neighbours of every free cell inside the grid,
+        # where the offsets neither run off the ends of the map nor wrap around to the other side of a row.
+        self.wall_cells = bytearray(self.num_cells)
+        for row in range(self.num_rows):
+            for col in range(self.num_cols):
+                on_border = row in (0, self.num_rows - 1) or col in (0, self.num_cols - 1)
+                self.wall_cells[row * self.num_cols + col] = self.walls[row][col] or on_border
+        self.direction_offsets = {'N': -self.num_cols, 'S': self.num_cols, 'E': 1, 'W': -1}
+        # Lazily computed tables of the actions which are not ruled out by walls, see action_table
+        self.action_tables = {}
+
+        # The goals of the level by position and by cell index as lists of (char, is_positive) pairs. Whether the goals
+        # at a position are satisfied only depends on the object at that position, which allows states to keep count
+        # of their satisfied goals incrementally as objects move (see goal_move_delta).
+        self.num_goals = self.num_agent_goals + self.num_box_goals
+        self.goals_at = {}
+        for (goal_position, goal_char, is_positive_literal) in self.box_goals + self.agent_goals:
+            self.goals_at.setdefault(goal_position, []).append((goal_char, is_positive_literal))
+        self.goals_at_cell = {self.cell_index(position): goals for (position, goals) in self.goals_at.items()}
+
+        # Lazily computed distance maps by target cell, see distance_map
+        self.distance_maps = {}
+        # Lazily computed dead cells by (box character, can pull), see dead_cells
+        self.dead_cell_maps = {}
+
+        # Zobrist keys: a random 61 bit key for every (cell, character) pair. The hash of a state is the xor of the keys
+        # of all its objects, which allows the hash of a child state to be updated from the hash of its parent by
+        # xor'ing out the old cell and xor'ing in the new cell of every object that moved. Keeping the keys below
+        # 2^61 makes sure that the xor of any number of keys is a valid Python hash value.
+        zobrist_random = random.Random(ZOBRIST_SEED)
+        chars = set(self.colors)
+        chars.update(char for (_, char) in self.initial_agent_positions + self.initial_box_positions)
+        self.zobrist_keys = {}
+        for char in sorted(chars):
+            self.zobrist_keys[char] = [zobrist_random.getrandbits(61) for _ in range(self.num_cells)]
+
     @staticmethod
     def parse_level_lines(level_lines):
         # Reverse the lines in the level file such that we can efficiently read the next line using 'pop'
@@ -127,6 +182,188 @@ class HospitalLevel:
         """Returns True if there is a wall at the requested position and False otherwise"""
         return self.walls[position[0]][position[1]]
 
+    def cell_index(self, position):
+        """Returns the flat cell index of the (row, col) position"""
+        return position[0] * self.num_cols + position[1]
+
+    def wall_at_cell(self, cell):
+        """Returns True if there is a wall at the requested cell index and False otherwise"""
+        return self.wall_cells[cell] == 1
+
+    def action_table(self, action_library, num_agents, use_positions=False):
+        """
+        Returns a table with an entry for every free cell listing the actions of the action library which an agent
+        in that cell can apply at all given the walls. Each action is stored in a (action, first, second, mask)
+        tuple together with the two cells the action depends on (see action.static_cells), such that only the dynamic
+        occupancy of those cells has to be checked during search (see action.is_unblocked), and the conflict mask of
+        the action (see action.conflict_mask).
+        By default the table is a list indexed by cell index and holding cell indices. With use_positions=True it is
+        a dictionary indexed by (row, col) positions holding positions instead, as used by HospitalState. The conflict
+        masks are always based on cell indices.
+        The tables are computed the first time they are requested and are afterwards reused.
+        """
+        key = (id(action_library), num_agents, use_positions)
+        cached = self.action_tables.get(key)
+        # The library is stored alongside the table to guard against reuse of the id of a garbage collected library
+        if cached is not None and cached[0] is action_library:
+            return cached[1]
+
+        table = [[] for _ in range(self.num_cells)]
+        for cell in range(self.num_cells):
+            if self.wall_cells[cell]:
+                continue
+            for action in action_library:
+                cells = action.static_cells(self, cell, num_agents)
+                if cells is not None:
+                    table[cell].append((action, cells[0], cells[1], action.conflict_mask(self, cells[0], cells[1])))
+
+        if use_positions:
+            def to_position(cell):
+                return None if cell == -1 else self.cell_position(cell)
+            table = {self.cell_position(cell): [(action, to_position(first), to_position(second), mask)
+                                                for (action, first, second, mask) in entries]
+                     for (cell, entries) in enumerate(table) if not self.wall_cells[cell]}
+
+        self.action_tables[key] = (action_library, table)
+        return table
+
+    def count_satisfied_goals(self, objects):
+        """Returns the number of goals of the level satisfied by the given (position, char) objects"""
+        occupancy = {position: char for (position, char) in objects if char != ''}
+        num_satisfied_goals = 0
+        for (position, goals) in self.goals_at.items():
+            char = occupancy.get(position, '')
+            for (goal_char, is_positive_literal) in goals:
+                if (goal_char == char) == is_positive_literal:
+                    num_satisfied_goals += 1
+        return num_satisfied_goals
+
+    @staticmethod
+    def _goal_move_delta(goals_at, old_key, new_key, char):
+        delta = 0
+        goals = goals_at.get(old_key)
+        if goals is not None:
+            for (goal_char, is_positive_literal) in goals:
+                if goal_char == char:
+                    # The object leaves the goal, which satisfies a negative goal and unsatisfies a positive one
+                    delta += -1 if is_positive_literal else 1
+        goals = goals_at.get(new_key)
+        if goals is not None:
+            for (goal_char, is_positive_literal) in goals:
+                if goal_char == char:
+                    delta += 1 if is_positive_literal else -1
+        return delta
+
+    def goal_move_delta(self, position, new_position, char):
+        """
+        Returns the change in the number of satisfied goals when the object with the given character moves from
+        position into the free new_position.
+        """
+        return self._goal_move_delta(self.goals_at, position, new_position, char)
+
+    def goal_move_delta_cell(self, cell, new_cell, char):
+        """Same as goal_move_delta, but for cell indices"""
+        return self._goal_move_delta(self.goals_at_cell, cell, new_cell, char)
+
+    def distance_map_cell(self, target_cell):
+        """
+        Returns the distance map of the target cell index: a NumPy uint16 array holding for every cell index the
+        length of the shortest path from that cell to the target which only avoids walls, or UNREACHABLE_DISTANCE if
+        there is none. Agents and boxes are ignored, so the distances are lower bounds on the number of moves needed.
+        The maps are computed by a breadth-first search backwards from the target the first time they are requested
+        and are afterwards shared by everyone using the level, e.g. all heuristics.
+        """
+        distances = self.distance_maps.get(target_cell)
+        if distances is not None:
+            return distances
+
+        # The search itself runs on a plain list, which is faster to update element by element than a NumPy array
+        distances = [UNREACHABLE_DISTANCE] * self.num_cells
+        if not self.wall_cells[target_cell]:
+            distances[target_cell] = 0
+            queue = deque([target_cell])
+            num_cols = self.num_cols
+            while queue:
+                cell = queue.popleft()
+                next_distance = distances[cell] + 1
+                row, col = divmod(cell, num_cols)
+                # Walls surround the level, but we check the bounds anyway to not wrap around the edges of the grid
+                for (neighbour_row, neighbour_col) in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                    if 0 <= neighbour_row < self.num_rows and 0 <= neighbour_col < num_cols:
+                        neighbour = neighbour_row * num_cols + neighbour_col
+                        if not self.wall_cells[neighbour] and distances[neighbour] == UNREACHABLE_DISTANCE:
+                            distances[neighbour] = next_distance
+                            queue.append(neighbour)
+        distances = np.array(distances, dtype=np.uint16)
+        self.distance_maps[target_cell] = distances
+        return distances
+
+    def distance_map(self, target_position):
+        """Returns the distance map of the (row, col) target position, see distance_map_cell"""
+        return self.distance_map_cell(self.cell_index(target_position))
+
+    def distance(self, position, target_position):
+        """Returns the length of the shortest wall-free path between the two positions (or UNREACHABLE_DISTANCE)"""
+        return int(self.distance_map(target_position)[self.cell_index(position)])
+
+    def dead_cells(self, box_char, can_pull):
+        """
+        Returns a bytearray over the cell indices which is 1 for the dead cells of boxes with the given character: the
+        cells from which such a box can never be moved onto any of its positive goals, regardless of the other agents
+        and boxes. A box can be moved into a free neighbour cell if an agent can stand in another neighbour cell of
+        the box to push it or, if can_pull, move on from the neighbour cell into another free cell to pull it. Pulling
+        can undo most pushes, e.g. get a box out of a dead end, so boxes which can be pulled have far fewer dead cells.
+        If the character has no positive goals, no cell is dead. The cells are computed by a breadth-first search
+        backwards from the goals the first time they are requested.
+        """
+        key = (box_char, can_pull)
+        dead = self.dead_cell_maps.get(key)
+        if dead is not None:
+            return dead
+
+        goal_cells = [self.cell_index(position) for (position, char, is_positive_literal) in self.box_goals
+                      if char == box_char and is_positive_literal]
+        if len(goal_cells) == 0:
+            dead = bytearray(self.num_cells)
+        else:
+            def free(row, col):
+                return 0 <= row < self.num_rows and 0 <= col < self.num_cols and not self.walls[row][col]
+
+            directions = ((-1, 0), (1, 0), (0, -1), (0, 1))
+            dead = bytearray([1]) * self.num_cells
+            for cell in goal_cells:
+                dead[cell] = 0
+            queue = deque(goal_cells)
+            while queue:
+                row, col = divmod(queue.popleft(), self.num_cols)
+                for (row_delta, col_delta) in directions:
+                    source_row, source_col = row - row_delta, col - col_delta
+                    if not free(source_row, source_col) or not dead[source_row * self.num_cols + source_col]:
+                        continue
+                    # A box in the source cell can be moved into the cell by an agent pushing it from any other
+                    # neighbour of the source cell, or by an agent pulling it which moves on from the cell into any of
+                    # its other neighbours
+                    can_push = any(free(source_row + other_row_delta, source_col + other_col_delta)
+                                   for (other_row_delta, other_col_delta) in directions
+                                   if (other_row_delta, other_col_delta) != (row_delta, col_delta))
+                    can_be_pulled = can_pull and any(free(row + other_row_delta, col + other_col_delta)
+                                                     for (other_row_delta, other_col_delta) in directions
+                                                     if (other_row_delta, other_col_delta) != (-row_delta, -col_delta))
+                    if can_push or can_be_pulled:
+                        source = source_row * self.num_cols + source_col
+                        dead[source] = 0
+                        queue.append(source)
+        self.dead_cell_maps[key] = dead
+        return dead
+
+    def cell_position(self, cell):
+        """Returns the (row, col) position of the flat cell index"""
+        return divmod(cell, self.num_cols)
+
+    def zobrist_key(self, position, char):
+        """Returns the Zobrist key of the object with the given character at the requested position"""
+        return self.zobrist_keys[char][position[0] * self.num_cols + position[1]]
+
     def agent_goal_at(self, position):
         """If there is an agent goal at the requested position, its letter is returned and None otherwise"""
         for (goal_position, goal_letter, _) in self.agent_goals:
@@ -0,0 +1,195 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+import domains.hospital.level as h_level
+
+
+# Bump whenever the abstraction or the file layout changes, such that stale files are not picked up
+PATTERN_DATABASE_VERSION = 2
+
+# The directory holding the pattern database files. It is shared by all processes on the machine, so reruns and
+# parallel workers load the tables built by the first process instead of rebuilding them.
+PATTERN_DATABASE_DIR = os.environ.get('MAVIS_PATTERN_DATABASE_DIR',
+                                      os.path.join(tempfile.gettempdir(), 'mavis_pattern_databases'))
+
+# Pair patterns need a table with an entry for every pair of cells, so they are only built if all pair tables of the
+# level fit within this number of bytes
+PAIR_TABLE_BUDGET = 256 * 1024 * 1024
+
+
+class PatternDatabase:
+    """
+    A pattern database holds the exact distances in abstractions of the level which only keep the walls and a few
+    boxes and goals of a single character (a pattern). The agents are abstracted away: a box can move to a free
+    neighbour cell whenever an agent could stand in another neighbour cell of the box to push it, or could move on
+    from the neighbour cell into another free cell to pull it. The distance of an abstract state is the least number
+    of box moves which bring the boxes of the pattern onto its goals, found by a breadth-first search backwards from
+    the goals.
+
+    The database has a single table for the patterns made of one goal (indexed by pattern and box cell), and if the
+    level is small enough, a pair table for patterns made of two goals (indexed by pattern and the cells of both
+    boxes). Unreachable abstract states hold UNREACHABLE_DISTANCE.
+
+    The tables are stored in .npy files named by a hash of everything they depend on (see level_key) and are
+    memory-mapped when loaded, so they are only built once per level layout and shared by everyone using them.
+    """
+
+    def __init__(self, level: h_level.HospitalLevel, can_pull: bool = True):
+        self.level = level
+        self.can_pull = can_pull
+        # Boxes without agents of their color can never move, so only the goals of the other boxes get patterns
+        agent_colors = {level.colors[agent_char] for (_, agent_char) in level.initial_agent_positions}
+        self.box_goals = sorted((position, char) for (position, char, is_positive_literal) in level.box_goals
+                                if is_positive_literal and level.colors.get(char) in agent_colors)
+        # Single patterns: one for every goal. Pair patterns: the goals of each character in pairs of consecutive goals.
+        self.single_patterns = {goal: idx for (idx, goal) in enumerate(self.box_goals)}
+        goals_by_char = {}
+        for goal in self.box_goals:
+            goals_by_char.setdefault(goal[1], []).append(goal)
+        self.pair_patterns = [tuple(goals[idx:idx + 2]) for goals in goals_by_char.values()
+                              for idx in range(0, len(goals) - 1, 2)]
+        if len(self.pair_patterns) * level.num_cells ** 2 * 2 > PAIR_TABLE_BUDGET:
+            self.pair_patterns = []
+
+        self.single_table = self._load_or_build(1, self._build_single_table)
+        self.pair_table = self._load_or_build(2, self._build_pair_table) if self.pair_patterns else None
+
+    def level_key(self) -> str:
+        """Returns a hash of the walls, box goals and action model, which determine all tables of the database"""
+        level = self.level
+        key = repr((PATTERN_DATABASE_VERSION, level.num_rows, level.num_cols, bytes(level.wall_cells),
+                    self.box_goals, self.can_pull))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _load_or_build(self, pattern_size, build):
+        path = os.path.join(PATTERN_DATABASE_DIR, f"{self.level_key()}-{pattern_size}.npy")
+        if not os.path.exists(path):
+            table = build()
+            os.makedirs(PATTERN_DATABASE_DIR, exist_ok=True)
+            # Write to a temporary file first and move it into place in one step, such that concurrent builders never
+            # see a partially written file. If several processes build the same table, the last one simply wins.
+            (handle, temporary_path) = tempfile.mkstemp(dir=PATTERN_DATABASE_DIR, suffix='.npy')
+            with os.fdopen(handle, 'wb') as f:
+                np.save(f, table)
+            os.chmod(temporary_path, 0o644)
+            os.replace(temporary_path, path)
+        return np.load(path, mmap_mode='r')
+
+    def _neighbours(self):
+        """
+        Returns the neighbour cell of every cell in each direction, where index num_cells is a wall outside the grid.
+        The returned walls array has an entry for this extra cell as well.
+        """
+        level = self.level
+        num_cells = level.num_cells
+        walls = np.ones(num_cells + 1, dtype=bool)
+        walls[:num_cells] = np.frombuffer(bytes(level.wall_cells), dtype=np.uint8) != 0
+        cells = np.arange(num_cells)
+        rows, cols = np.divmod(cells, level.num_cols)
+        neighbours = []
+        for (row_delta, col_delta) in ((-1, 0), (1, 0), (0, 1), (0, -1)):
+            neighbour_rows, neighbour_cols = rows + row_delta, cols + col_delta
+            inside = (neighbour_rows >= 0) & (neighbour_rows < level.num_rows) & \
+                     (neighbour_cols >= 0) & (neighbour_cols < level.num_cols)
+            neighbour = np.full(num_cells + 1, num_cells)
+            neighbour[:num_cells][inside] = neighbour_rows[inside] * level.num_cols + neighbour_cols[inside]
+            neighbours.append(neighbour)
+        return walls, neighbours
+
+    def _predecessors(self, box_cells, other_cells, walls, neighbours):
+        """
+        Returns, for every direction, the cells from which a box can move into box_cells in that direction (or -1 if
+        it cannot), where the cells in other_cells (if any) are occupied by another box.
+        """
+        def free(cells):
+            is_free = ~walls[cells]
+            if other_cells is not None:
+                is_free &= cells != other_cells
+            return is_free
+
+        result = []
+        for direction in range(len(neighbours)):
+            source = neighbours[OPPOSITE[direction]][box_cells]
+            # The box moved from the source into the box cell. Since pushes can turn, an agent pushing it can have
+            # stood in any other neighbour of the source. An agent pulling it stood in the box cell and moved on into
+            # any other neighbour of the box cell.
+            can_push = np.zeros(len(box_cells), dtype=bool)
+            can_pull = np.zeros(len(box_cells), dtype=bool)
+            for other_direction in range(len(neighbours)):
+                if other_direction != direction:
+                    can_push |= free(neighbours[other_direction][source])
+                if self.can_pull and other_direction != OPPOSITE[direction]:
+                    can_pull |= free(neighbours[other_direction][box_cells])
+            valid = free(source) & (can_push | can_pull)
+            result.append(np.where(valid, source, -1))
+        return result
+
+    def _build_single_table(self) -> np.ndarray:
+        num_cells = self.level.num_cells
+        walls, neighbours = self._neighbours()
+        table = np.full((len(self.box_goals), num_cells), h_level.UNREACHABLE_DISTANCE, dtype=np.uint16)
+        for (idx, (goal_position, _)) in enumerate(self.box_goals):
+            distances = table[idx]
+            frontier = np.array([self.level.cell_index(goal_position)])
+            distances[frontier] = 0
+            depth = 0
+            while len(frontier) > 0:
+                depth += 1
+                sources = np.concatenate(self._predecessors(frontier, None, walls, neighbours))
+                sources = np.unique(sources[sources >= 0])
+                frontier = sources[distances[sources] == h_level.UNREACHABLE_DISTANCE]
+                distances[frontier] = depth
+        return table
+
+    def _build_pair_table(self) -> np.ndarray:
+        num_cells = self.level.num_cells
+        walls, neighbours = self._neighbours()
+        table = np.full((len(self.pair_patterns), num_cells * num_cells), h_level.UNREACHABLE_DISTANCE,
+                        dtype=np.uint16)
+        for (idx, ((first_goal, _), (second_goal, _))) in enumerate(self.pair_patterns):
+            distances = table[idx]
+            # The states are (first box cell, second box cell) pairs flattened into a single index. Both orders of the
+            # boxes are goal states, which keeps the table symmetric.
+            first, second = self.level.cell_index(first_goal), self.level.cell_index(second_goal)
+            frontier = np.array([first * num_cells + second, second * num_cells + first])
+            distances[frontier] = 0
+            depth = 0
+            while len(frontier) > 0:
+                depth += 1
+                first_cells, second_cells = np.divmod(frontier, num_cells)
+                predecessors = []
+                for sources in self._predecessors(first_cells, second_cells, walls, neighbours):
+                    valid = sources >= 0
+                    predecessors.append(sources[valid] * num_cells + second_cells[valid])
+                for sources in self._predecessors(second_cells, first_cells, walls, neighbours):
+                    valid = sources >= 0
+                    predecessors.append(first_cells[valid] * num_cells + sources[valid])
+                states = np.unique(np.concatenate(predecessors))
+                frontier = states[distances[states] == h_level.UNREACHABLE_DISTANCE]
+                distances[frontier] = depth
+        return table.reshape(len(self.pair_patterns), num_cells, num_cells)
+
+    def single_distances(self, goals: list[tuple[tuple[int, int], str]]) -> np.ndarray:
+        """Returns the single pattern table rows (goals x cells) of the given (position, char) goals"""
+        return np.asarray(self.single_table[[self.single_patterns[goal] for goal in goals]])
+
+
+# The order of the directions in PatternDatabase._neighbours is N, S, E, W
+OPPOSITE = (1, 0, 3, 2)
@@ -12,6 +12,7 @@
 # limitations under the License.
 from __future__ import annotations
 
+import bisect
 import copy
 import itertools
 import random
@@ -45,23 +46,43 @@ class HospitalState:
         parent = None,
         action: actions.AnyAction = None
     ):
+        # The box positions are kept sorted such that the boxes are indistinguishable (see move_box)
+        if any(box_positions[idx] > box_positions[idx + 1] for idx in range(len(box_positions) - 1)):
+            box_positions = sorted(box_positions)
         self.level = level
         self.agent_positions = agent_positions
         self.box_positions = box_positions
         self.parent = parent
         self.action = action
         self.path_cost = 0 if parent is None else parent.path_cost + 1
+        # The occupancy index maps the position of every agent and box to its (index, character). It allows agent_at,
+        # box_at, object_at and free_at to run in constant time and is afterwards kept up to date by move_agent and
+        # move_box. Agents and boxes can be told apart by their character.
+        self.occupancy = {}
+        for (idx, (agent_position, agent_char)) in enumerate(agent_positions):
+            if agent_char != '':
+                self.occupancy[agent_position] = (idx, agent_char)
+        for (idx, (box_position, box_char)) in enumerate(box_positions):
+            if box_char != '':
+                self.occupancy[box_position] = (idx, box_char)
+        # The Zobrist hash is the xor of the Zobrist keys of all agents and boxes. It is computed from scratch here
+        # and afterwards kept up to date by move_agent and move_box.
+        self.zobrist_hash = 0
+        for (position, char) in itertools.chain(agent_positions, box_positions):
+            if char != '':
+                self.zobrist_hash ^= level.zobrist_key(position, char)
+        # The number of goals of the level satisfied in this state, kept up to date by move_agent and move_box such
+        # that goal tests and goal counting take constant time (see HospitalGoalDescription.is_goal).
+        self.num_satisfied_goals = level.count_satisfied_goals(itertools.chain(agent_positions, box_positions))
 
     def agent_at(self, position: tuple[int, int]) -> tuple[int, str]:
         """
         Returns the index and character of the agent at the given position.
         If there is no agent at the position, -1,'' is returned instead.
         """
-        for (idx, (agent_position, agent_char)) in enumerate(self.agent_positions):
-            if agent_char == '':
-                continue
-            if agent_position == position:
-                return idx, agent_char
+        entry = self.occupancy.get(position)
+        if entry is not None and '0' <= entry[1] <= '9':
+            return entry
         return -1, ''
 
     def box_at(self, position: tuple[int, int]) -> tuple[int, str]:
@@ -69,31 +90,55 @@ class HospitalState:
         Returns the index and character of the box at the given position.
         If there is no box at the position, -1,'' is returned instead.
         """
-        for (idx, (box_position, box_char)) in enumerate(self.box_positions):
-            if box_char == '':
-                continue
-            if box_position == position:
-                return idx, box_char
+        entry = self.occupancy.get(position)
+        if entry is not None and 'A' <= entry[1] <= 'Z':
+            return entry
         return -1, ''
 
     def object_at(self, position: tuple[int, int]) -> str:
         """
-        Returns the index and character of the object at the given position.
+        Returns the character of the object at the given position.
         It can be used for checks where we do not care whether it is an agent or a box, e.g. when checking
-        for obstacles. If there is no object at the position, -1,'' is returned instead.
+        for obstacles. If there is no object at the position, '' is returned instead.
         """
-        idx, agent_char = self.agent_at(position)
-        if agent_char != '':
-            return agent_char
-        else:
-            idx, box_char = self.box_at(position)
-            return box_char
+        entry = self.occupancy.get(position)
+        return '' if entry is None else entry[1]
 
     def free_at(self, position: tuple[int, int]) -> bool:
         """Returns True iff there are no objects at the requested location"""
-        return not self.level.wall_at(position) and \
-               self.agent_at(position)[1] == '' and \
-               self.box_at(position)[1] == ''
+        return not self.level.wall_at(position) and position not in self.occupancy
+
+    def move_agent(self, agent_index: int, new_position: tuple[int, int]):
+        """
+        Moves the agent with the given index to the new position and updates the occupancy index, hash and number of
+        satisfied goals
+        """
+        position, agent_char = self.agent_positions[agent_index]
+        self.agent_positions[agent_index] = (new_position, agent_char)
+        del self.occupancy[position]
+        self.occupancy[new_position] = (agent_index, agent_char)
+        self.zobrist_hash ^= self.level.zobrist_key(position, agent_char) ^ \
+                             self.level.zobrist_key(new_position, agent_char)
+        self.num_satisfied_goals += self.level.goal_move_delta(position, new_position, agent_char)
+
+    def move_box(self, box_index: int, new_position: tuple[int, int]):
+        """
+        Moves the box with the given index to the new position and updates the occupancy index, hash and number of
+        satisfied goals.
+        Keeping the box positions sorted ensures that the boxes are indistinguishable which significantly reduces the
+        search space size. Since a box only moves a single cell, we just move it to its new sorted index and re-index
+        the boxes in between instead of sorting all boxes.
+        """
+        box_positions = self.box_positions
+        position, box_char = box_positions.pop(box_index)
+        del self.occupancy[position]
+        new_index = bisect.bisect_left(box_positions, (new_position, box_char))
+        box_positions.insert(new_index, (new_position, box_char))
+        for idx in range(min(box_index, new_index), max(box_index, new_index) + 1):
+            self.occupancy[box_positions[idx][0]] = (idx, box_positions[idx][1])
+        self.zobrist_hash ^= self.level.zobrist_key(position, box_char) ^ \
+                             self.level.zobrist_key(new_position, box_char)
+        self.num_satisfied_goals += self.level.goal_move_delta(position, new_position, box_char)
 
     def extract_plan(self) -> list[actions.AnyAction]:
         """Extracts a plan from the search tree by walking backwards through the search tree"""
@@ -133,16 +178,22 @@ class HospitalState:
 
     def result(self, joint_action: list[actions.AnyAction]):
         """Computes the state resulting from applying a joint action to this state"""
-        new_state = HospitalState(self.level, copy.copy(self.agent_positions), copy.copy(self.box_positions),
-                                  self, joint_action)
+        # The child starts out as a copy of this state and is then updated incrementally by the actions,
+        # which is much cheaper than building the occupancy index and hash of the child from scratch.
+        new_state = HospitalState.__new__(HospitalState)
+        new_state.level = self.level
+        new_state.agent_positions = copy.copy(self.agent_positions)
+        new_state.box_positions = copy.copy(self.box_positions)
+        new_state.parent = self
+        new_state.action = joint_action
+        new_state.path_cost = self.path_cost + 1
+        new_state.occupancy = copy.copy(self.occupancy)
+        new_state.zobrist_hash = self.zobrist_hash
+        new_state.num_satisfied_goals = self.num_satisfied_goals
 
         for (agent_index, action) in enumerate(joint_action):
             action.result(agent_index, new_state)
 
-        # Sorting the box positions ensures that the boxes are indistinguishable which significantly
-        # reduces the search space size.
-        new_state.box_positions.sort()
-
         return new_state
 
     def result_of_plan(self, plan: list[list[actions.AnyAction]]):
@@ -163,28 +214,41 @@ class HospitalState:
                 return False
         return True
 
+    def get_applicable_agent_actions(self, agent_index: int, action_set: list[list[actions.AnyAction]]):
+        """Returns a list of the actions applicable for a single agent, i.e. without consideration of conflicts"""
+        agent_position, agent_char = self.agent_positions[agent_index]
+        action_table = self.level.action_table(action_set[agent_index], len(self.agent_positions), use_positions=True)
+        # The action table of the level contains, for each cell, only the actions which are not ruled out by walls,
+        # so we just need to check whether the cells they depend on are occupied.
+        return [action for (action, first, second, _) in action_table[agent_position]
+                if action.is_unblocked(self.level, agent_char, self.object_at, first, second)]
+
+    def get_applicable_agent_options(self, agent_index: int, action_set: list[list[actions.AnyAction]]):
+        """
+        Returns the (action, conflict mask) pairs of the actions applicable for a single agent, see
+        actions.conflict_free_joint_actions. Filtered agents cannot conflict with anyone, so their masks are 0.
+        """
+        agent_position, agent_char = self.agent_positions[agent_index]
+        action_table = self.level.action_table(action_set[agent_index], len(self.agent_positions), use_positions=True)
+        return [(action, mask if agent_char != '' else 0)
+                for (action, first, second, mask) in action_table[agent_position]
+                if action.is_unblocked(self.level, agent_char, self.object_at, first, second)]
+
     def get_applicable_actions(self, action_set: list[list[actions.AnyAction]]):
         """Returns a list of all applicable joint_action in this state"""
         num_agents = len(self.agent_positions)
 
-        # Determine all applicable actions for each individual agent, i.e. without consideration of conflicts.
-        applicable_actions = [[] for _ in range(num_agents)]
-
-        for agent_index in range(num_agents):
-            for action in action_set[agent_index]:
-                if action.is_applicable(agent_index, self):
-                    applicable_actions[agent_index].append(action)
-
-        # Determine all applicable joint actions, but checking all combinations of the individual applicable actions
-        # We can skip this step if there only is one agent
+        # Determine all applicable joint actions. We can skip the conflict checks if there only is one agent
         applicable_joint_actions = []
         if num_agents == 1:
-            for action in applicable_actions[0]:
+            for action in self.get_applicable_agent_actions(0, action_set):
                 applicable_joint_actions.append([action])
         else:
-            for joint_action in itertools.product(*applicable_actions):
-                if not self.is_conflicting(joint_action):
-                    applicable_joint_actions.append(joint_action)
+            # The applicable actions and their conflict masks are determined once for each individual agent, after
+            # which the joint actions are combined agent by agent, pruning every partial joint action which conflicts.
+            agent_options = [self.get_applicable_agent_options(agent_index, action_set)
+                             for agent_index in range(num_agents)]
+            applicable_joint_actions = actions.conflict_free_joint_actions(agent_options)
 
         random.shuffle(applicable_joint_actions)
         return applicable_joint_actions
@@ -234,7 +298,9 @@ class HospitalState:
         That means that two states with identical positions but e.g. different parent will be seen as equal.
         """
         if isinstance(other, self.__class__):
-            return self.agent_positions == other.agent_positions and self.box_positions == other.box_positions
+            # Comparing the hashes first allows us to reject almost all unequal states without looking at the positions
+            return self.zobrist_hash == other.zobrist_hash and \
+                   self.agent_positions == other.agent_positions and self.box_positions == other.box_positions
         else:
             return False
 
@@ -246,5 +312,6 @@ class HospitalState:
         Allows the state to be stored in a hash table for efficient lookup.
         Notice that we here only hash the agent positions and box positions, but ignore all other fields.
         That means that two states with identical positions but e.g. different parent will map to the same hash value.
+        The hash is the cached Zobrist hash, so it does not depend on the order of the boxes.
         """
-        return hash((tuple(self.agent_positions), tuple(self.box_positions)))
+        return self.zobrist_hash
@@ -17,8 +17,18 @@ import psutil
 
 max_usage = inf
 _process_id = psutil.Process
+# Asking the operating system for the memory usage is slow, so the searches only check it every this many expansions
+CHECK_INTERVAL = 1000
+# Memory freed by a search is rarely returned to the operating system, so memory-bounded searches which have shrunk
+# their frontier once the limit was exceeded only shrink it again after the usage has grown by this fraction
+GROWTH_RATIO = 0.05
 
 
 def get_usage():
     process = psutil.Process(os.getpid())
-    return process.memory_info().rss
\ No newline at end of file
+    return process.memory_info().rss
+
+
+def exceeded() -> bool:
+    """Returns whether the memory usage is above max_usage, without measuring it if there is no limit"""
+    return max_usage < inf and get_usage() > max_usage
\ No newline at end of file
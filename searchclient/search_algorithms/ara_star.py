@@ -0,0 +1,145 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import itertools
+import math
+import sys
+import time
+
+import memory
+import domains.hospital.actions as actions
+import domains.hospital.state as state
+import domains.hospital.goal_description as goal_description
+import strategies.arastar as arastar
+
+from search_algorithms.graph_search import print_deadlock_status
+from search_algorithms.operator_decomposition import DecomposedState
+from strategies.bestfirst import PriorityQueue
+
+
+def ara_star(
+        initial_state:      state.HospitalState,
+        action_set:         list[list[actions.AnyAction]],
+        goal_description:   goal_description.HospitalGoalDescription,
+        strategy:           arastar.StrategyARAStar,
+        operator_decomposition: bool = False,
+        deadlock_detector = None
+    ) -> tuple[bool, list[list[actions.AnyAction]], int, float]:
+    """
+    Anytime repairing A*, returning the same (solved, plan, #expanded, elapsed time) tuple as graph_search for the
+    best plan found. Every search expands the states in the order of g + w * h until no state in the frontier has a
+    lower priority than the cost of the best plan, which is then at most w times longer than the shortest plan (for an
+    admissible heuristic). The weight w is then lowered and the search continues with the same path costs: states
+    reached by a cheaper path after being expanded in the current search are set aside as inconsistent instead of
+    being expanded again, and are moved back into the frontier for the next search, whose priorities are all
+    recomputed with the new weight.
+
+    Every improved plan is passed to strategy.report_plan together with its suboptimality bound, which is the lowest
+    of the weight and the plan cost divided by the lowest g + h in the frontier and the inconsistent states.
+    """
+    start_time = time.time()
+    strategy.prepare(goal_description)
+
+    # Clear the parent pointer and cost in order make sure that the initial state is a root node
+    initial_state.parent = None
+    initial_state.path_cost = 0
+    if operator_decomposition and len(initial_state.agent_positions) > 1:
+        initial_state = DecomposedState(initial_state)
+
+    weight = strategy.initial_weight
+    frontier = PriorityQueue()
+    # The cheapest path found to every state is the state object reached by it, whose path cost is g
+    best = {initial_state: initial_state}
+    heuristic_values = {initial_state: strategy.heuristic_value(initial_state)}
+    expanded = set()
+    inconsistent = set()
+    goal_state = initial_state if goal_description.is_goal(initial_state) else None
+    num_expanded = 0
+
+    def add(node):
+        frontier.add(node, node.path_cost + weight * heuristic_values[node], getattr(node, 'num_assigned', 0))
+
+    def out_of_budget() -> bool:
+        if strategy.time_budget is not None and time.time() - start_time > strategy.time_budget:
+            return True
+        return num_expanded % memory.CHECK_INTERVAL == 0 and memory.exceeded()
+
+    def suboptimality_bound() -> float:
+        lower_bound = min((best[node].path_cost + heuristic_values[node]
+                           for node in itertools.chain(frontier.entry_finder, inconsistent)), default=math.inf)
+        # Without states left to search, no path can improve the plan any more
+        if lower_bound == math.inf or goal_state.path_cost == 0:
+            return 1.0
+        return max(1.0, goal_state.path_cost / lower_bound) if lower_bound > 0 else math.inf
+
+    add(initial_state)
+    reported_cost = math.inf
+    while True:
+        stopped = False
+        while frontier.size() > 0:
+            if goal_state is not None and goal_state.path_cost <= frontier.min_priority():
+                break
+            if out_of_budget():
+                stopped = True
+                break
+            node = frontier.pop()
+            expanded.add(node)
+            num_expanded += 1
+            node_value = heuristic_values[node]
+            for action in node.get_applicable_actions(action_set):
+                child = node.result(action)
+                known = best.get(child)
+                if known is not None and known.path_cost <= child.path_cost:
+                    continue
+                if known is None:
+                    # Intermediate nodes of operator decomposition do not move boxes, so only base states are checked
+                    if deadlock_detector is not None and getattr(child, 'num_assigned', 0) == 0 and \
+                            deadlock_detector.is_deadlocked(getattr(child, 'base', child)):
+                        continue
+                    heuristic_values[child] = strategy.heuristic_value(child, node_value)
+                best[child] = child
+                if getattr(child, 'num_assigned', 0) == 0 and goal_description.is_goal(child) and \
+                        (goal_state is None or child.path_cost < goal_state.path_cost):
+                    goal_state = child
+                if child in expanded:
+                    inconsistent.add(child)
+                else:
+                    frontier.remove(child)
+                    add(child)
+
+        if goal_state is not None and goal_state.path_cost < reported_cost:
+            reported_cost = goal_state.path_cost
+            bound = suboptimality_bound() if stopped else min(weight, suboptimality_bound())
+            strategy.report_plan(goal_state.extract_plan(), weight, bound, num_expanded, time.time() - start_time)
+        elif strategy.verbose:
+            print(f"ARA* search with weight {weight:.2f}: {num_expanded} expanded", file=sys.stderr)
+        if stopped or weight <= 1 or goal_state is None:
+            break
+        bound = min(weight, suboptimality_bound())
+        if bound <= 1:
+            break
+
+        # The next weight is lowered at least to the bound already proven for the plan
+        weight = max(1.0, min(weight - strategy.weight_step, bound))
+        nodes = list(frontier.entry_finder) + [best[node] for node in inconsistent]
+        frontier.clear()
+        for node in nodes:
+            add(node)
+        expanded.clear()
+        inconsistent.clear()
+
+    elapsed_time = time.time() - start_time
+    print_deadlock_status(deadlock_detector)
+    if goal_state is None:
+        return False, [], num_expanded, elapsed_time
+    return True, goal_state.extract_plan(), num_expanded, elapsed_time
@@ -0,0 +1,174 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import sys
+import time
+
+import memory
+import domains.hospital.actions as actions
+import domains.hospital.state as state
+import domains.hospital.goal_description as goal_description
+
+from domains.hospital.actions import MoveAction, NoOpAction
+from utils import pos_sub
+
+
+def goal_state_of(initial_state: state.HospitalState, goal_description: goal_description.HospitalGoalDescription):
+    """
+    Returns the only goal state of the goal description if the level has no boxes and every agent has exactly one
+    positive goal, and None otherwise. Only then are the goal states fully known and all actions reversible, which
+    allows searching backwards from the goal (see bidirectional_search).
+    """
+    level = initial_state.level
+    if level.num_boxes > 0 or len(goal_description.box_goals) > 0:
+        return None
+    goal_positions = {}
+    for (goal_position, goal_char, is_positive_literal) in goal_description.agent_goals:
+        if not is_positive_literal or goal_char in goal_positions:
+            return None
+        goal_positions[goal_char] = goal_position
+    agent_positions = initial_state.agent_positions
+    if len(goal_positions) != len(agent_positions) or \
+            any(agent_char not in goal_positions for (_, agent_char) in agent_positions):
+        return None
+    return type(initial_state)(level, [(goal_positions[agent_char], agent_char)
+                                       for (_, agent_char) in agent_positions], [])
+
+
+def predecessors(node: state.HospitalState, action_set: list[list[actions.AnyAction]]):
+    """
+    Returns the states from which a joint action of Move and NoOp actions leads to the given state, as states whose
+    parent is the given state and whose action is that joint action. A joint action is applicable when every agent
+    moves into a cell which is free before the action, so the cells which the moving agents enter must not be
+    occupied by any agent in the predecessor, and no two agents can be at the same cell in the predecessor.
+    """
+    level = node.level
+    agent_positions = node.agent_positions
+    num_agents = len(agent_positions)
+    # The individual options of each agent as (action, position before the action, moves) triples
+    agent_options = []
+    for (agent_index, (position, _)) in enumerate(agent_positions):
+        options = []
+        for action in action_set[agent_index]:
+            if isinstance(action, MoveAction):
+                previous_position = pos_sub(position, action.agent_delta)
+                # The cells on the border of the grid count as walls, as in the forward search (see action_table)
+                if not level.wall_cells[level.cell_index(previous_position)]:
+                    options.append((action, previous_position, True))
+            elif isinstance(action, NoOpAction) and num_agents > 1:
+                options.append((action, position, False))
+        agent_options.append(options)
+
+    results = []
+    joint_action = [None] * num_agents
+    previous_positions = [None] * num_agents
+    occupied = set()
+    entered = set()
+
+    def assign(agent_index):
+        if agent_index == num_agents:
+            previous_agent_positions = [(previous_positions[idx], agent_char)
+                                        for (idx, (_, agent_char)) in enumerate(agent_positions)]
+            results.append(type(node)(level, previous_agent_positions, [], node, list(joint_action)))
+            return
+        position = agent_positions[agent_index][0]
+        for (action, previous_position, moves) in agent_options[agent_index]:
+            if previous_position in occupied or previous_position in entered or (moves and position in occupied):
+                continue
+            joint_action[agent_index] = action
+            previous_positions[agent_index] = previous_position
+            occupied.add(previous_position)
+            if moves:
+                entered.add(position)
+            assign(agent_index + 1)
+            occupied.discard(previous_position)
+            if moves:
+                entered.discard(position)
+
+    assign(0)
+    return results
+
+
+def bidirectional_search(
+        initial_state:      state.HospitalState,
+        action_set:         list[list[actions.AnyAction]],
+        goal_description:   goal_description.HospitalGoalDescription,
+        frontier = None,
+        operator_decomposition: bool = False,
+        deadlock_detector = None
+    ) -> tuple[bool, list[list[actions.AnyAction]], int, float]:
+    """
+    Bidirectional breadth-first search for levels without boxes where every agent has a goal, returning the same
+    (solved, plan, #expanded, elapsed time) tuple as graph_search. A forward search from the initial state and a
+    backward search from the goal state (see goal_state_of) over the predecessors of the states take turns expanding
+    a whole layer, always on the side with the smaller layer, and record every state they reach in a hash index per
+    side. The searches meet once a state generated by one side is in the index of the other, and the layer in which
+    that happens is finished to find the shortest plan through any state met in it, so plans have the same length as
+    those of breadth-first search. Each side only has to search about half the depth, which expands far fewer
+    states than searching all the way forward.
+
+    The plan is the forward plan to the meeting state followed by the actions of the backward search from it to the
+    goal state. The frontier, operator decomposition and deadlock detector are not used.
+    """
+    start_time = time.time()
+    initial_state.parent = None
+    initial_state.path_cost = 0
+    goal_state = goal_state_of(initial_state, goal_description)
+    if goal_state is None:
+        raise ValueError("Bidirectional search requires a level without boxes where every agent has a goal")
+
+    # The states reached by each side, mapped to the state objects which hold their parents
+    reached = [{initial_state: initial_state}, {goal_state: goal_state}]
+    layers = [[initial_state], [goal_state]]
+    num_expanded = 0
+    best = None
+    if initial_state == goal_state:
+        best = (initial_state, goal_state)
+
+    while best is None and len(layers[0]) > 0 and len(layers[1]) > 0:
+        # The memory usage is checked once per layer, as the number of layers is only the length of the plan
+        if memory.exceeded():
+            print("Maximum memory usage exceeded.", file=sys.stderr)
+            break
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        own, other = reached[side], reached[1 - side]
+        next_layer = []
+        for node in layers[side]:
+            num_expanded += 1
+            children = [node.result(action) for action in node.get_applicable_actions(action_set)] if side == 0 \
+                else predecessors(node, action_set)
+            for child in children:
+                if child in own:
+                    continue
+                own[child] = child
+                next_layer.append(child)
+                met = other.get(child)
+                if met is not None:
+                    pair = (child, met) if side == 0 else (met, child)
+                    if best is None or pair[0].path_cost + pair[1].path_cost < \
+                            best[0].path_cost + best[1].path_cost:
+                        best = pair
+        layers[side] = next_layer
+
+    elapsed_time = time.time() - start_time
+    num_reached = f"{len(reached[0]):,d}/{len(reached[1]):,d}".replace(',', '.')
+    print(f"#Bidirectional search states reached forward/backward: {num_reached}", file=sys.stderr)
+    if best is None:
+        return False, [], num_expanded, elapsed_time
+
+    (forward_node, backward_node) = best
+    plan = forward_node.extract_plan()
+    while backward_node.parent is not None:
+        plan.append(backward_node.action)
+        backward_node = backward_node.parent
+    return True, plan, num_expanded, elapsed_time
@@ -0,0 +1,189 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import domains.hospital.actions as actions
+import domains.hospital.state as state
+import domains.hospital.goal_description as goal_description
+import strategies.externalbfs as externalbfs
+
+from domains.hospital.compact_state import CompactHospitalState
+from search_algorithms.graph_search import print_deadlock_status
+
+# The number of records read from a file at a time
+READ_BUFFER_RECORDS = 1 << 14
+
+
+def read_records(path: str, record_size: int):
+    """Yields the fixed size records of the file one by one, reading the file in large blocks"""
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(record_size * READ_BUFFER_RECORDS)
+            if len(block) == 0:
+                return
+            for offset in range(0, len(block), record_size):
+                yield block[offset:offset + record_size]
+
+
+def write_records(path: str, records) -> int:
+    """Writes the sorted records to the file, leaving out duplicates, and returns the number of records written"""
+    num_records = 0
+    previous = None
+    block = []
+    with open(path, 'wb') as f:
+        for record in records:
+            if record == previous:
+                continue
+            previous = record
+            block.append(record)
+            if len(block) == READ_BUFFER_RECORDS:
+                f.write(b''.join(block))
+                num_records += len(block)
+                block.clear()
+        f.write(b''.join(block))
+        num_records += len(block)
+    return num_records
+
+
+def subtract(records, excluded):
+    """Yields the sorted records which are not in any of the sorted iterables of excluded records"""
+    excluded = heapq.merge(*excluded)
+    current = next(excluded, None)
+    for record in records:
+        while current is not None and current < record:
+            current = next(excluded, None)
+        if record != current:
+            yield record
+
+
+def external_bfs(
+        initial_state:      state.HospitalState,
+        action_set:         list[list[actions.AnyAction]],
+        goal_description:   goal_description.HospitalGoalDescription,
+        strategy:           externalbfs.StrategyExternalBFS,
+        operator_decomposition: bool = False,
+        deadlock_detector = None
+    ) -> tuple[bool, list[list[actions.AnyAction]], int, float]:
+    """
+    Breadth-first search with delayed duplicate detection (Korf, 2003) on disk, returning the same (solved, plan,
+    #expanded, elapsed time) tuple as graph_search. The states are identified by their packed cells (see
+    CompactHospitalState), which have the same length for all states of a level and are used as the records of the
+    layer files. Every layer file holds the sorted states first reached at that depth.
+
+    A layer is expanded by reading its file sequentially. The children are collected in a buffer of
+    strategy.buffer_size states, which is sorted and written as a run file whenever it is full. The runs are then
+    merged, and the states which are also in the layer expanded or the layer before it are removed while merging. This
+    finds all duplicates as long as every action can be undone by another action, which holds for the default action
+    library; otherwise states may be reached again in a later layer, which only costs extra expansions. Nothing but
+    the buffer and the blocks being read or written is kept in memory.
+
+    The states only record their layer, so once a goal state is generated, the plan is rebuilt from the end by
+    scanning the layer before it for a state with a child equal to it, and so on back to the initial state. The
+    operator decomposition flag is not used.
+    """
+    start_time = time.time()
+    level = initial_state.level
+    initial_state = CompactHospitalState.from_state(initial_state)
+    layout = initial_state.layout
+    record_size = len(initial_state.cells)
+
+    def children_of(cells):
+        node = CompactHospitalState.from_cells(level, layout, cells)
+        for joint_action in node.get_applicable_actions(action_set):
+            child = node.result(joint_action)
+            if deadlock_detector is not None and deadlock_detector.is_deadlocked(child):
+                continue
+            yield joint_action, child
+
+    directory = tempfile.mkdtemp(prefix='external_bfs_', dir=strategy.directory)
+    layer_paths = []
+    num_expanded = 0
+    num_records_written = 0
+    try:
+        layer_paths.append(os.path.join(directory, 'layer_0.bin'))
+        write_records(layer_paths[0], [initial_state.cells])
+        goal_cells = initial_state.cells if goal_description.is_goal(initial_state) else None
+
+        while goal_cells is None:
+            depth = len(layer_paths) - 1
+            run_paths = []
+            buffer = []
+
+            def write_run():
+                run_paths.append(os.path.join(directory, f"layer_{depth + 1}_run_{len(run_paths)}.bin"))
+                buffer.sort()
+                write_records(run_paths[-1], buffer)
+                buffer.clear()
+
+            for cells in read_records(layer_paths[depth], record_size):
+                num_expanded += 1
+                for (_, child) in children_of(cells):
+                    if goal_description.is_goal(child):
+                        goal_cells = child.cells
+                        break
+                    buffer.append(child.cells)
+                    if len(buffer) >= strategy.buffer_size:
+                        write_run()
+                if goal_cells is not None:
+                    break
+            if goal_cells is not None:
+                layer_paths.append(None)
+                break
+            write_run()
+
+            # Merge the runs into the next layer, removing the states already reached in the last two layers
+            layer_paths.append(os.path.join(directory, f"layer_{depth + 1}.bin"))
+            runs = heapq.merge(*(read_records(run_path, record_size) for run_path in run_paths))
+            previous_layers = [read_records(path, record_size) for path in layer_paths[max(0, depth - 1):depth + 1]]
+            num_records = write_records(layer_paths[-1], subtract(runs, previous_layers))
+            num_records_written += num_records
+            for run_path in run_paths:
+                os.remove(run_path)
+            if num_records == 0:
+                break
+
+        plan = None
+        if goal_cells is not None:
+            # Rebuild the plan backwards: the parent of a state is a state of the layer before it with it as a child
+            plan = []
+            target = goal_cells
+            for depth in range(len(layer_paths) - 2, -1, -1):
+                parent_found = False
+                for cells in read_records(layer_paths[depth], record_size):
+                    for (joint_action, child) in children_of(cells):
+                        if child.cells == target:
+                            plan.append(joint_action)
+                            target = cells
+                            parent_found = True
+                            break
+                    if parent_found:
+                        break
+            plan.reverse()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    elapsed_time = time.time() - start_time
+    print_deadlock_status(deadlock_detector)
+    num_states = f"{num_records_written:,d}".replace(',', '.')
+    disk_usage = f"{num_records_written * record_size / (1024 * 1024):3.2f}".replace('.', ',')
+    print(f"#External BFS layers: {len(layer_paths) - 1}, states written: {num_states}, disk: {disk_usage} MB",
+          file=sys.stderr)
+    if plan is None:
+        return False, [], num_expanded, elapsed_time
+    return True, plan, num_expanded, elapsed_time
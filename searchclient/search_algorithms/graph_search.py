@@ -24,6 +24,8 @@ import domains.hospital.state as state
 import domains.hospital.goal_description as goal_description
 import strategies.bfs as bfs
 
+from search_algorithms.operator_decomposition import DecomposedState
+
 from domains.hospital.actions import MoveAction
 from domains.hospital.heuristics import HospitalAdvancedHeuristics as heuristic
 
@@ -34,7 +36,9 @@ def graph_search(
         initial_state:      state.HospitalState,
         action_set:         list[list[actions.AnyAction]],
         goal_description:   goal_description.HospitalGoalDescription,
-        frontier:           bfs.FrontierBFS
+        frontier:           bfs.FrontierBFS,
+        operator_decomposition: bool = False,
+        deadlock_detector = None
     ) -> tuple[bool, list[list[actions.AnyAction]], int, float]:
     global start_time
 
@@ -46,6 +50,11 @@ def graph_search(
     # Clear the parent pointer and cost in order make sure that the initial state is a root node
     initial_state.parent = None
     initial_state.path_cost = 0
+
+    # With operator decomposition, the agents of a multi-agent level are assigned their actions one at a time through
+    # intermediate nodes (see operator_decomposition.py) instead of expanding all joint actions at once
+    if operator_decomposition and len(initial_state.agent_positions) > 1:
+        initial_state = DecomposedState(initial_state)
     
     '''
     Implement the Graph-Search algorithm from R&N figure 3.7
@@ -73,10 +82,27 @@ def graph_search(
     
     frontier.add(initial_state)
     
-    expandedNodes = set()
-    heuristicValues = {}
+    # Memory-bounded frontiers which forget states (see FrontierSMAStar) may have a state expanded through a worse path
+    # while the better one was forgotten, so they reopen expanded states which are reached again more cheaply, as well
+    # as expanded states which they forgot after adding them again to regenerate their children. The expanded states
+    # are then mapped to the path cost they were expanded with.
+    reopens_expanded = getattr(frontier, 'reopens_expanded', False)
+    expandedNodes = {} if reopens_expanded else set()
+    # The memory usage when the frontier was last asked to limit its memory
+    limited_memory_usage = 0
     
     while not frontier.is_empty():
+        # Once the memory usage exceeds memory.max_usage, memory-bounded frontiers (see FrontierSMAStar) forget part of
+        # their states, and all other searches give up rather than being killed by the operating system
+        if iterations % memory.CHECK_INTERVAL == 0 and memory.exceeded():
+            if not hasattr(frontier, 'limit_memory'):
+                print("Maximum memory usage exceeded.", file=sys.stderr)
+                break
+            memory_usage = memory.get_usage()
+            if memory_usage > (1 + memory.GROWTH_RATIO) * limited_memory_usage:
+                frontier.limit_memory()
+                limited_memory_usage = memory_usage
+
         node = frontier.pop()  # First node is popped from the frontier
         iterations += 1 
 
@@ -86,39 +112,105 @@ def graph_search(
 
         if goal_description.is_goal(node):
             elapsed_time = time.time() - start_time  # Compute elapsed time
+            print_deadlock_status(deadlock_detector)
+            print_heuristic_cache_status(frontier)
+            print_priority_queue_status(frontier)
             return True, node.extract_plan(), iterations, elapsed_time  # Return solution
 
-        expandedNodes.add(node)
+        if reopens_expanded:
+            expandedNodes[node] = node.path_cost
+        else:
+            expandedNodes.add(node)
 
+        children = []
         for action in node.get_applicable_actions(action_set):
             child = node.result(action) 
 
-            if child not in expandedNodes and not frontier.contains(child):
-                g = node.path_cost + 1
-                
-                # for informed search frontiers, get the heuristic value
-                if hasattr(frontier, 'heuristic'):
-                    h = frontier.heuristic.h(child, goal_description)
-                    f = g + h
-                    #print(f"f(child): {f}, g(child): {g}, h(child): {h}")
-                    heuristicValues[child] = (f, g, h) #Storing heuristic values
-                else:
-                    #for uninformed search, we don't need heuristic values
-                    #print(f"g(child): {g}")
-                    heuristicValues[child] = (g, g, 0)
-                
-                frontier.add(child)  # Add child to the frontier
-
-        #print_search_status(expandedNodes, frontier, heuristicValues)
+            if child in expandedNodes:
+                if not reopens_expanded or (expandedNodes[child] <= child.path_cost and
+                                            not frontier.is_forgotten(child)):
+                    continue
+                del expandedNodes[child]
+            if frontier.contains(child):
+                # A* moves the state in the frontier to the new path if it is cheaper. Other than for frontiers which
+                # forget states, expanded states are not reopened, which only matters for inconsistent heuristics.
+                if hasattr(frontier, 'improve'):
+                    frontier.improve(child)
+            else:
+                # Children in which boxes can never reach their goals again are dropped before they reach the
+                # frontier. Intermediate nodes of operator decomposition do not move boxes, so only base states are
+                # checked.
+                if deadlock_detector is not None and getattr(child, 'num_assigned', 0) == 0 and \
+                        deadlock_detector.is_deadlocked(getattr(child, 'base', child)):
+                    continue
+                children.append(child)
+
+        # Informed frontiers may compute the heuristic values of all children at once
+        if hasattr(frontier, 'evaluate_batch'):
+            frontier.evaluate_batch(children)
+
+        for child in children:
+            # Several joint actions can lead to the same child
+            if frontier.contains(child):
+                continue
+
+            frontier.add(child)  # Add child to the frontier
+
+        #print_search_status(expandedNodes, frontier)
 
     elapsed_time = time.time() - start_time  # Compute elapsed time
+    print_deadlock_status(deadlock_detector)
+    print_heuristic_cache_status(frontier)
+    print_priority_queue_status(frontier)
     return False, [], iterations, elapsed_time  # Return failure if no solution is found
 
 # A global variable used to keep track of the start time of the current search
 start_time = 0
 
 
-def print_search_status(expanded, frontier, heuristicValues, print_search_meta_data=True):
+def print_deadlock_status(deadlock_detector):
+    if deadlock_detector is not None:
+        num_pruned = f"{deadlock_detector.num_pruned:,d}".replace(',', '.')
+        print(f"#Pruned deadlocks: {num_pruned}", file=sys.stderr)
+
+
+def heuristic_cache_text(frontier):
+    """Returns the hit and miss counts of the heuristic cache of the frontier (see HospitalBoxCacheHeuristics)"""
+    heuristic = getattr(frontier, 'heuristic', None)
+    if not hasattr(heuristic, 'num_hits'):
+        return None
+    num_hits = f"{heuristic.num_hits:,d}".replace(',', '.')
+    num_misses = f"{heuristic.num_misses:,d}".replace(',', '.')
+    num_entries = f"{len(heuristic.cache):,d}".replace(',', '.')
+    return f"#Heuristic cache hits: {num_hits}, misses: {num_misses}, entries: {num_entries}"
+
+
+def print_heuristic_cache_status(frontier):
+    cache_text = heuristic_cache_text(frontier)
+    if cache_text is not None:
+        print(cache_text, file=sys.stderr)
+
+
+def priority_queue_text(frontier):
+    """Returns the entry counts of the priority queue of best-first frontiers, including the invalidated entries"""
+    priority_queue = getattr(frontier, 'priority_queue', None)
+    if not hasattr(priority_queue, 'num_stale'):
+        return None
+    num_entries = f"{priority_queue.num_entries():,d}".replace(',', '.')
+    num_stale = f"{priority_queue.num_stale:,d}".replace(',', '.')
+    num_compactions = f"{priority_queue.num_compactions:,d}".replace(',', '.')
+    num_reparented = f"{frontier.num_reparented:,d}".replace(',', '.')
+    return f"#Queue entries: {num_entries}, stale: {num_stale}, compactions: {num_compactions}, " \
+           f"re-parented: {num_reparented}"
+
+
+def print_priority_queue_status(frontier):
+    queue_text = priority_queue_text(frontier)
+    if queue_text is not None:
+        print(queue_text, file=sys.stderr)
+
+
+def print_search_status(expanded, frontier, heuristicValues=None, print_search_meta_data=True):
     global start_time
     
     if len(expanded) == 0:
@@ -135,11 +227,15 @@ def print_search_status(expanded, frontier, heuristicValues, print_search_meta_d
     
     # Include f, g, and h values in the status text
     fgh_text = ""
-    for state, (f, g, h) in heuristicValues.items():
+    for state, (f, g, h) in (heuristicValues or {}).items():
         fgh_text += f"State: {state}, f: {f}, g: {g}, h: {h}\n"
     
     status_text = f"#Expanded: {num_expanded}, #Frontier: {num_frontier}, #Generated: {num_generated}," \
                   f" Time: {elapsed_time} s, Memory: {memory_usage_mb} MB\n\n{fgh_text}"
+    # The heuristic cache and the priority queue report their counts on lines of their own
+    extra_texts = [text for text in (heuristic_cache_text(frontier), priority_queue_text(frontier)) if text is not None]
+    if len(extra_texts) > 0:
+        status_text += "\n".join(extra_texts)
     
     if print_search_meta_data:
         print(status_text, file=sys.stderr)
@@ -0,0 +1,298 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import zlib
+
+import memory
+import domains.hospital.actions as actions
+import domains.hospital.state as state
+import domains.hospital.goal_description as goal_description
+import strategies.hdastar as hdastar
+
+from domains.hospital.compact_state import CompactHospitalState
+from search_algorithms.graph_search import print_deadlock_status
+
+# The number of states a worker expands between looking for messages from the other workers
+EXPANSIONS_PER_POLL = 16
+# The number of seconds between the two snapshots of the worker counters taken to detect termination
+TERMINATION_POLL_INTERVAL = 0.005
+# The number of seconds an idle worker waits for a message before checking whether the search process still exists
+PARENT_CHECK_INTERVAL = 1.0
+# The path cost of the best plan while none has been found
+NO_PLAN = sys.maxsize
+
+
+def owner_of(cells: bytes, num_workers: int) -> int:
+    """Returns the index of the worker owning the state with the given packed cells"""
+    return zlib.crc32(cells) % num_workers
+
+
+class _SharedState:
+    """The queues and counters shared by the search process and the workers, which inherit them when forked"""
+
+    def __init__(self, context, num_workers: int):
+        self.num_workers = num_workers
+        self.inboxes = [context.Queue() for _ in range(num_workers)]
+        self.results = context.Queue()
+        # The path cost of the best plan found by any worker
+        self.incumbent = context.Value('q', NO_PLAN)
+        # Per worker whether it has nothing to expand, and the number of batches it has sent and received. The last
+        # entry of sent counts the batch with the initial state, which the search process sends
+        self.idle = context.Array('b', num_workers, lock=False)
+        self.sent = context.Array('q', num_workers + 1, lock=False)
+        self.received = context.Array('q', num_workers, lock=False)
+
+    def counters(self) -> tuple[bool, int, int]:
+        return all(self.idle), sum(self.sent), sum(self.received)
+
+    def is_terminated(self) -> bool:
+        """
+        Returns whether all workers are idle and no batch is on its way, using two snapshots of the counters
+        (Mattern, 1987): a worker only becomes busy again by receiving a batch, which changes the counters between them
+        """
+        first = self.counters()
+        time.sleep(TERMINATION_POLL_INTERVAL)
+        second = self.counters()
+        return first[0] and first == second and first[1] == first[2]
+
+
+def _run_worker(worker_index: int, shared: _SharedState, level, layout, action_set, goal_description,
+                strategy: hdastar.StrategyHDAStar, deadlock_detector, parent_process_id: int):
+    """
+    Runs A* on the states owned by the worker until the search process sends a stop message. The open list holds
+    (f, -g, insertion counter, cells, g) entries, so ties are broken towards deeper states, and the closed list maps the
+    cells of every state reached to its path cost, heuristic value, parent cells and the action indices leading to it.
+    """
+    num_workers = shared.num_workers
+    inbox = shared.inboxes[worker_index]
+    heuristic = strategy.heuristic
+    # Every worker gets an equal share of the memory limit
+    memory.max_usage = memory.max_usage / num_workers
+    action_indices = [{id(action): index for (index, action) in enumerate(agent_actions)}
+                      for agent_actions in action_set]
+    open_list = []
+    closed = {}
+    counter = itertools.count()
+    outboxes = [[] for _ in range(num_workers)]
+    num_expanded = 0
+
+    def insert(cells, path_cost, parent_cells, action):
+        entry = closed.get(cells)
+        if entry is not None and entry[0] <= path_cost:
+            return
+        if entry is not None:
+            h_value = entry[1]
+        else:
+            h_value = heuristic.h(CompactHospitalState.from_cells(level, layout, cells), goal_description)
+        closed[cells] = (path_cost, h_value, parent_cells, action)
+        if path_cost + h_value < shared.incumbent.value:
+            heapq.heappush(open_list, (path_cost + h_value, -path_cost, next(counter), cells, path_cost))
+
+    def flush(owner):
+        if len(outboxes[owner]) > 0:
+            # The batch is counted before it is sent, so it is never on its way without being counted
+            shared.sent[worker_index] += 1
+            shared.inboxes[owner].put(outboxes[owner])
+            outboxes[owner] = []
+
+    def next_message(block):
+        while True:
+            try:
+                return inbox.get(block, PARENT_CHECK_INTERVAL)
+            except queue.Empty:
+                if not block:
+                    return None
+                if os.getppid() != parent_process_id:
+                    return 'stop'
+
+    while True:
+        # Handle the waiting messages, waiting for one if there is nothing to expand below the best plan
+        while True:
+            has_work = len(open_list) > 0 and open_list[0][0] < shared.incumbent.value
+            if not has_work:
+                for owner in range(num_workers):
+                    flush(owner)
+                shared.idle[worker_index] = 1
+            message = next_message(not has_work)
+            if message is None:
+                break
+            if message == 'stop':
+                for owner_inbox in shared.inboxes:
+                    owner_inbox.cancel_join_thread()
+                pruned = deadlock_detector.num_pruned if deadlock_detector is not None else 0
+                shared.results.put(('stats', worker_index, num_expanded, len(closed), pruned))
+                return
+            if message[0] == 'trace':
+                entry = closed[message[1]]
+                shared.results.put(('trace', entry[2], entry[3]))
+                continue
+            shared.idle[worker_index] = 0
+            shared.received[worker_index] += 1
+            for record in message:
+                insert(*record)
+
+        for _ in range(EXPANSIONS_PER_POLL):
+            if len(open_list) == 0 or open_list[0][0] >= shared.incumbent.value:
+                break
+            (_, _, _, cells, path_cost) = heapq.heappop(open_list)
+            if closed[cells][0] < path_cost:
+                continue
+            node = CompactHospitalState.from_cells(level, layout, cells)
+            if goal_description.is_goal(node):
+                with shared.incumbent.get_lock():
+                    if path_cost < shared.incumbent.value:
+                        shared.incumbent.value = path_cost
+                        shared.results.put(('goal', cells, path_cost))
+                continue
+            num_expanded += 1
+            if num_expanded % memory.CHECK_INTERVAL == 0 and memory.exceeded():
+                shared.results.put(('memory', worker_index))
+            for joint_action in node.get_applicable_actions(action_set):
+                child = node.result(joint_action)
+                if deadlock_detector is not None and deadlock_detector.is_deadlocked(child):
+                    continue
+                action = tuple(action_indices[agent_index][id(agent_action)]
+                               for (agent_index, agent_action) in enumerate(joint_action))
+                owner = owner_of(child.cells, num_workers)
+                if owner == worker_index:
+                    insert(child.cells, path_cost + 1, cells, action)
+                else:
+                    outboxes[owner].append((child.cells, path_cost + 1, cells, action))
+                    if len(outboxes[owner]) >= strategy.batch_size:
+                        flush(owner)
+
+
+def hda_star(
+        initial_state:      state.HospitalState,
+        action_set:         list[list[actions.AnyAction]],
+        goal_description:   goal_description.HospitalGoalDescription,
+        strategy:           hdastar.StrategyHDAStar,
+        operator_decomposition: bool = False,
+        deadlock_detector = None
+    ) -> tuple[bool, list[list[actions.AnyAction]], int, float]:
+    """
+    Hash-distributed A*, returning the same (solved, plan, #expanded, elapsed time) tuple as graph_search, where
+    #expanded is the total over all workers. The states are packed as in CompactHospitalState, and the CRC-32 of the
+    packed cells decides which worker owns a state (see owner_of). Each worker runs A* on its own open and closed list
+    and sends the children owned by others in batches through their queues, while the search process only starts the
+    workers, watches for termination and rebuilds the plan.
+
+    A worker finding a goal state lowers the path cost of the best plan, which all workers share, and states with an
+    f-value at or above it are not expanded. As the workers do not expand states in the global order of f-values, a
+    state may be reached again with a lower path cost, in which case it is expanded again. The search has terminated
+    once every worker is idle, i.e. has nothing to expand below the best plan, and every batch sent has been received
+    (see _SharedState.is_terminated). With an admissible heuristic, the plan is then optimal. The closed lists only
+    keep the parent of each state as packed cells, so the plan is rebuilt by asking the owner of the goal state for its
+    parent, the owner of that state for its parent, and so on.
+
+    The workers are forked, which requires a platform with fork. Each worker may use an equal share of the memory
+    limit, and the search stops without a plan once one of them exceeds it. Operator decomposition is not used.
+    """
+    start_time = time.time()
+    strategy.prepare(goal_description)
+    level = initial_state.level
+    initial_state = CompactHospitalState.from_state(initial_state)
+    num_workers = strategy.num_workers
+
+    context = multiprocessing.get_context('fork')
+    shared = _SharedState(context, num_workers)
+    workers = [context.Process(target=_run_worker,
+                               args=(worker_index, shared, level, initial_state.layout, action_set, goal_description,
+                                     strategy, deadlock_detector, os.getpid()),
+                               daemon=True)
+               for worker_index in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    shared.sent[num_workers] += 1
+    shared.inboxes[owner_of(initial_state.cells, num_workers)].put([(initial_state.cells, 0, None, None)])
+    # The goals are reported with decreasing path costs, but the messages of different workers may arrive in another
+    # order, so the cheapest goal is kept
+    goal_cells = None
+    goal_cost = None
+    memory_exceeded = False
+    while not memory_exceeded:
+        if shared.is_terminated():
+            break
+        while True:
+            try:
+                message = shared.results.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'goal':
+                if goal_cost is None or message[2] < goal_cost:
+                    (_, goal_cells, goal_cost) = message
+            else:
+                memory_exceeded = True
+    # Goals found just before the termination was detected
+    while not memory_exceeded:
+        try:
+            message = shared.results.get_nowait()
+        except queue.Empty:
+            break
+        if message[0] == 'goal':
+            if goal_cost is None or message[2] < goal_cost:
+                (_, goal_cells, goal_cost) = message
+        else:
+            memory_exceeded = True
+    if memory_exceeded:
+        print("Maximum memory usage exceeded.", file=sys.stderr)
+
+    plan = None
+    if goal_cells is not None and not memory_exceeded:
+        plan = []
+        cells = goal_cells
+        while True:
+            shared.inboxes[owner_of(cells, num_workers)].put(('trace', cells))
+            message = shared.results.get()
+            if message[0] != 'trace':
+                continue
+            (_, parent_cells, action) = message
+            if parent_cells is None:
+                break
+            plan.append([action_set[agent_index][action_index] for (agent_index, action_index) in enumerate(action)])
+            cells = parent_cells
+        plan.reverse()
+
+    for inbox in shared.inboxes:
+        inbox.put('stop')
+    num_expanded = 0
+    num_reached = 0
+    num_pruned = 0
+    num_stopped = 0
+    while num_stopped < num_workers:
+        message = shared.results.get()
+        if message[0] == 'stats':
+            num_stopped += 1
+            num_expanded += message[2]
+            num_reached += message[3]
+            num_pruned += message[4]
+    for worker in workers:
+        worker.join()
+
+    elapsed_time = time.time() - start_time
+    if deadlock_detector is not None:
+        deadlock_detector.num_pruned = num_pruned
+    print_deadlock_status(deadlock_detector)
+    num_states = f"{num_reached:,d}".replace(',', '.')
+    print(f"#HDA* workers: {num_workers}, states reached: {num_states}", file=sys.stderr)
+    if plan is None:
+        return False, [], num_expanded, elapsed_time
+    return True, plan, num_expanded, elapsed_time
@@ -0,0 +1,138 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import math
+import sys
+import time
+
+import domains.hospital.actions as actions
+import domains.hospital.state as state
+import domains.hospital.goal_description as goal_description
+import strategies.idastar as idastar
+
+from search_algorithms.graph_search import print_deadlock_status
+from search_algorithms.operator_decomposition import DecomposedState
+
+
+def ida_star(
+        initial_state:      state.HospitalState,
+        action_set:         list[list[actions.AnyAction]],
+        goal_description:   goal_description.HospitalGoalDescription,
+        strategy:           idastar.StrategyIDAStar,
+        operator_decomposition: bool = False,
+        deadlock_detector = None
+    ) -> tuple[bool, list[list[actions.AnyAction]], int, float]:
+    """
+    Iterative deepening A*, returning the same (solved, plan, #expanded, elapsed time) tuple as graph_search.
+    Every iteration is a depth-first search which prunes the states with an f-value above the bound, and the next
+    bound is the lowest f-value pruned. Memory use is linear in the depth of the search: the depth-first search keeps
+    the states on the current path, each with the list of its children ordered by heuristic value, and a transposition
+    table of at most strategy.transposition_table_size states.
+
+    The transposition table maps a state to the iteration and path cost it was last reached with, and its heuristic
+    value. A state reached again in the same iteration without a cheaper path is cut off, since everything below it
+    has already been or is being searched with at least the same budget. The heuristic values stay valid across
+    iterations, which saves evaluating the heuristic again for the states near the root. When the table is full, the
+    states entered first are dropped.
+    """
+    start_time = time.time()
+    strategy.prepare(goal_description)
+
+    # Clear the parent pointer and cost in order make sure that the initial state is a root node
+    initial_state.parent = None
+    initial_state.path_cost = 0
+    if operator_decomposition and len(initial_state.agent_positions) > 1:
+        initial_state = DecomposedState(initial_state)
+
+    table_size = strategy.transposition_table_size
+    table = {}
+    num_expanded = 0
+
+    def children_of(node, node_value):
+        """Returns the children of the node which are not deadlocked as (h, child) pairs, best first"""
+        children = []
+        for action in node.get_applicable_actions(action_set):
+            child = node.result(action)
+            if deadlock_detector is not None and getattr(child, 'num_assigned', 0) == 0 and \
+                    deadlock_detector.is_deadlocked(getattr(child, 'base', child)):
+                continue
+            entry = table.get(child)
+            child_value = entry[2] if entry is not None else strategy.heuristic_value(child, node_value)
+            children.append((child_value, child))
+        # Sorting by the heuristic value alone keeps the random order of the actions among equal values
+        children.sort(key=lambda child_entry: child_entry[0])
+        return children
+
+    def store(node, iteration, node_value):
+        if table_size <= 0:
+            return
+        if node not in table and len(table) >= table_size:
+            # Dictionaries keep their insertion order, so the first key is the oldest entry
+            del table[next(iter(table))]
+        table[node] = (iteration, node.path_cost, node_value)
+
+    root_value = strategy.heuristic_value(initial_state)
+    bound = root_value
+    iteration = 0
+    while bound < math.inf:
+        iteration += 1
+        next_bound = math.inf
+        store(initial_state, iteration, root_value)
+        # Each frame holds a state on the current path, its heuristic value and its remaining children
+        frames = [(initial_state, root_value, None)]
+        on_path = {initial_state}
+        while len(frames) > 0:
+            (node, node_value, children) = frames[-1]
+            if children is None:
+                if goal_description.is_goal(node):
+                    elapsed_time = time.time() - start_time
+                    print_deadlock_status(deadlock_detector)
+                    print_ida_star_status(iteration, bound, table)
+                    return True, node.extract_plan(), num_expanded, elapsed_time
+                num_expanded += 1
+                children = iter(children_of(node, node_value))
+                frames[-1] = (node, node_value, children)
+
+            child_entry = next(children, None)
+            if child_entry is None:
+                frames.pop()
+                on_path.discard(node)
+                continue
+            (child_value, child) = child_entry
+            f = child.path_cost + child_value
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+            if child in on_path:
+                continue
+            entry = table.get(child)
+            if entry is not None and entry[0] == iteration and entry[1] <= child.path_cost:
+                continue
+            store(child, iteration, child_value)
+            frames.append((child, child_value, None))
+            on_path.add(child)
+
+        if strategy.verbose:
+            print(f"IDA* iteration {iteration} with bound {bound}: {num_expanded} expanded", file=sys.stderr)
+        bound = next_bound
+
+    elapsed_time = time.time() - start_time
+    print_deadlock_status(deadlock_detector)
+    print_ida_star_status(iteration, bound, table)
+    return False, [], num_expanded, elapsed_time
+
+
+def print_ida_star_status(iteration, bound, table):
+    num_entries = f"{len(table):,d}".replace(',', '.')
+    print(f"#IDA* iterations: {iteration}, last bound: {bound}, transposition table entries: {num_entries}",
+          file=sys.stderr)
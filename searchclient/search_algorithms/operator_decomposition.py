@@ -0,0 +1,124 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import random
+
+import domains.hospital.actions as actions
+import domains.hospital.state as state
+
+
+class DecomposedState:
+    """
+    A DecomposedState is an intermediate search node used for operator decomposition (Standley, 2010).
+    Instead of expanding a state into all combinations of the individual agent actions, the agents are assigned an
+    action one at a time: a DecomposedState holds a (full) base state together with the actions assigned to the
+    first len(assigned) agents, and expanding it assigns an action to the next agent. Once all agents have an action,
+    the joint action is applied to the base state, which gives an ordinary state again.
+
+    This makes the branching factor linear in the number of agents, and conflicts are pruned as soon as an agent is
+    assigned an action conflicting with the actions of the previous agents. Intermediate nodes have the path cost and
+    the positions of their base state, so the frontiers and heuristics treat them exactly like the base state, and an
+    A* search with a consistent heuristic still finds optimal plans.
+    """
+
+    def __init__(self, base: state.HospitalState, assigned: tuple[actions.AnyAction, ...] = (), used_mask: int = 0,
+                 parent = None, agent_options: list = None):
+        self.base = base
+        self.assigned = assigned
+        # The union of the conflict masks of the assigned actions (see actions.conflict_bits)
+        self.used_mask = used_mask
+        self.parent = parent
+        # The applicable actions of each agent in the base state together with their conflict masks.
+        # They are computed the first time an agent is assigned and shared by all intermediate nodes of the base.
+        self.agent_options = agent_options if agent_options is not None else [None] * len(base.agent_positions)
+        self.path_cost = base.path_cost
+        self._hash = hash((base, assigned))
+
+    @property
+    def num_assigned(self) -> int:
+        return len(self.assigned)
+
+    @property
+    def level(self):
+        return self.base.level
+
+    @property
+    def agent_positions(self):
+        return self.base.agent_positions
+
+    @property
+    def box_positions(self):
+        return self.base.box_positions
+
+    @property
+    def num_satisfied_goals(self):
+        return self.base.num_satisfied_goals
+
+    def agent_at(self, position):
+        return self.base.agent_at(position)
+
+    def box_at(self, position):
+        return self.base.box_at(position)
+
+    def object_at(self, position):
+        return self.base.object_at(position)
+
+    def free_at(self, position):
+        return self.base.free_at(position)
+
+    def extract_plan(self) -> list[list[actions.AnyAction]]:
+        """The plan reaching an intermediate node is the plan reaching its base state"""
+        return self.base.extract_plan()
+
+    def get_applicable_actions(self, action_set: list[list[actions.AnyAction]]) -> list[actions.AnyAction]:
+        """
+        Returns the applicable actions of the next agent which do not conflict with the actions already assigned.
+        Note that these are (action, conflict mask) pairs rather than joint actions, as they are only passed back to
+        result.
+        """
+        agent_index = len(self.assigned)
+        options = self.agent_options[agent_index]
+        if options is None:
+            options = self.base.get_applicable_agent_options(agent_index, action_set)
+            self.agent_options[agent_index] = options
+        used_mask = self.used_mask
+        applicable_actions = [option for option in options if not used_mask & option[1]]
+        random.shuffle(applicable_actions)
+        return applicable_actions
+
+    def result(self, option: tuple):
+        """
+        Assigns the action to the next agent. If all agents have been assigned an action, the joint action is applied
+        to the base state and the resulting state is wrapped as a new node without any assigned actions.
+        """
+        (action, mask) = option
+        assigned = self.assigned + (action,)
+        if len(assigned) == len(self.agent_options):
+            return DecomposedState(self.base.result(assigned))
+        return DecomposedState(self.base, assigned, self.used_mask | mask, self, self.agent_options)
+
+    def __repr__(self) -> str:
+        return repr(self.base)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, self.__class__):
+            return self._hash == other._hash and self.assigned == other.assigned and self.base == other.base
+        else:
+            return False
+
+    def __ne__(self, other) -> bool:
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self._hash
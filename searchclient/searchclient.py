@@ -20,7 +20,13 @@ from agent_types.classic import classic_agent_type
 from domains.hospital import *
 from strategies.bfs import FrontierBFS
 from strategies.dfs import FrontierDFS
-from strategies.bestfirst import FrontierAStar, FrontierGreedy
+from strategies.bestfirst import FrontierAStar, FrontierGreedy, TIE_BREAKING_POLICIES
+from strategies.idastar import StrategyIDAStar, DEFAULT_TRANSPOSITION_TABLE_SIZE
+from strategies.arastar import StrategyARAStar, DEFAULT_INITIAL_WEIGHT, DEFAULT_WEIGHT_STEP
+from strategies.beam import FrontierBeam, DEFAULT_BEAM_WIDTH
+from strategies.smastar import FrontierSMAStar
+from strategies.externalbfs import StrategyExternalBFS, DEFAULT_BUFFER_SIZE
+from strategies.hdastar import StrategyHDAStar, DEFAULT_NUM_WORKERS, DEFAULT_BATCH_SIZE
 
 from utils import read_line
 
@@ -36,16 +42,44 @@ def parse_arguments():
     parser.add_argument('--max-memory', default="4g", help='Maximum memory usage in GB (default: 4g).')
     parser.add_argument('-level', help="Load level file directly from the file system.")
     parser.add_argument('-render', action='store_true', help="Render the plan using the sokoban.py script.")
+    parser.add_argument('-compactstate', action='store_true', help="Use the memory efficient packed state representation.")
+    parser.add_argument('-operatordecomposition', action='store_true', help="Assign the actions of multiple agents one agent at a time.")
+    parser.add_argument('-deadlocks', action='store_true', help="Prune states in which boxes can never reach their goals.")
+    parser.add_argument('-heuristiccache', action='store_true', help="Cache the heuristic values of box configurations.")
+    parser.add_argument('-lazy', action='store_true', help="Only evaluate the heuristic of states popped by greedy search.")
+    parser.add_argument('-preferred', action='store_true', help="Prefer successors the heuristic prefers in lazy greedy search.")
+    parser.add_argument('-transpositiontable', type=int, default=DEFAULT_TRANSPOSITION_TABLE_SIZE, help="Number of states in the transposition table of IDA*.")
+    parser.add_argument('-weight', type=float, default=DEFAULT_INITIAL_WEIGHT, help="Weight of the heuristic in the first search of ARA*.")
+    parser.add_argument('-weightstep', type=float, default=DEFAULT_WEIGHT_STEP, help="Amount the weight of ARA* is lowered by after every search.")
+    parser.add_argument('-timebudget', type=float, help="Stop ARA* after this many seconds with the best plan found.")
+    parser.add_argument('-bidirectional', action='store_true', help="Search from the initial and the goal state at once on levels without boxes where every agent has a goal.")
+    parser.add_argument('-beamwidth', type=int, default=DEFAULT_BEAM_WIDTH, help="Number of states kept per layer by beam search.")
+    parser.add_argument('-externaldir', help="Directory for the layer files of external-memory BFS (default: the temporary directory).")
+    parser.add_argument('-externalbuffer', type=int, default=DEFAULT_BUFFER_SIZE, help="Number of states external-memory BFS buffers in memory before writing them to disk.")
+    parser.add_argument('-workers', type=int, default=DEFAULT_NUM_WORKERS, help="Number of worker processes of HDA* (default: one per core).")
+    parser.add_argument('-batchsize', type=int, default=DEFAULT_BATCH_SIZE, help="Number of states HDA* workers collect before sending them to another worker.")
+    parser.add_argument('-tiebreaking', choices=TIE_BREAKING_POLICIES, help="Use a bucket priority queue breaking ties with the given policy in A* and greedy search.")
 
     strategy_group = parser.add_mutually_exclusive_group()
     strategy_group.add_argument('-bfs', action='store_const', dest='strategy', const='bfs')
     strategy_group.add_argument('-dfs', action='store_const', dest='strategy', const='dfs')
     strategy_group.add_argument('-astar', action='store_const', dest='strategy', const='astar')
     strategy_group.add_argument('-greedy', action='store_const', dest='strategy', const='greedy')
+    strategy_group.add_argument('-idastar', action='store_const', dest='strategy', const='idastar')
+    strategy_group.add_argument('-arastar', action='store_const', dest='strategy', const='arastar')
+    strategy_group.add_argument('-beam', action='store_const', dest='strategy', const='beam')
+    strategy_group.add_argument('-smastar', action='store_const', dest='strategy', const='smastar')
+    strategy_group.add_argument('-externalbfs', action='store_const', dest='strategy', const='externalbfs')
+    strategy_group.add_argument('-hdastar', action='store_const', dest='strategy', const='hdastar')
 
     heuristic_group = parser.add_mutually_exclusive_group()
     heuristic_group.add_argument('-goalcount', action='store_const', dest='heuristic', const='goalcount')
     heuristic_group.add_argument('-advancedheuristic', action='store_const', dest='heuristic', const='advanced')
+    heuristic_group.add_argument('-truedistance', action='store_const', dest='heuristic', const='truedistance')
+    heuristic_group.add_argument('-individualcosts', action='store_const', dest='heuristic', const='individualcosts')
+    heuristic_group.add_argument('-maxindividualcost', action='store_const', dest='heuristic', const='maxindividualcost')
+    heuristic_group.add_argument('-matching', action='store_const', dest='heuristic', const='matching')
+    heuristic_group.add_argument('-patterndatabase', action='store_const', dest='heuristic', const='patterndatabase')
 
     action_library_group = parser.add_mutually_exclusive_group()
     action_library_group.add_argument('-defaultactions', action='store_const', dest='action_library', const='default')
@@ -56,6 +90,9 @@ def parse_arguments():
     args = parser.parse_args()
 
     args.memory_limit = validate_memory_arg(args.max_memory)
+    # Once the memory usage exceeds the limit, ARA* stops with the best plan found, beam search and SMA* shrink their
+    # frontiers and the other searches give up
+    memory.max_usage = args.memory_limit
     return args
 
 def load_level_file_from_server():
@@ -82,7 +119,9 @@ if __name__ == '__main__':
     agent_type_name = args.agent_type or 'classic' # will always be classic unless you implement other agent types
 
     # strategy_name_pygame
-    if strategy_name == 'greedy' or strategy_name == 'astar':
+    if strategy_name == 'greedy' or strategy_name == 'astar' or strategy_name == 'idastar' or \
+            strategy_name == 'arastar' or strategy_name == 'beam' or strategy_name == 'smastar' or \
+            strategy_name == 'hdastar':
         strategy_name_pygame = strategy_name + ' w. ' + heuristic_name
     else:
         strategy_name_pygame = strategy_name
@@ -100,19 +139,38 @@ if __name__ == '__main__':
 
     # instead of using else/elif
     level, initial_state, action_library, goal_description, heuristic = None, None, None, None, None
+    deadlock_detector = None
 
     if domain_name == 'hospital':
         level = HospitalLevel.parse_level_lines(level_lines)
-        initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+        state_class = CompactHospitalState if args.compactstate else HospitalState
+        initial_state = state_class(level, level.initial_agent_positions, level.initial_box_positions)
         goal_description = HospitalGoalDescription(level, level.box_goals + level.agent_goals)
 
         if action_library_name == 'default':
             action_library = DEFAULT_HOSPITAL_ACTION_LIBRARY
 
+        if args.deadlocks:
+            deadlock_detector = HospitalDeadlockDetector(level, [action_library] * level.num_agents)
+
         if heuristic_name == 'goalcount':
             heuristic = HospitalGoalCountHeuristics()
         elif heuristic_name == 'advanced':
             heuristic = HospitalAdvancedHeuristics()
+        elif heuristic_name == 'truedistance':
+            heuristic = HospitalTrueDistanceHeuristics()
+        elif heuristic_name == 'individualcosts':
+            heuristic = HospitalIndividualCostsHeuristics()
+        elif heuristic_name == 'maxindividualcost':
+            heuristic = HospitalIndividualCostsHeuristics(use_max=True)
+        elif heuristic_name == 'matching':
+            heuristic = HospitalMatchingHeuristics()
+        elif heuristic_name == 'patterndatabase':
+            heuristic = HospitalPatternDatabaseHeuristics()
+
+        if args.heuristiccache:
+            # The cache may use a quarter of the memory which the search client is allowed to use
+            heuristic = HospitalBoxCacheHeuristics(heuristic, args.memory_limit // 4)
 
     if heuristic:
         heuristic.preprocess(level)
@@ -121,14 +179,21 @@ if __name__ == '__main__':
     frontier = {
         'bfs': FrontierBFS,
         'dfs': FrontierDFS,
-        'astar': lambda: FrontierAStar(heuristic),
-        'greedy': lambda: FrontierGreedy(heuristic)
+        'astar': lambda: FrontierAStar(heuristic, tie_breaking=args.tiebreaking),
+        'greedy': lambda: FrontierGreedy(heuristic, lazy=args.lazy, preferred=args.preferred,
+                                         tie_breaking=args.tiebreaking),
+        'idastar': lambda: StrategyIDAStar(heuristic, args.transpositiontable),
+        'arastar': lambda: StrategyARAStar(heuristic, args.weight, args.weightstep, args.timebudget),
+        'beam': lambda: FrontierBeam(heuristic, args.beamwidth, tie_breaking=args.tiebreaking),
+        'smastar': lambda: FrontierSMAStar(heuristic, tie_breaking=args.tiebreaking),
+        'externalbfs': lambda: StrategyExternalBFS(args.externaldir, args.externalbuffer),
+        'hdastar': lambda: StrategyHDAStar(heuristic, args.workers, args.batchsize)
     }.get(strategy_name, FrontierBFS)()
 
 
     # The agent type is the only thing that is not domain specific but will almost always be classic unless you implement other agent types
     if agent_type_name == 'classic':
-        str_plan, num_generated, elapsed_time, sol_length = classic_agent_type(level, initial_state, action_library, goal_description, frontier)
+        str_plan, num_generated, elapsed_time, sol_length = classic_agent_type(level, initial_state, action_library, goal_description, frontier, args.operatordecomposition, deadlock_detector, args.bidirectional)
         
         if render:
             subprocess.run(["python3", "renderMAvis.py", "--level", level_path, "--plan", str_plan, "--search_strategy", strategy_name_pygame, "--num_generated", str(num_generated), "--time_elapsed", str(elapsed_time), "--sol_length", str(sol_length)])
@@ -0,0 +1,67 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import sys
+
+import domains.hospital.actions as h_actions
+import domains.hospital.goal_description as h_goal_description
+import domains.hospital.state as h_state
+
+# The weight of the heuristic in the first search of ARA* and how much it is lowered after every plan found
+DEFAULT_INITIAL_WEIGHT = 5.0
+DEFAULT_WEIGHT_STEP = 1.0
+
+
+class StrategyARAStar:
+    """
+    Anytime repairing A* (Likhachev, Gordon & Thrun, 2003) runs weighted A* with priority g + w * h, starting with a
+    high weight to find a first plan quickly. It then lowers the weight step by step down to 1, and every search
+    continues from the frontier of the previous one instead of starting over (see search_algorithms/ara_star.py).
+    This class holds the settings of the search and receives every improved plan through report_plan, which prints it
+    and keeps it in plans. The search stops with the best plan so far once time_budget seconds have passed or the
+    memory usage exceeds memory.max_usage.
+    """
+
+    def __init__(self, heuristic, initial_weight: float = DEFAULT_INITIAL_WEIGHT,
+                 weight_step: float = DEFAULT_WEIGHT_STEP, time_budget: float = None, verbose=False):
+        if initial_weight < 1 or weight_step <= 0:
+            raise ValueError(f"Expected an initial weight of at least 1 and a positive weight step, got "
+                             f"{initial_weight} and {weight_step}")
+        self.heuristic = heuristic
+        self.initial_weight = initial_weight
+        self.weight_step = weight_step
+        self.time_budget = time_budget
+        self.verbose = verbose
+        self.goal_description = None
+        # The (plan length, weight, suboptimality bound, #expanded, elapsed time) of every plan reported
+        self.plans = []
+
+    def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
+        self.goal_description = goal_description
+        self.heuristic.preprocess(goal_description.level)
+        self.plans.clear()
+
+    def heuristic_value(self, state: h_state.HospitalState, parent_value: int = None) -> int:
+        """Returns h of the state given the value of its parent (if any)"""
+        # Intermediate nodes of operator decomposition have the positions of their base state
+        if getattr(state, 'num_assigned', 0) > 0:
+            return parent_value
+        return self.heuristic.h(getattr(state, 'base', state), self.goal_description)
+
+    def report_plan(self, plan: list[list[h_actions.AnyAction]], weight: float, bound: float, num_expanded: int,
+                    elapsed_time: float):
+        """Called with every plan which is shorter than the plans before it, together with its suboptimality bound"""
+        self.plans.append((len(plan), weight, bound, num_expanded, elapsed_time))
+        num_expanded = f"{num_expanded:,d}".replace(',', '.')
+        print(f"#ARA* plan of length {len(plan)} with weight {weight:.2f}, suboptimality bound {bound:.3f}, "
+              f"#Expanded: {num_expanded}, Time: {elapsed_time:.3f} s", file=sys.stderr)
@@ -0,0 +1,101 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import heapq
+import sys
+
+import domains.hospital.goal_description as h_goal_description
+import domains.hospital.state as h_state
+
+from strategies.bestfirst import FrontierBestFirst
+
+# The number of states kept per layer by beam search
+DEFAULT_BEAM_WIDTH = 1000
+
+
+class FrontierBeam(FrontierBestFirst):
+    """
+    Beam search expands the states layer by layer like breadth-first search, but only keeps the width states with the
+    lowest heuristic values of every layer, so the frontier never holds more than two layers of at most width states.
+    Dropping states makes the search incomplete: it fails once all the states of a layer have been expanded before.
+
+    The current layer is the priority queue, ordered by heuristic value, and the children with a higher path cost are
+    collected for the next layer, which is cut down to width states whenever it grows to twice that and when it
+    becomes the current layer. Intermediate nodes of operator decomposition have the path cost of their base state, so
+    they stay in the current layer. When the memory usage exceeds the limit (see limit_memory), the width is halved.
+    """
+
+    def __init__(self, heuristic, width: int = DEFAULT_BEAM_WIDTH, verbose=False, tie_breaking=None):
+        super().__init__(tie_breaking)
+        if width < 1:
+            raise ValueError(f"Expected a beam width of at least 1, got {width}")
+        self.heuristic = heuristic
+        self.width = width
+        self.verbose = verbose
+        # Maps the states of the next layer to their heuristic values
+        self.next_layer = {}
+        self.layer_cost = 0
+        # The number of states dropped from the next layers
+        self.num_dropped = 0
+
+    def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
+        super().prepare(goal_description)
+        self.next_layer.clear()
+        self.layer_cost = 0
+        self.num_dropped = 0
+
+    def f(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
+        return self.heuristic_value(state)
+
+    def add(self, state: h_state.HospitalState):
+        if state.path_cost <= self.layer_cost:
+            super().add(state)
+            return
+        self.next_layer[state] = self.f(state, self.goal_description)
+        if self.is_incremental:
+            self.heuristic_values[state] = self.cached_value
+        if len(self.next_layer) >= 2 * self.width:
+            self.cut_next_layer()
+
+    def cut_next_layer(self):
+        """Drops all but the width states with the lowest heuristic values from the next layer"""
+        kept = heapq.nsmallest(self.width, self.next_layer.items(), key=lambda item: item[1])
+        for state in self.next_layer.keys() - dict(kept).keys():
+            self.heuristic_values.pop(state, None)
+        self.num_dropped += len(self.next_layer) - len(kept)
+        self.next_layer = dict(kept)
+
+    def pop(self) -> h_state.HospitalState:
+        if self.priority_queue.size() == 0:
+            self.cut_next_layer()
+            for (state, h_value) in self.next_layer.items():
+                self.priority_queue.add(state, h_value, getattr(state, 'num_assigned', 0), state.path_cost, h_value)
+            self.next_layer.clear()
+            self.layer_cost += 1
+        return super().pop()
+
+    def limit_memory(self):
+        """Halves the width of the beam, which is called by graph_search whenever the memory limit is exceeded"""
+        if self.width > 1:
+            self.width = max(1, self.width // 2)
+            self.cut_next_layer()
+            print(f"Memory limit exceeded, lowering the beam width to {self.width}", file=sys.stderr)
+
+    def is_empty(self) -> bool:
+        return self.priority_queue.size() == 0 and len(self.next_layer) == 0
+
+    def size(self) -> int:
+        return self.priority_queue.size() + len(self.next_layer)
+
+    def contains(self, state: h_state.HospitalState) -> bool:
+        return state in self.priority_queue.entry_finder or state in self.next_layer
@@ -12,6 +12,7 @@
 # limitations under the License.
 from __future__ import annotations
 
+import collections
 import heapq
 import itertools
 import random
@@ -19,6 +20,12 @@ import random
 import domains.hospital.goal_description as h_goal_description
 import domains.hospital.state as h_state
 
+# The priority queues are compacted once more than this fraction of their entries are invalidated (see invalidate)
+COMPACTION_RATIO = 0.5
+# Queues with fewer entries than this are never compacted, as skipping their invalidated entries costs next to nothing
+COMPACTION_MIN_ENTRIES = 1024
+
+
 # Here we define a priority queue which allows the priority of elements to be updated in constant time.
 # This priority queue is therefore suitable for usage as the frontier in a best-first search.
 class PriorityQueue:
@@ -27,8 +34,11 @@ class PriorityQueue:
         self.heap = []
         self.entry_finder = {}
         self.counter = itertools.count()
+        # The number of invalidated entries still in the heap and the number of times they were removed all at once
+        self.num_stale = 0
+        self.num_compactions = 0
 
-    def add(self, element: h_state.HospitalState, priority: int):
+    def add(self, element: h_state.HospitalState, priority: int, depth: int = 0, g: int = 0, h: int = 0):
         # The elements are stored in a queue as a triplet (priority, count, element)
         # Python sorts tuples by comparing the first position and if these tie progressing to the next position until
         # it either finds a position in the tuples where they differ or all positions has been compared (in which case
@@ -39,8 +49,11 @@ class PriorityQueue:
         # Note that we can use a counter to achieve LIFO or FIFO tie-breaking mechanisms
         # The entry finder stores a reference to all elements which ensures that we later can access the entry.
 
+        # The depth is only used by operator decomposition, where ties are broken in favour of intermediate nodes
+        # with more assigned agents, such that the search completes joint actions before starting new ones.
+        # The path cost g and heuristic value h are only used by the tie-breaking policies of BucketPriorityQueue.
         #This becomes a nice nice nice random walk
-        tie_breaker = random.random()
+        tie_breaker = (-depth, random.random())
         entry = [priority, tie_breaker, element]
         #This becomes BFS (FIFO)
         # count = next(self.counter)
@@ -54,11 +67,12 @@ class PriorityQueue:
     def change_priority(self, element: h_state.HospitalState, new_priority: int):
         # We cannot change the priority of an element already in the heap as that would break the heap invariant.
         # Instead we invalidate the current entry by replacing the element with None and then inserting the element
-        # again with the new priority.
+        # again with the new priority. Finding the entry in the heap to sift it would need the position of every entry,
+        # which heapq does not keep track of, and maintaining it in Python costs more than the invalidated entries.
         entry = self.entry_finder.pop(element)
-        entry[2] = None
+        self.invalidate(entry)
         # Add new entry with new priority
-        self.add(element, new_priority)
+        self.add(element, new_priority, -entry[1][0])
 
     def pop(self) -> h_state.HospitalState:
         # Since some of the elements in the queue might have been invalidated by the 'change_priority' method, we need
@@ -67,14 +81,187 @@ class PriorityQueue:
             entry = heapq.heappop(self.heap)
             if entry[2] is not None:
                 break
+            self.num_stale -= 1
         state = entry[2]
         self.entry_finder.pop(state)
         return state
 
+    def remove(self, element: h_state.HospitalState):
+        # Invalidates the entry of the element (if any) the same way as change_priority does
+        entry = self.entry_finder.pop(element, None)
+        if entry is not None:
+            self.invalidate(entry)
+
+    def invalidate(self, entry: list):
+        # The invalidated entries are only dropped when they reach the top of the heap, so long searches changing many
+        # priorities would carry them around for a long time. Once they make up COMPACTION_RATIO of the heap, they are
+        # dropped all at once, which takes linear time but only happens after a linear number of invalidations.
+        entry[2] = None
+        self.num_stale += 1
+        if self.num_stale > COMPACTION_RATIO * len(self.heap) and len(self.heap) >= COMPACTION_MIN_ENTRIES:
+            self.heap = [entry for entry in self.heap if entry[2] is not None]
+            heapq.heapify(self.heap)
+            self.num_stale = 0
+            self.num_compactions += 1
+
+    def min_priority(self):
+        """Returns the lowest priority of the elements in the queue without popping it, or None if it is empty"""
+        while len(self.heap) > 0 and self.heap[0][2] is None:
+            heapq.heappop(self.heap)
+            self.num_stale -= 1
+        if len(self.heap) == 0:
+            return None
+        return self.heap[0][0]
+
     def clear(self):
         self.heap.clear()
         self.entry_finder.clear()
         self.counter = itertools.count()
+        self.num_stale = 0
+        self.num_compactions = 0
+
+    def num_entries(self) -> int:
+        """Returns the number of entries in the heap, including the invalidated ones"""
+        return len(self.heap)
+
+    def size(self) -> int:
+        return len(self.entry_finder)
+
+    def get_priority(self, element) -> int:
+        entry = self.entry_finder.get(element)
+        if entry is None:
+            return None
+        return entry[0]
+
+# The tie-breaking policies of BucketPriorityQueue
+TIE_BREAKING_POLICIES = ('fifo', 'lifo', 'high-g', 'low-h', 'random')
+
+
+class BucketPriorityQueue:
+    """
+    A priority queue for the small integer priorities of the frontiers (f or h values), with the same interface as
+    PriorityQueue. The elements are kept in a bucket per priority, and inside it in a list per tie-breaking key, so
+    adding an element and popping the next one take constant time, apart from creating and emptying buckets. The
+    distinct priorities (and keys) are kept in small heaps rather than an array indexed by priority, as the heuristic
+    values of unsolvable goals are huge (see UNREACHABLE_DISTANCE).
+
+    The tie_breaking policy decides which of the elements with the lowest priority is popped first: the oldest (fifo),
+    the newest (lifo), the one with the highest path cost (high-g), the one with the lowest heuristic value (low-h) or
+    a random one. Ties between elements with the same path cost or heuristic value are broken by popping the newest.
+    As with PriorityQueue, the depth of the intermediate nodes of operator decomposition takes precedence.
+    """
+
+    def __init__(self, tie_breaking: str = 'fifo'):
+        if tie_breaking not in TIE_BREAKING_POLICIES:
+            raise ValueError(f"Unknown tie-breaking policy {tie_breaking}, expected one of {TIE_BREAKING_POLICIES}")
+        self.tie_breaking = tie_breaking
+        # Maps priorities to a (tie-breaking key to list of entries, heap of the keys) pair
+        self.buckets = {}
+        self.priorities = []
+        self.entry_finder = {}
+        # The number of entries in the buckets, the number of those which are invalidated (see PriorityQueue)
+        self._num_entries = 0
+        self.num_stale = 0
+        self.num_compactions = 0
+
+    def add(self, element: h_state.HospitalState, priority: int, depth: int = 0, g: int = 0, h: int = 0):
+        if self.tie_breaking == 'high-g':
+            key = (-depth, -g)
+        elif self.tie_breaking == 'low-h':
+            key = (-depth, h)
+        else:
+            key = -depth
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = ({}, [])
+            self.buckets[priority] = bucket
+            heapq.heappush(self.priorities, priority)
+        (entries_by_key, keys) = bucket
+        entries = entries_by_key.get(key)
+        if entries is None:
+            entries = collections.deque() if self.tie_breaking == 'fifo' else []
+            entries_by_key[key] = entries
+            heapq.heappush(keys, key)
+        # The depth, path cost and heuristic value are kept for change_priority
+        entry = [priority, (depth, g, h), element]
+        entries.append(entry)
+        self.entry_finder[element] = entry
+        self._num_entries += 1
+
+    def change_priority(self, element: h_state.HospitalState, new_priority: int):
+        # The entries cannot be found in their lists in constant time, so they are invalidated as in PriorityQueue
+        entry = self.entry_finder.pop(element)
+        self.invalidate(entry)
+        self.add(element, new_priority, *entry[1])
+
+    def pop(self) -> h_state.HospitalState:
+        while True:
+            priority = self.priorities[0]
+            (entries_by_key, keys) = self.buckets[priority]
+            key = keys[0]
+            entries = entries_by_key[key]
+            if self.tie_breaking == 'fifo':
+                entry = entries.popleft()
+            else:
+                if self.tie_breaking == 'random':
+                    idx = random.randrange(len(entries))
+                    entries[idx], entries[-1] = entries[-1], entries[idx]
+                entry = entries.pop()
+            if len(entries) == 0:
+                del entries_by_key[key]
+                heapq.heappop(keys)
+                if len(keys) == 0:
+                    del self.buckets[priority]
+                    heapq.heappop(self.priorities)
+            self._num_entries -= 1
+            # Skip the entries invalidated by change_priority and remove
+            if entry[2] is not None:
+                break
+            self.num_stale -= 1
+        state = entry[2]
+        self.entry_finder.pop(state)
+        return state
+
+    def remove(self, element: h_state.HospitalState):
+        entry = self.entry_finder.pop(element, None)
+        if entry is not None:
+            self.invalidate(entry)
+
+    def invalidate(self, entry: list):
+        # Compacts the buckets in the same way as PriorityQueue.invalidate compacts the heap
+        entry[2] = None
+        self.num_stale += 1
+        if self.num_stale > COMPACTION_RATIO * self._num_entries and self._num_entries >= COMPACTION_MIN_ENTRIES:
+            for (priority, (entries_by_key, keys)) in list(self.buckets.items()):
+                for (key, entries) in list(entries_by_key.items()):
+                    live_entries = [entry for entry in entries if entry[2] is not None]
+                    if len(live_entries) == 0:
+                        del entries_by_key[key]
+                    else:
+                        entries_by_key[key] = collections.deque(live_entries) if self.tie_breaking == 'fifo' \
+                            else live_entries
+                if len(entries_by_key) == 0:
+                    del self.buckets[priority]
+                else:
+                    keys[:] = entries_by_key.keys()
+                    heapq.heapify(keys)
+            self.priorities = list(self.buckets.keys())
+            heapq.heapify(self.priorities)
+            self._num_entries -= self.num_stale
+            self.num_stale = 0
+            self.num_compactions += 1
+
+    def clear(self):
+        self.buckets.clear()
+        self.priorities.clear()
+        self.entry_finder.clear()
+        self._num_entries = 0
+        self.num_stale = 0
+        self.num_compactions = 0
+
+    def num_entries(self) -> int:
+        """Returns the number of entries in the buckets, including the invalidated ones"""
+        return self._num_entries
 
     def size(self) -> int:
         return len(self.entry_finder)
@@ -85,22 +272,81 @@ class PriorityQueue:
             return None
         return entry[0]
 
+
+def new_priority_queue(tie_breaking: str = None):
+    """Returns a BucketPriorityQueue with the given tie-breaking policy, or a PriorityQueue if there is none"""
+    if tie_breaking is None:
+        return PriorityQueue()
+    return BucketPriorityQueue(tie_breaking)
+
 class FrontierBestFirst:
 
-    def __init__(self):
+    def __init__(self, tie_breaking: str = None):
         self.goal_description = None
-        self.priority_queue = PriorityQueue()
+        self.tie_breaking = tie_breaking
+        self.priority_queue = new_priority_queue(tie_breaking)
+        self.cached_state = None
+        self.cached_value = 0
+        self.is_incremental = False
+        self.heuristic_values = {}
+        self.expanded_state = None
+        self.expanded_value = 0
+        self.is_batched = False
+        self.batch_values = {}
+        self.is_lazy = False
+        # The number of frontier states moved to a cheaper path (see FrontierAStar.improve)
+        self.num_reparented = 0
 
 
     def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
         self.goal_description = goal_description
         self.priority_queue.clear()
+        self.cached_state = None
+        self.heuristic_values.clear()
+        self.expanded_state = None
+        self.num_reparented = 0
         if hasattr(self, 'heuristic'):  # For A* and Greedy
             self.heuristic.preprocess(goal_description.level)
+            # Heuristics with an h_incremental method compute the value of a child from the value of its parent and
+            # the objects moved by the action leading to it (see HospitalGoalCountHeuristics.h_incremental)
+            self.is_incremental = hasattr(self.heuristic, 'h_incremental')
+            # Heuristics with an h_batch method evaluate all children of an expansion at once (see evaluate_batch),
+            # unless they can be evaluated incrementally, which only looks at the moved objects and is cheaper still
+            self.is_batched = hasattr(self.heuristic, 'h_batch') and not self.is_incremental
+        self.batch_values.clear()
 
     def f(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
         raise Exception("FrontierBestFirst should not be directly used. Instead use a subclass overriding f()")
 
+    def heuristic_value(self, state: h_state.HospitalState) -> int:
+        # Intermediate nodes of operator decomposition (see operator_decomposition.py) have the positions of their
+        # base state, so the heuristic value is only computed once for all the intermediate nodes of a base state.
+        # The value of the last state is cached as well, as the graph search asks for it before adding the state.
+        state = getattr(state, 'base', state)
+        if self.cached_state is not state:
+            self.cached_state = state
+            batch_value = self.batch_values.get(state)
+            if batch_value is not None:
+                self.cached_value = batch_value
+            elif self.is_incremental and state.parent is not None and state.parent is self.expanded_state:
+                self.cached_value = self.heuristic.h_incremental(state, self.expanded_value, self.goal_description)
+            else:
+                self.cached_value = self.heuristic.h(state, self.goal_description)
+        return self.cached_value
+
+    def evaluate_batch(self, states: list[h_state.HospitalState]):
+        """
+        Computes the heuristic values of the states to be added next, which are the children of the same expansion,
+        in a single call to the h_batch method of the heuristic (if it has one). Intermediate nodes of operator
+        decomposition without assigned actions are the only ones with new base states.
+        """
+        self.batch_values.clear()
+        if not self.is_batched:
+            return
+        states = [getattr(state, 'base', state) for state in states if getattr(state, 'num_assigned', 0) == 0]
+        if len(states) > 0:
+            self.batch_values.update(zip(states, self.heuristic.h_batch(states, self.goal_description)))
+
     def add(self, state: h_state.HospitalState):
         # print statements commented out to avoid clutter
         priority = self.f(state, self.goal_description)
@@ -108,12 +354,19 @@ class FrontierBestFirst:
             print(f"\nAdding state to frontier:")
             print(f"State:\n{state}")
             print(f"f-value: {priority}")
-        self.priority_queue.add(state, priority)
+        self.priority_queue.add(state, priority, getattr(state, 'num_assigned', 0), state.path_cost, self.cached_value)
+        if self.is_incremental:
+            self.heuristic_values[state] = self.cached_value
         if self.verbose:
             print(f"Frontier size after adding: {self.size()}")
 
     def pop(self) -> h_state.HospitalState:
-        return self.priority_queue.pop()
+        state = self.priority_queue.pop()
+        if self.is_incremental:
+            # The children of the state are generated next, so its value is kept for computing theirs
+            self.expanded_state = getattr(state, 'base', state)
+            self.expanded_value = self.heuristic_values.pop(state)
+        return state
 
     def is_empty(self) -> bool:
         return self.priority_queue.size() == 0
@@ -129,15 +382,15 @@ class FrontierBestFirst:
 # exact copies of the above class but where the 'f' method is replaced
 class FrontierAStar(FrontierBestFirst):
 
-    def __init__(self, heuristic, verbose=False):
-        super().__init__()
+    def __init__(self, heuristic, verbose=False, tie_breaking=None):
+        super().__init__(tie_breaking)
         self.heuristic = heuristic
         self.verbose = verbose
         if self.verbose:
             print("\nInitializing A* Search with heuristic:", type(self.heuristic).__name__)
 
     def f(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
-        h_value = self.heuristic.h(state, goal_description)
+        h_value = self.heuristic_value(state)
         g_value = state.path_cost
         f_value = h_value + g_value
         if self.verbose:
@@ -153,10 +406,29 @@ class FrontierAStar(FrontierBestFirst):
             print(f"\nAdding state to frontier:")
             print(f"State:\n{state}")
             print(f"f-value: {priority}")
-        self.priority_queue.add(state, priority)
+        self.priority_queue.add(state, priority, getattr(state, 'num_assigned', 0), state.path_cost, self.cached_value)
+        if self.is_incremental:
+            self.heuristic_values[state] = self.cached_value
         if self.verbose:
             print(f"Frontier size after adding: {self.size()}")
 
+    def improve(self, state: h_state.HospitalState) -> bool:
+        """
+        Replaces the equal state in the frontier by the given state if it was reached by a cheaper path, such that the
+        plan goes through the new parent, and lowers its priority accordingly (decrease-key). The heuristic value only
+        depends on the positions, so it is taken over from the entry instead of being evaluated again. Returns whether
+        the state was replaced.
+        """
+        entry = self.priority_queue.entry_finder.get(state)
+        if entry is None or entry[2].path_cost <= state.path_cost:
+            return False
+        h_value = entry[0] - entry[2].path_cost
+        self.priority_queue.remove(state)
+        self.priority_queue.add(state, state.path_cost + h_value, getattr(state, 'num_assigned', 0), state.path_cost,
+                                h_value)
+        self.num_reparented += 1
+        return True
+
     def pop(self) -> h_state.HospitalState:
         # print statements commented out to avoid clutter
         state = super().pop()
@@ -178,24 +450,88 @@ class FrontierAStar(FrontierBestFirst):
                 print(f"State with f-value {f_val} (h={h_val}, g={g_val}):\n{state}")
         return state
 
+# The number of extra pops from the queue of preferred successors each time the lazy greedy search finds a state with a
+# lower heuristic value than all states before it (the boost of Fast Downward)
+PREFERRED_BOOST = 1000
+
+
 class FrontierGreedy(FrontierBestFirst):
+    """
+    With lazy=True the heuristic values are deferred (deferred evaluation in Fast Downward, Richter & Helmert 2009):
+    the children are added with the value of their parent as their priority, and a state is only evaluated when it is
+    popped, right before its own children are added. Most children generated by a greedy search are never popped, so
+    this saves the evaluation of all of them, at the price of less informed priorities.
+
+    With preferred=True as well, the children which the heuristic prefers (see
+    HospitalGoalCountHeuristics.is_preferred) are added to a second queue of preferred successors too. The two queues
+    take turns being popped from, and whenever a state with a new lowest value is popped, the preferred queue is
+    popped from PREFERRED_BOOST more times in a row.
+    """
 
-    def __init__(self, heuristic, verbose=False):
-        super().__init__()
+    def __init__(self, heuristic, verbose=False, lazy=False, preferred=False, tie_breaking=None):
+        super().__init__(tie_breaking)
         self.heuristic = heuristic
         self.verbose = verbose
+        self.is_lazy = lazy
+        self.use_preferred = lazy and preferred
+        self.preferred_queue = new_priority_queue(tie_breaking)
+        self.preferred_boost = 0
+        self.pop_preferred = False
+        self.best_value = None
         if self.verbose:
             print("\nInitializing Greedy Best-First Search with heuristic:", type(self.heuristic).__name__)
 
+    def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
+        super().prepare(goal_description)
+        # The children of an expansion are not evaluated at all with lazy evaluation
+        self.is_batched = self.is_batched and not self.is_lazy
+        self.use_preferred = self.use_preferred and hasattr(self.heuristic, 'is_preferred')
+        self.preferred_queue.clear()
+        self.preferred_boost = 0
+        self.pop_preferred = False
+        self.best_value = None
+        self.expanded_value = 0
+
     def f(self, state: h_state.HospitalState, goal_description: h_goal_description.HospitalGoalDescription) -> int:
-        h_value = self.heuristic.h(state, goal_description)
+        h_value = self.heuristic_value(state)
         if self.verbose:
             print(f"Computing h-value for state:\n{state}")
             print(f"h-value: {h_value}")
         return h_value
 
+    def add(self, state: h_state.HospitalState):
+        if not self.is_lazy:
+            super().add(state)
+            return
+        # The children are added right after their parent has been popped and evaluated
+        depth = getattr(state, 'num_assigned', 0)
+        self.priority_queue.add(state, self.expanded_value, depth, state.path_cost, self.expanded_value)
+        self.heuristic_values[state] = self.expanded_value
+        if self.use_preferred and self.is_preferred(state):
+            self.preferred_queue.add(state, self.expanded_value, depth, state.path_cost, self.expanded_value)
+
+    def is_preferred(self, state: h_state.HospitalState) -> bool:
+        # Intermediate nodes of operator decomposition have not moved anything yet
+        if getattr(state, 'num_assigned', 0) > 0:
+            return False
+        state = getattr(state, 'base', state)
+        return state.parent is not None and self.heuristic.is_preferred(state, self.goal_description)
+
+    def lazy_heuristic_value(self, state: h_state.HospitalState, parent_value: int) -> int:
+        """Returns h of a popped state given the value of its parent, which was evaluated when it was popped"""
+        # Intermediate nodes of operator decomposition have the same base state as their parent
+        if getattr(state, 'num_assigned', 0) > 0:
+            return parent_value
+        state = getattr(state, 'base', state)
+        if self.is_incremental and state.parent is not None:
+            return self.heuristic.h_incremental(state, parent_value, self.goal_description)
+        return self.heuristic.h(state, self.goal_description)
+
     def pop(self) -> h_state.HospitalState:
-        state = super().pop()
+        if not self.is_lazy:
+            state = super().pop()
+        else:
+            state = self.pop_lazy()
         if self.verbose:
             print("\nPopping state from frontier:")
             print(f"State:\n{state}")
@@ -209,4 +545,25 @@ class FrontierGreedy(FrontierBestFirst):
                 h_val = self.heuristic.h(state, self.goal_description)
                 print(f"State with h-value {h_val}:\n{state}")
         return state
-    
\ No newline at end of file
+
+    def pop_lazy(self) -> h_state.HospitalState:
+        # Every state is in the regular queue, the preferred ones in the preferred queue as well, and a state popped
+        # from one queue is removed from the other
+        if self.use_preferred and self.preferred_queue.size() > 0 and (self.preferred_boost > 0 or self.pop_preferred):
+            state = self.preferred_queue.pop()
+            self.priority_queue.remove(state)
+            self.preferred_boost = max(self.preferred_boost - 1, 0)
+        else:
+            state = self.priority_queue.pop()
+            self.preferred_queue.remove(state)
+        self.pop_preferred = not self.pop_preferred
+
+        value = self.lazy_heuristic_value(state, self.heuristic_values.pop(state))
+        # The children of the state are added next with its value as their priority
+        self.expanded_state = getattr(state, 'base', state)
+        self.expanded_value = value
+        if self.use_preferred and (self.best_value is None or value < self.best_value):
+            if self.best_value is not None:
+                self.preferred_boost += PREFERRED_BOOST
+            self.best_value = value
+        return state
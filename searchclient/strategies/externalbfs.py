@@ -0,0 +1,32 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+# The number of generated states kept in memory before they are sorted and written to disk as a run
+DEFAULT_BUFFER_SIZE = 1 << 18
+
+
+class StrategyExternalBFS:
+    """
+    External-memory breadth-first search has no frontier in memory. Every layer of the search is a file of sorted
+    packed states on disk (see search_algorithms/external_bfs.py), so the memory usage only depends on the buffer
+    size, while the disk usage grows with the number of states reached. This class holds the settings of the search:
+    the directory in which the layer files are created (the default temporary directory if None) and the number of
+    states buffered in memory before they are written.
+    """
+
+    def __init__(self, directory: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        if buffer_size < 1:
+            raise ValueError(f"Expected a buffer size of at least 1, got {buffer_size}")
+        self.directory = directory
+        self.buffer_size = buffer_size
@@ -0,0 +1,47 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import os
+
+import domains.hospital.goal_description as h_goal_description
+
+# The default number of worker processes, one per core
+DEFAULT_NUM_WORKERS = os.cpu_count() or 1
+# The number of states a worker collects for another worker before sending them in one message
+DEFAULT_BATCH_SIZE = 64
+
+
+class StrategyHDAStar:
+    """
+    Hash-distributed A* (Kishimoto, Fukunaga and Botea, 2009) runs A* in num_workers processes, each owning the states
+    whose hash maps to it, with its own open and closed list (see search_algorithms/hda_star.py). A worker sends the
+    children it generates to their owners in batches of batch_size states. This class holds the settings of the
+    search and the heuristic, which is prepared once before the workers are started, so every worker gets a copy of
+    its precomputed tables.
+    """
+
+    def __init__(self, heuristic, num_workers: int = DEFAULT_NUM_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 verbose=False):
+        if num_workers < 1:
+            raise ValueError(f"Expected at least 1 worker, got {num_workers}")
+        if batch_size < 1:
+            raise ValueError(f"Expected a batch size of at least 1, got {batch_size}")
+        self.heuristic = heuristic
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.goal_description = None
+
+    def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
+        self.goal_description = goal_description
+        self.heuristic.preprocess(goal_description.level)
@@ -0,0 +1,52 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+
+import domains.hospital.goal_description as h_goal_description
+import domains.hospital.state as h_state
+
+# The default number of states kept in the transposition table of IDA*
+DEFAULT_TRANSPOSITION_TABLE_SIZE = 1 << 20
+
+
+class StrategyIDAStar:
+    """
+    Iterative deepening A* (Korf, 1985) has no frontier. It runs depth-first searches bounded by the f-value, raising
+    the bound to the lowest f-value beyond it after every iteration, so it only keeps the current path and the
+    children of the states on it (see search_algorithms/ida_star.py). This class holds the settings of the search:
+    the heuristic and the number of states in the transposition table, which remembers the path cost and heuristic
+    value of recently visited states to cut off transpositions and avoid evaluating the heuristic again.
+    """
+
+    def __init__(self, heuristic, transposition_table_size: int = DEFAULT_TRANSPOSITION_TABLE_SIZE, verbose=False):
+        self.heuristic = heuristic
+        self.transposition_table_size = transposition_table_size
+        self.verbose = verbose
+        self.goal_description = None
+        self.is_incremental = False
+
+    def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
+        self.goal_description = goal_description
+        self.heuristic.preprocess(goal_description.level)
+        self.is_incremental = hasattr(self.heuristic, 'h_incremental')
+
+    def heuristic_value(self, state: h_state.HospitalState, parent_value: int = None) -> int:
+        """Returns h of the state given the value of its parent (if any)"""
+        # Intermediate nodes of operator decomposition have the positions of their base state
+        if getattr(state, 'num_assigned', 0) > 0:
+            return parent_value
+        # The children of a state are evaluated right after each other, as incremental evaluation expects. Nodes
+        # completing a joint action of operator decomposition differ from their parent by the whole joint action
+        if self.is_incremental and parent_value is not None and not hasattr(state, 'base'):
+            return self.heuristic.h_incremental(state, parent_value, self.goal_description)
+        return self.heuristic.h(getattr(state, 'base', state), self.goal_description)
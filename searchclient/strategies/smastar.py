@@ -0,0 +1,129 @@
+# coding: utf-8
+#
+# Copyright 2021 The Technical University of Denmark
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#    http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import annotations
+import heapq
+import sys
+
+import domains.hospital.goal_description as h_goal_description
+import domains.hospital.state as h_state
+
+from strategies.bestfirst import FrontierAStar
+
+# Every time the memory limit is exceeded, the capacity of the frontier is lowered to this fraction of its size
+MEMORY_SHRINK_RATIO = 0.9
+# The capacity of the frontier is never lowered below this number of states
+MIN_CAPACITY = 1024
+# Once the frontier exceeds its capacity, it forgets states until it is down to this fraction of the capacity
+FORGET_RATIO = 0.9
+
+
+class FrontierSMAStar(FrontierAStar):
+    """
+    Simplified memory-bounded A* (Russell, 1992) is A* with a frontier of at most capacity states. Once it exceeds the
+    capacity, the frontier forgets the leaves with the highest f-values and backs their f-values up to their parents:
+    a parent which is not in the frontier is added to it again with the lowest f-value of its forgotten children, so
+    that the search expands it again and regenerates them once the rest of the frontier is worse. The forgotten states
+    are not expanded by graph_search, so they are generated again as usual, while their expanded parents are taken
+    out of the frontier and expanded again regardless. A parent which is forgotten again before being expanded is
+    reported by is_forgotten, such that graph_search generates it again even though it was expanded before.
+
+    As the cheapest path to a state may be forgotten while a worse one is expanded, graph_search reopens the expanded
+    states which are reached again more cheaply (see reopens_expanded). With a consistent heuristic, the plans are
+    then as short as those of A*, as long as the capacity exceeds the length of the plan.
+
+    The capacity is None (unbounded) until graph_search finds the memory usage above memory.max_usage and calls
+    limit_memory, which lowers the capacity to MEMORY_SHRINK_RATIO of the current frontier size. The expanded states
+    are still kept by the graph search, so the memory usage keeps growing with the number of expansions, but much
+    more slowly than the frontier of A* does. With operator decomposition, the nodes completing a joint action do not
+    point to the intermediate node they were generated from (see DecomposedState.result), so they are forgotten
+    without backing up their f-values, which makes the search incomplete.
+
+    Incremental heuristic evaluation is not used, as the heuristic values kept for it would have to be dropped along
+    with the forgotten states.
+    """
+
+    # graph_search reopens expanded states which are reached again more cheaply or have been forgotten
+    reopens_expanded = True
+
+    def __init__(self, heuristic, capacity: int = None, verbose=False, tie_breaking=None):
+        super().__init__(heuristic, verbose, tie_breaking)
+        self.initial_capacity = capacity
+        self.capacity = capacity
+        # The number of states forgotten and the number of parents added to the frontier again to regenerate them
+        self.num_forgotten = 0
+        self.num_restored = 0
+        # The expanded parents in the frontier, and the expanded parents forgotten again before being expanded
+        self.restored_states = set()
+        self.forgotten_states = set()
+
+    def prepare(self, goal_description: h_goal_description.HospitalGoalDescription):
+        super().prepare(goal_description)
+        self.is_incremental = False
+        self.is_batched = hasattr(self.heuristic, 'h_batch')
+        self.capacity = self.initial_capacity
+        self.num_forgotten = 0
+        self.num_restored = 0
+        self.restored_states = set()
+        self.forgotten_states = set()
+
+    def add(self, state: h_state.HospitalState):
+        self.forgotten_states.discard(state)
+        super().add(state)
+        if self.capacity is not None and self.size() > self.capacity:
+            self.forget(self.size() - int(FORGET_RATIO * self.capacity))
+
+    def pop(self) -> h_state.HospitalState:
+        state = super().pop()
+        self.restored_states.discard(state)
+        return state
+
+    def is_forgotten(self, state: h_state.HospitalState) -> bool:
+        """Returns whether the expanded state was forgotten, such that graph_search has to generate it again"""
+        return state in self.forgotten_states
+
+    def forget(self, num_states: int):
+        """Removes the num_states states with the highest f-values and backs their f-values up to their parents"""
+        entries = heapq.nlargest(num_states, self.priority_queue.entry_finder.values(), key=lambda entry: entry[0])
+        forgotten_values = {}
+        for entry in entries:
+            state = entry[2]
+            self.priority_queue.remove(state)
+            if state in self.restored_states:
+                self.restored_states.remove(state)
+                self.forgotten_states.add(state)
+            parent = state.parent
+            if parent is not None:
+                forgotten_values[parent] = min(entry[0], forgotten_values.get(parent, entry[0]))
+        self.num_forgotten += len(entries)
+        for (parent, forgotten_value) in forgotten_values.items():
+            priority = self.priority_queue.get_priority(parent)
+            if priority is None:
+                h_value = forgotten_value - parent.path_cost
+                self.priority_queue.add(parent, forgotten_value, getattr(parent, 'num_assigned', 0), parent.path_cost,
+                                        h_value)
+                self.restored_states.add(parent)
+                self.forgotten_states.discard(parent)
+                self.num_restored += 1
+            elif forgotten_value < priority:
+                self.priority_queue.change_priority(parent, forgotten_value)
+
+    def limit_memory(self):
+        """Lowers the capacity of the frontier, which is called by graph_search whenever the memory limit is exceeded"""
+        capacity = max(MIN_CAPACITY, int(MEMORY_SHRINK_RATIO * self.size()))
+        if self.capacity is None or capacity < self.capacity:
+            self.capacity = capacity
+            print(f"Memory limit exceeded, lowering the capacity of the frontier to {capacity} states",
+                  file=sys.stderr)
+        if self.size() > self.capacity:
+            self.forget(self.size() - int(FORGET_RATIO * self.capacity))
+
@@ -0,0 +1,53 @@
+# Regression test for SMA* (see strategies/smastar.py): with a consistent heuristic and a frontier capacity far above
+# the length of the plan, SMA* must return plans as short as those of A*, even though it forgets states and expands
+# some of them through worse paths first. Run with `python -m pytest tests` from the repository root.
+import os
+import random
+import sys
+
+import pytest
+
+REPOSITORY_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(REPOSITORY_DIR, "searchclient"))
+
+from domains.hospital import (HospitalLevel, HospitalGoalDescription, HospitalState, HospitalIndividualCostsHeuristics,
+                              DEFAULT_HOSPITAL_ACTION_LIBRARY)
+from search_algorithms.graph_search import graph_search
+from strategies.bestfirst import FrontierAStar
+from strategies.smastar import FrontierSMAStar
+
+
+class ZeroHeuristics:
+    """h = 0, which turns A* into uniform cost search"""
+
+    def preprocess(self, level):
+        pass
+
+    def h(self, state, goal_description):
+        return 0
+
+
+HEURISTICS = {'zero': ZeroHeuristics, 'maxsic': lambda: HospitalIndividualCostsHeuristics(use_max=True)}
+
+
+def plan_length(level_name, frontier):
+    random.seed(1)
+    with open(os.path.join(REPOSITORY_DIR, "levels", level_name + ".lvl")) as f:
+        level = HospitalLevel.parse_level_lines([line.strip() for line in f.readlines()])
+    goal_description = HospitalGoalDescription(level, level.box_goals + level.agent_goals)
+    initial_state = HospitalState(level, level.initial_agent_positions, level.initial_box_positions)
+    action_set = [DEFAULT_HOSPITAL_ACTION_LIBRARY] * level.num_agents
+    solved, plan, _, _ = graph_search(initial_state, action_set, goal_description, frontier)
+    assert solved
+    return len(plan)
+
+
+@pytest.mark.parametrize("level_name, heuristic_name, capacity", [
+    ('SAsoko2_08', 'zero', 50),
+    ('SAsoko2_08', 'maxsic', 50),
+    ('SAsoko2_16', 'maxsic', 1000),
+])
+def test_smastar_plans_are_as_short_as_astar(level_name, heuristic_name, capacity):
+    astar_length = plan_length(level_name, FrontierAStar(HEURISTICS[heuristic_name]()))
+    smastar_length = plan_length(level_name, FrontierSMAStar(HEURISTICS[heuristic_name](), capacity))
+    assert smastar_length == astar_length